@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmark of console pipeline and output parsers, runnable offline, results in JSON
+Usage: python benchmarks/bench_serial.py [-o result.json] [--quick] [--only throughput,expect,write,parse,keywords]
+    throughput: reader -> notify -> handlers by replay:// port, per chunk size and reader mode
+    expect: wait_for_string latency (literal/regex) versus data before match, by replay:// port
+    write: write/write_many throughput to pty (POSIX only)
+    parse: parse time of command output parsers on large generated fixtures
+    keywords: StreamMatcher feed time of 20/50 keywords (literal/mixed), combined gate versus one by one
+'''
+from __future__ import print_function
+import sys
+import os
+import re
+import time
+import json
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+sys.path.insert(1,os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from serial_wrapper.serial_wrapper import SerialThread, READER_POLL, READER_EVENT
+from serial_wrapper.serial_capture import CaptureHandler
+from serial_wrapper.serial_replay import replay_url, replay_throughput, REPLAY_SPEED_MAX
+from serial_wrapper.serial_matcher import KeywordSet, StreamMatcher
+from serial_wrapper.serial_linux import SerialLinux
+from serial_wrapper.serial_android import SerialAndroid
+from serial_wrapper.serial_syna import SerialSyna
+from serial_wrapper import serial_sim
+
+LOGGER = logging.getLogger('bench')
+CHUNK_SIZES = (16, 256, 4096, 65536)
+EXPECT_SIZES = (0, 65536, 1048576, 8388608)
+WRITE_SIZES = (64, 4096, 262144)
+THROUGHPUT_BYTES = 32 * 1024 * 1024
+THROUGHPUT_CHUNKS = 100000          # Max chunks replayed for one chunk size
+LINE = b'[  100.000000] kernel: lorem ipsum dolor sit amet, consectetur adipiscing elit\r\n'
+KEYWORD_COUNTS = (20, 50)
+KEYWORD_BYTES = 1024 * 1024
+KEYWORD_CHUNK = 256
+RECOVERY_KEYWORDS = [u'Kernel panic', u'Oops:', u'BUG:', u'Call Trace:', u'watchdog: BUG', u'login:', u'Password:',
+                     u'Hit any key to stop autoboot', u'U-Boot ', u'=> ', u'root@', u'# ', u'$ ', u'Rebooting',
+                     u'Restarting system', u'Unable to mount root fs', u'end Kernel panic', u'segfault',
+                     u'Out of memory', u'INFO: task', u'rcu_sched self-detected stall', u'EXT4-fs error',
+                     u'I/O error', u'Bad magic number', u'Starting kernel', u'fastboot', u'recovery:',
+                     u'>>> ', u'Continue?', u'[y/N]']
+RECOVERY_REGEXES = [r'Unable to handle .* at virtual address [0-9a-f]+', r'ExitCode:(\d+)\.', r'CPU: \d+ PID: \d+',
+                    r'pc : \[<[0-9a-f]+>\]', r'Internal error: .*: [0-9a-f]+', r'mmc\d: error -\d+',
+                    r'^root@[\w-]{1,32}:[~/\w]{0,64}[#$] ', r'Firmware version [\d.]+', r'(?i)fatal',
+                    r'(?i)assert(ion)? fail']
+
+def _capture(path, total, chunk_size, tail=b''):
+    '''Write capture with total bytes of console lines split to chunk_size records, then tail'''
+    # Console stream cut at chunk_size, so chunks split lines like real reads
+    stream = LINE * (chunk_size // len(LINE) + 2)
+    start = datetime.now()
+    handler = CaptureHandler(path, logger=LOGGER)
+    for index in range(total // chunk_size if chunk_size else 0):
+        offset = index * chunk_size % len(LINE)
+        handler.update(None, (stream[offset:offset + chunk_size], start + timedelta(microseconds=index)))
+    if tail:
+        handler.update(None, (tail, start + timedelta(seconds=1)))
+    handler.close()
+
+def _timeit(func, repeat):
+    '''Best seconds of repeat calls'''
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        cost = time.time() - start
+        best = cost if best is None else min(best, cost)
+    return best
+
+def bench_throughput(folder, quick=False):
+    results = []
+    total = THROUGHPUT_BYTES // (8 if quick else 1)
+    chunks = THROUGHPUT_CHUNKS // (8 if quick else 1)
+    for chunk_size in CHUNK_SIZES:
+        capture = os.path.join(folder, 'throughput_{}.cap'.format(chunk_size))
+        _capture(capture, min(total, chunk_size * chunks), chunk_size)
+        for reader_mode in (READER_POLL, READER_EVENT):
+            for with_logger in (False, True):
+                def setup(serialthread):
+                    if with_logger:
+                        # Logger in notify thread, so its cost is in throughput
+                        serialthread.create_logger(os.path.join(folder, 'throughput.log'), queue_policy=None)
+                result = replay_throughput(capture, REPLAY_SPEED_MAX, reader_mode=reader_mode,
+                                           setup=setup, logger=LOGGER, chunk=chunk_size)
+                result.update({'chunk_size': chunk_size, 'reader_mode': reader_mode, 'logger': with_logger})
+                results.append(result)
+    return results
+
+def _expect_once(capture, keyword, reader_mode):
+    '''Seconds from replay start to wait_for_string return'''
+    serialthread = SerialThread(replay_url(capture, REPLAY_SPEED_MAX, hold=True), logger=LOGGER,
+                                reader_mode=reader_mode)
+    try:
+        result = {}
+        def wait():
+            result['ret'] = serialthread.wait_for_string(keyword, timeout=60)[0]
+            result['end'] = time.time()
+        waiter = threading.Thread(target=wait)
+        waiter.start()
+        while not serialthread._serial_handlers:
+            time.sleep(0.001)
+        start = time.time()
+        serialthread._serial.resume()
+        waiter.join()
+        return result['end'] - start
+    finally:
+        serialthread.close()
+
+def bench_expect(folder, quick=False):
+    results = []
+    for size in EXPECT_SIZES[:-1] if quick else EXPECT_SIZES:
+        capture = os.path.join(folder, 'expect_{}.cap'.format(size))
+        _capture(capture, size, 4096, tail=b'login: \r\n')
+        for name, keyword in (('literal', u'login:'), ('regex', re.compile(r'log\w+:'))):
+            for reader_mode in (READER_POLL, READER_EVENT):
+                seconds = min(_expect_once(capture, keyword, reader_mode) for _ in range(1 if quick else 3))
+                results.append({'size': size, 'keyword': name, 'reader_mode': reader_mode, 'seconds': seconds,
+                                'mb_per_sec': size / seconds / 1e6})
+    return results
+
+def bench_write(folder, quick=False):
+    if os.name != 'posix':
+        return []
+    import pty
+    import tty
+    import select
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    alive = [True]
+    def drain():
+        while alive[0]:
+            if select.select([master], [], [], 0.05)[0]:
+                os.read(master, 65536)
+    drainer = threading.Thread(target=drain)
+    drainer.start()
+    serialthread = SerialThread(os.ttyname(slave), logger=LOGGER)
+    serialthread.log_payload = False
+    results = []
+    try:
+        total = 4 * 1024 * 1024 // (8 if quick else 1)
+        for size in WRITE_SIZES:
+            data = b'x' * size
+            count = max(total // size, 1)
+            seconds = _timeit(lambda: [serialthread.write(data) for _ in range(count)], 1 if quick else 3)
+            results.append({'api': 'write', 'size': size, 'seconds': seconds,
+                            'mb_per_sec': size * count / seconds / 1e6})
+            batch = [data] * min(count, 256)
+            batches = max(count // len(batch), 1)
+            seconds = _timeit(lambda: [serialthread.write_many(batch) for _ in range(batches)], 1 if quick else 3)
+            results.append({'api': 'write_many', 'size': size, 'seconds': seconds,
+                            'mb_per_sec': size * len(batch) * batches / seconds / 1e6})
+    finally:
+        serialthread.close()
+        alive[0] = False
+        drainer.join()
+        os.close(master)
+        os.close(slave)
+    return results
+
+def _parser(cls):
+    '''Instance of SerialThread subclass without port, only for parser'''
+    def init(self):
+        self.logger = LOGGER
+    return type(cls.__name__ + 'Parser', (cls,), {'__init__': init, '__del__': lambda self: None})()
+
+def _name(index):
+    '''Letters only name of index, for parser regex without digits'''
+    return u''.join(chr(65 + int(digit)) for digit in str(index))
+
+def _fixtures(scale):
+    ls_lines = [u'-rw-r--r-- root     root     {0:8d} 2020-01-01 08:01 file{0}.bin'.format(index)
+                for index in range(scale * 100)]
+    ifconfig = u'\n'.join(
+        u'eth{0}      Link encap:Ethernet  HWaddr 00:11:22:33:{1:02X}:{2:02X}  Driver r8169\n'
+        u'          inet addr:10.0.{1}.{2}  Bcast:10.0.{1}.255  Mask:255.255.255.0\n'
+        u'          UP BROADCAST RUNNING MULTICAST  MTU:1500  Metric:1\n'.format(index, index // 256, index % 256)
+        for index in range(scale * 10))
+    meminfo = u''.join(u'Key{0}:    {1} kB\n'.format(_name(index), index) for index in range(scale * 10))
+    power = serial_sim.SIM_DUMPSYS_POWER.replace(
+        u"  PARTIAL_WAKE_LOCK              'AudioMix' ACQ=-1s123ms (uid=1041 pid=300)\n",
+        u''.join(u"  PARTIAL_WAKE_LOCK              'job{0}' ACQ=-1s123ms (uid=1041 pid={0})\n".format(index)
+                 for index in range(scale * 10)))
+    cpm = u''.join(
+        u'{0}  MOD{1}  ON( 1/ 2)  -\n{0}  CPU{1}  A  Y\n{0}  PLL{1}  800MHz\n{0}  CLK{1}  800MHz ON 1\n'
+        u'{0}  USB{1}  ON\n'.format(index, _name(index))
+        for index in range(scale * 10)) + u'leakage: 100mA temp: 45 Vcore: 900mV status: M\n'
+    return {
+        'files_property': (lambda: _parser(SerialLinux)._files_property_parse(u'\r\n'.join(ls_lines)),
+                           len(ls_lines)),
+        'interface_list_get': (lambda: _parser(SerialLinux)._interface_list_parse(ifconfig), scale * 10),
+        'meminfo': (lambda: _parser(SerialLinux)._meminfo_parse(u'0', meminfo), scale * 10),
+        'dumpsys_power': (lambda: _parser(SerialAndroid)._dumpsys_parse('power', power), scale * 10),
+        'cpm_status': (lambda: _parser(SerialSyna)._cpm_status_parse(cpm), scale * 10),
+    }
+
+def bench_parse(folder, quick=False):
+    results = []
+    for name, (parse, items) in sorted(_fixtures(10 if quick else 100).items()):
+        seconds = _timeit(parse, 3 if quick else 10)
+        results.append({'parser': name, 'items': items, 'seconds': seconds})
+    return results
+
+def _keywords(count, kind):
+    '''Recovery-flow keywords: literal only, or mixed with regexes (one third regex)'''
+    if kind == 'literal':
+        keywords = RECOVERY_KEYWORDS
+    else:
+        regexes = [re.compile(pattern, re.M) for pattern in RECOVERY_REGEXES]
+        keywords = [keyword for pair in zip(RECOVERY_KEYWORDS, regexes) for keyword in pair]
+        keywords += RECOVERY_KEYWORDS[len(regexes):]
+    keywords = list(keywords)
+    while len(keywords) < count:
+        keywords.append(u'signature {} hit'.format(len(keywords)))
+    return keywords[:count]
+
+def bench_keywords(folder, quick=False):
+    text = (LINE * (KEYWORD_BYTES // len(LINE))).decode('ascii')
+    if quick:
+        text = text[:len(text) // 8]
+    chunks = [text[index:index + KEYWORD_CHUNK] for index in range(0, len(text), KEYWORD_CHUNK)]
+    results = []
+    for count in KEYWORD_COUNTS:
+        for kind in ('literal', 'mixed'):
+            keywords = _keywords(count, kind)
+            for gate in (True, False):
+                keywordset = KeywordSet(keywords)
+                if not gate:
+                    keywordset.gates = keywordset.stream_gates = ()
+                def feed():
+                    matcher = StreamMatcher(keywordset)
+                    for chunk in chunks:
+                        matcher.feed(chunk)
+                seconds = _timeit(feed, 1 if quick else 3)
+                results.append({'keywords': count, 'kind': kind, 'gate': gate,
+                                'seconds': seconds, 'mb_per_sec': len(text) / seconds / 1e6})
+    return results
+
+BENCHMARKS = {
+    'throughput': bench_throughput,
+    'expect': bench_expect,
+    'write': bench_write,
+    'parse': bench_parse,
+    'keywords': bench_keywords,
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark of serial_wrapper console pipeline and parsers')
+    parser.add_argument('-o', '--output', help='JSON result file, print to stdout if not set')
+    parser.add_argument('--quick', action='store_true', help='Smaller data for smoke run')
+    parser.add_argument('--only', help='Comma separated benchmarks: {}'.format(','.join(sorted(BENCHMARKS))))
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.ERROR)
+    names = args.only.split(',') if args.only else sorted(BENCHMARKS)
+    folder = tempfile.mkdtemp()
+    report = {
+        'meta': {
+            'time': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'quick': args.quick,
+        },
+        'results': {},
+    }
+    try:
+        for name in names:
+            start = time.time()
+            report['results'][name] = BENCHMARKS[name](folder, args.quick)
+            print("{0}: {1:.1f}s".format(name, time.time() - start), file=sys.stderr)
+    finally:
+        shutil.rmtree(folder)
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as output_f:
+            output_f.write(output)
+    else:
+        print(output)
+    return report
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,12 @@
 from .serial_wrapper import SerialThread
+from .serial_wrapper import READER_POLL, READER_EVENT
+from .serial_clock import CLOCK
+from .serial_hub import SerialHub
 from .serial_linux import SerialLinux
 from .serial_android import SerialAndroid
 from .serial_android import Intent
+from .serial_fleet import SerialFleet
+from .serial_pool import PortPool, PORT_POOL
+import sys as _sys
+if _sys.version_info >= (3, 5):
+    from .serial_async import AsyncSerialThread, AsyncSerialLinux, AsyncSerialAndroid
@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+'''
+pyserial URL handler of replay://, found by serial_for_url through serial.protocol_handler_packages
+'''
+from .serial_replay import ReplaySerial as Serial
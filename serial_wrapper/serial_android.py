@@ -60,9 +60,11 @@ class SerialAndroid(SerialLinux):
     pm_setting_re = re.compile(r'(Package|Component) [\w\.]*? new state: (disabled|enabled)')
     error_re = re.compile(r'Error: (.*)')
     warn_re = re.compile(r'Warning: (.*)')
+    prop_re = re.compile(r'\[([^]]+)\]: \[([^]]+)\]')
 
-    def __init__(self, serial_port, coding=DEFAULTCODING, serial_config=None, console_monitor=True, logger=None):
-        super(SerialAndroid, self).__init__(serial_port, coding, serial_config, console_monitor, logger)
+    def __init__(self, serial_port, coding=DEFAULTCODING, serial_config=None, console_monitor=True, logger=None,
+                 **kwargs):
+        super(SerialAndroid, self).__init__(serial_port, coding, serial_config, console_monitor, logger, **kwargs)
 
     def su_enter(self):
         '''
@@ -403,7 +405,6 @@ class SerialAndroid(SerialLinux):
         Do getprop
         Output: return props dict or raise AndroidInvalidOutputException
         '''
-        prop_re = re.compile(r'\[([^]]+)\]: \[([^]]+)\]')
         cmd = u'getprop'
         try:
             ret, exit_code, raw_data = self.exitcode_expect_for_write(cmd, repeat=True, repeat_gap=3, timeout=10)
@@ -412,20 +413,25 @@ class SerialAndroid(SerialLinux):
             raise AndroidInvalidOutputException
         else:
             if ret:
-                if exit_code == u'0':
-                    prop_p = prop_re.findall(raw_data)
-                    if prop_p:
-                        return dict({v[0]: v[1] for v in prop_p})
-                    else:
-                        self.logger.error("getprop: fail to find any prop")
-                        self.logger.error("getprop: %r", raw_data)
-                else:
-                    self.logger.error("getprop: fail to find getprop")
+                return self._getprops_parse(exit_code, raw_data)
             else:
                 self.logger.critical("getprop unknown status")
                 self.logger.error("getprop: %r", raw_data)
         raise AndroidInvalidOutputException
 
+    def _getprops_parse(self, exit_code, raw_data):
+        '''Get props dict from output of getprop'''
+        if exit_code == u'0':
+            prop_p = self.prop_re.findall(raw_data)
+            if prop_p:
+                return dict({v[0]: v[1] for v in prop_p})
+            else:
+                self.logger.error("getprop: fail to find any prop")
+                self.logger.error("getprop: %r", raw_data)
+        else:
+            self.logger.error("getprop: fail to find getprop")
+        raise AndroidInvalidOutputException
+
     def setprop(self, key, value):
         '''
         Do setprop
@@ -451,15 +457,7 @@ class SerialAndroid(SerialLinux):
             raise AndroidInvalidOutputException
         else:
             if ret:
-                if exit_code == u'0':
-                    prop_p = re.findall(r'#\[([^]]*)\]#', raw_data)
-                    if prop_p and prop_p[-1]:
-                        return prop_p[-1]
-                    else:
-                        self.logger.error("getprop: fail to find %s by regex", item)
-                        self.logger.error("getprop: %r", raw_data)
-                else:
-                    self.logger.error("getprop: fail to find %s by grep", item)
+                return self._getprop_parse(item, exit_code, raw_data)
             else:
                 self.logger.critical("getprop unknown status")
                 self.logger.error("getprop: %r", raw_data)
@@ -467,6 +465,19 @@ class SerialAndroid(SerialLinux):
             self.write(chr(3))
         raise AndroidInvalidOutputException
 
+    def _getprop_parse(self, item, exit_code, raw_data):
+        '''Get value of item from output of getprop item'''
+        if exit_code == u'0':
+            prop_p = re.findall(r'#\[([^]]*)\]#', raw_data)
+            if prop_p and prop_p[-1]:
+                return prop_p[-1]
+            else:
+                self.logger.error("getprop: fail to find %s by regex", item)
+                self.logger.error("getprop: %r", raw_data)
+        else:
+            self.logger.error("getprop: fail to find %s by grep", item)
+        raise AndroidInvalidOutputException
+
     def getprop_android_sdk_version(self):
         return self.getprop('ro.build.version.sdk')
 
@@ -489,6 +500,19 @@ class SerialAndroid(SerialLinux):
         return wakelocks
 
     def dumpsys(self, service=None):
+        if service:
+            cmd = u'dumpsys {}'.format(service)
+        else:
+            cmd = u'dumpsys'
+        try:
+            _, _, raw_data = self.exitcode_expect_for_write(cmd, timeout=60)
+        except SerialTimeoutException:
+            self.logger.warning("cat dumpsys no response")
+            raise AndroidInvalidOutputException
+        return self._dumpsys_parse(service, raw_data)
+
+    def _dumpsys_parse(self, service, raw_data):
+        '''Parse output of dumpsys service, return raw_data if service has no parser'''
         def dumpsys_power(dumpsys_power_str):
             def key_value_handler(strings):
                 def value_conv(value):
@@ -641,15 +665,6 @@ class SerialAndroid(SerialLinux):
                     component_str = dumpsys_power_str[find_index:find_end+1]
                 final_res[head_keyword.replace(u':', u'')] = handler(component_str)
             return final_res
-        if service:
-            cmd = u'dumpsys {}'.format(service)
-        else:
-            cmd = u'dumpsys'
-        try:
-            _, _, raw_data = self.exitcode_expect_for_write(cmd, timeout=60)
-        except SerialTimeoutException:
-            self.logger.warning("cat dumpsys no response")
-            raise AndroidInvalidOutputException
         service_map = {
             'power': dumpsys_power
         }
@@ -0,0 +1,549 @@
+# -*- coding: utf-8 -*-
+'''
+asyncio API of SerialThread/SerialLinux/SerialAndroid (Python 3.5+, POSIX port with fd)
+Port fd is watched by event loop reader instead of reader/notify threads,
+so many ports and thousands of expects can wait on one event loop
+'''
+import asyncio
+import logging
+import os
+import time
+
+# 3rd Module
+import serial
+from serial import SerialException
+
+from .serial_wrapper import SerialThread
+from .serial_wrapper import BaseHandler
+from .serial_wrapper import HandlerQueue
+from .serial_wrapper import incremental_decoder
+from .serial_wrapper import byte_view
+from .serial_wrapper import DEFAULTCODING
+from .serial_wrapper import DEFAULT_LOGGING_LEVEL
+from .serial_wrapper import DEFAULT_SERIAL_CONFIG
+from .serial_wrapper import HEXMODE
+from .serial_wrapper import MAX_SERIAL_EXCEPTION_TIMES
+from .serial_wrapper import HANDLER_QUEUE_SIZE
+from .serial_wrapper import SerialWrapperException
+from .serial_wrapper import SerialTimeoutException
+from .serial_matcher import StreamMatcher
+from .serial_clock import CLOCK
+from .serial_stats import SerialStats
+from .serial_linux import SerialLinux
+from .serial_linux import InvalidOutputException
+from .serial_linux import ExitNonZeroException
+from .serial_linux import NotFoundException
+from .serial_android import SerialAndroid
+from .serial_android import AndroidInvalidOutputException
+from .serial_android import AndroidNotFoundException
+
+# get_running_loop is Python 3.7+, get_event_loop is deprecated outside running loop
+_get_running_loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+class ExpectWaiter(BaseHandler):
+    '''Handler which feed StreamMatcher in event loop and wake up expect coroutine once matched'''
+    stats_name = 'expect'
+
+    def __init__(self, future, keywords, expect_all=False, logger=None, coding=None):
+        super(ExpectWaiter, self).__init__(logger, coding)
+        self.future = future
+        self.matcher = StreamMatcher(keywords, expect_all)
+        self.chunks = []
+        self.blank = b'' if self.coding == HEXMODE else u''
+
+    def update(self, serialthread, data_tuple):
+        data = data_tuple[0]
+        self.chunks.append(data)
+        if self.matcher.done:
+            return
+        self.feed(data)
+        if self.matcher.done and serialthread is not None:
+            serialthread._stats.add_match(CLOCK.elapsed(data_tuple[1]))
+
+    def feed(self, data):
+        '''Feed data to matcher, set result of future once matched'''
+        for found in self.matcher.feed(data):
+            self.logger.info("Found: {}".format(found))
+        if self.matcher.done and not self.future.done():
+            self.future.set_result(True)
+
+    def readall(self):
+        '''Return all data since waiter created'''
+        return self.blank.join(self.chunks)
+
+    def close(self):
+        self.chunks = []
+
+class AsyncSerialThread(object):
+    '''
+    asyncio version of SerialThread
+    It can offer write/expect/wait_for_strings/wait_for_string/expects_for_write as coroutine, and create_logger
+    '''
+    _dispatch = SerialThread._dispatch
+    _decoding = SerialThread._decoding
+    _encoding = SerialThread._encoding
+    enable_trace = SerialThread.enable_trace
+    disable_trace = SerialThread.disable_trace
+    enable_stats = SerialThread.enable_stats
+    disable_stats = SerialThread.disable_stats
+    stats = SerialThread.stats
+    start_stats_reporter = SerialThread.start_stats_reporter
+    stop_stats_reporter = SerialThread.stop_stats_reporter
+    flush_loggers = SerialThread.flush_loggers
+    create_logger = SerialThread.create_logger
+    close_logger = SerialThread.close_logger
+
+    def __init__(self, serial_port, coding=DEFAULTCODING, serial_config=None, logger=None, loop=None):
+        '''
+        Init AsyncSerialThread and add port fd into event loop, if open serial_port fail, will raise Exception
+        Input:
+                serial_port/coding/serial_config/logger: see SerialThread
+                loop: event loop (asyncio loop)[None for running event loop, must be given if created
+                                                 outside coroutine]
+        '''
+        if logger is not None:
+            self.logger = logger
+        else:
+            self.logger = logging
+            self.logger.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s',
+                                    level=DEFAULT_LOGGING_LEVEL)
+        self.loop = loop
+        self._serial = serial.serial_for_url(serial_port, do_not_open=True) # URL port must have fd
+        self.logger.info("Async Serial Init: Port - {0}({1})".format(self._serial.port, self._serial.name))
+        self.coding = coding if coding else DEFAULTCODING
+        self.logger.info("Serial Coding: {0}".format(self.coding))
+        self._decoder = None if self.coding == HEXMODE else incremental_decoder(self.coding)
+        self._serial_config = dict(DEFAULT_SERIAL_CONFIG)
+        if serial_config is not None:
+            self._serial_config.update(serial_config)
+        self._serial.apply_settings(self._serial_config)
+        self._serial_fd = None
+        self._serial_handlers = []
+        self._handler_queues = {}
+        self._serial_expection_time = 0
+        self.tracer = None
+        self.stats_enabled = False
+        self.log_payload = True # Log data of every write at INFO, can be set False for bulk input
+        self._handler_seq = 0
+        self._stats = SerialStats()
+        self._stats_reporter = None
+        self.alive = False
+        self.start()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def start(self):
+        '''Open serial and watch port fd by event loop'''
+        if self.loop is None:
+            # Loop running the caller, create AsyncSerialThread in coroutine or give loop explicitly
+            self.loop = _get_running_loop()
+        try:
+            self._serial.open()
+            self._serial.reset_input_buffer()
+            self._serial.reset_output_buffer()
+            self._serial_fd = self._serial.fileno()
+        except (SerialException, AttributeError) as err:
+            self.logger.critical("Fail to open {0} with fd: {1!r}".format(self._serial.port, err))
+            raise SerialWrapperException
+        self.loop.add_reader(self._serial_fd, self._on_readable)
+        self.alive = True
+        self.logger.info("Async Serial Start Success")
+
+    def stop(self):
+        '''Stop watching port fd, remove all exist handler and fail all waiting expect'''
+        self.logger.info("Async Serial Stop Start")
+        self.stop_stats_reporter()
+        if self.alive:
+            self.loop.remove_reader(self._serial_fd)
+            self.alive = False
+        for handler in self._serial_handlers[:]:
+            if isinstance(handler, ExpectWaiter) and not handler.future.done():
+                handler.future.set_exception(SerialWrapperException("Serial Stop"))
+            self._remove_handler(handler)
+        self.logger.info("Async Serial Stop Complete")
+
+    def close(self):
+        '''Stop and Close Serial'''
+        self.stop()
+        self._serial.close()
+        self.logger.info("Async Serial Close Complete")
+
+    def _on_readable(self):
+        '''Read data from serial once port fd readable, and notify all handler'''
+        try:
+            buff_size = self._serial.in_waiting
+            if not buff_size:
+                raise SerialException("Readable without data")
+            data = self._serial.read(buff_size)
+        except SerialException:
+            self._serial_expection_time += 1
+            self._stats.read_exceptions += 1
+            self.logger.error("Read Serial Exception. Time: %d", self._serial_expection_time)
+            if self._serial_expection_time > MAX_SERIAL_EXCEPTION_TIMES:
+                self.logger.critical("Serial Operation Exception Up to MAX")
+                self.stop()
+            return
+        self._serial_expection_time = 0
+        self._stats.add_read(len(data))
+        self._dispatch((data, CLOCK.now()))
+
+    def _add_handler(self, handler, queue_policy=None, queue_size=HANDLER_QUEUE_SIZE):
+        '''Add handler, see SerialThread._add_handler'''
+        if handler in self._handler_queues or handler in self._serial_handlers:
+            self.logger.warning("Handler({}) already in handerlist".format(handler))
+            return
+        if getattr(handler, 'stats_name', None) is None:
+            self._handler_seq += 1
+            handler.stats_name = "{0}-{1}".format(type(handler).__name__, self._handler_seq)
+        if queue_policy is not None:
+            handler_queue = HandlerQueue(handler, logger=self.logger, maxsize=queue_size, policy=queue_policy)
+            handler_queue.start()
+            self._handler_queues[handler] = handler_queue
+            handler = handler_queue
+        self._serial_handlers.append(handler)
+        self.logger.debug("Add Handler({})".format(handler))
+
+    def _remove_handler(self, handler):
+        '''Remove handler, see SerialThread._remove_handler'''
+        handler_queue = handler if isinstance(handler, HandlerQueue) else self._handler_queues.get(handler)
+        if handler_queue is not None:
+            self._handler_queues.pop(handler_queue.handler, None)
+            handler = handler_queue
+        if handler in self._serial_handlers:
+            self._serial_handlers.remove(handler)
+            self.logger.debug("Remove Handler({})".format(handler))
+        if handler_queue is not None:
+            handler_queue.stop()
+
+    def _wait_writable(self):
+        '''Return future which done once port fd writable'''
+        future = self.loop.create_future()
+        def writable():
+            self.loop.remove_writer(self._serial_fd)
+            if not future.done():
+                future.set_result(True)
+        self.loop.add_writer(self._serial_fd, writable)
+        return future
+
+    async def write(self, data, log_payload=None):
+        '''
+        Write data to serial, wait port fd writable instead of blocking event loop
+        Input: data (str/bytes/bytearray/memoryview)
+               log_payload (bool)[Log data at INFO, None for self.log_payload]
+        Output: True
+        '''
+        if not data:
+            self.logger.warning("Write nothing to serial")
+            return True
+        view = byte_view(self._encoding(data))
+        size = len(view)
+        while len(view):
+            try:
+                written = os.write(self._serial_fd, view)
+            except BlockingIOError:
+                written = 0
+            except OSError as err:
+                self.logger.critical("Write Serial Exception: {!r}".format(err))
+                raise SerialWrapperException
+            view = view[written:]
+            if len(view):
+                await self._wait_writable()
+        self._stats.add_write(size)
+        if log_payload if log_payload is not None else self.log_payload:
+            self.logger.info("Write: {!r}".format(data.tobytes() if isinstance(data, memoryview) else data))
+        else:
+            self.logger.debug("Write: %d bytes", size)
+        return True
+
+    async def input_output_blocking(self, sinput, expect, timeout=None, *args, **kwargs):
+        '''
+        Coroutine version of SerialThread.input_output_blocking
+        sinput[0] can be str/bytes (write to serial), function or coroutine function
+        '''
+        expect_list, expect_all = expect
+        assert isinstance(expect_list, list)
+        future = self.loop.create_future()
+        waiter = ExpectWaiter(future, expect_list, expect_all, logger=self.logger, coding=self.coding)
+        self._add_handler(waiter)
+        try:
+            waiter.feed(waiter.blank) # Keyword like blank string match without data
+            if isinstance(sinput[0], (str, bytes)):
+                func = lambda: self.write(sinput[0])
+            else:
+                func = lambda: sinput[0](*args, **kwargs)
+            input_repeat, input_gap = sinput[1] and sinput[0], sinput[2]
+            deadline = self.loop.time() + timeout if timeout else None
+            if sinput[0]: # If Input is blank string, skip self.write
+                res = func()
+                if asyncio.iscoroutine(res) or isinstance(res, asyncio.Future):
+                    await res
+            while not future.done():
+                wait_time = None if deadline is None else deadline - self.loop.time()
+                if input_repeat:
+                    wait_time = input_gap if wait_time is None else min(wait_time, input_gap)
+                if wait_time is None or wait_time > 0:
+                    await asyncio.wait([future], timeout=wait_time)
+                if future.done():
+                    break
+                if deadline is not None and self.loop.time() >= deadline:
+                    self.logger.warning("Find String TIMEOUT!")
+                    self.flush_loggers()
+                    raise SerialTimeoutException
+                if not input_repeat:
+                    continue # Loop timer fires a little early (clock_resolution), wait rest of timeout
+                res = func()
+                if asyncio.iscoroutine(res) or isinstance(res, asyncio.Future):
+                    await res
+            future.result() # Raise exception if serial stop
+            if expect_all:
+                self.logger.info("All Keywords Found")
+            return True, waiter.matcher.found[:], waiter.readall()
+        finally:
+            self._remove_handler(waiter)
+
+    async def wait_for_strings(self, keywordlist, all_=False, timeout=None):
+        '''Coroutine version of SerialThread.wait_for_strings'''
+        return await self.input_output_blocking((u'', False, 0), (keywordlist, all_), timeout=timeout)
+
+    async def wait_for_string(self, keyword, timeout=None):
+        '''Coroutine version of SerialThread.wait_for_string'''
+        return await self.wait_for_strings([keyword], timeout=timeout)
+
+    async def expect(self, keywords, all_=False, timeout=None):
+        '''
+        Blocking until find keywords
+        Input: keywords (str/re/list)
+               all_ (bool) [True for find all keywords, False for find one of keywords]
+               timeout (float)
+        Output: see wait_for_strings
+        '''
+        if not isinstance(keywords, list):
+            keywords = [keywords]
+        return await self.wait_for_strings(keywords, all_=all_, timeout=timeout)
+
+    async def expects_for_write(self, input_data, keywordlist, repeat=False, repeat_gap=1, all_=False,
+                                timeout=None):
+        '''Coroutine version of SerialThread.expects_for_write'''
+        sinput = (input_data, repeat, repeat_gap)
+        return await self.input_output_blocking(sinput, (keywordlist, all_), timeout=timeout)
+
+    async def expect_for_write(self, input_data, keyword, repeat=False, repeat_gap=1, timeout=None):
+        '''Coroutine version of SerialThread.expect_for_write'''
+        return await self.expects_for_write(input_data, [keyword], repeat, repeat_gap, False, timeout)
+
+class AsyncSerialLinux(AsyncSerialThread):
+    '''asyncio version of SerialLinux, parsers are shared with SerialLinux'''
+    file_property_nose_re = SerialLinux.file_property_nose_re
+    ifconfig_re = SerialLinux.ifconfig_re
+    id_re = SerialLinux.id_re
+    _exitcode_cmd = SerialLinux._exitcode_cmd
+    _exitcode_parse = SerialLinux._exitcode_parse
+    _id_parse = SerialLinux._id_parse
+    _files_property_parse = SerialLinux._files_property_parse
+    _interface_list_parse = SerialLinux._interface_list_parse
+    _selinux_parse = SerialLinux._selinux_parse
+    _md5sum_parse = SerialLinux._md5sum_parse
+    _meminfo_parse = SerialLinux._meminfo_parse
+
+    async def exitcode_expect_for_write(self, cmd, repeat=False, repeat_gap=1, timeout=None):
+        '''Coroutine version of SerialLinux.exitcode_expect_for_write'''
+        uid, exitcode_cmd, exitecho_re = self._exitcode_cmd(cmd)
+        ret, res_l, raw_data = await self.expect_for_write(
+            exitcode_cmd, exitecho_re, repeat=repeat, repeat_gap=repeat_gap, timeout=timeout)
+        exit_code, raw_data = self._exitcode_parse(uid, exitecho_re, res_l, raw_data)
+        return ret, exit_code, raw_data
+
+    async def command_output(self, cmd, timeout=None):
+        '''Coroutine version of SerialLinux.command_output'''
+        cmd_ = u'echo \'[!Start!]\';{}'.format(cmd)
+        _, exit_code, raw_data = await self.exitcode_expect_for_write(cmd_, timeout=timeout)
+        raw_data = raw_data[raw_data.rfind('[!Start!]')+9:].strip()
+        return exit_code, raw_data
+
+    async def is_root(self):
+        '''Coroutine version of SerialLinux.is_root'''
+        await self.write(chr(26))
+        await self.write('\n')
+        try:
+            ret, res_l, _ = await self.expect_for_write(u'id\n', self.id_re, repeat=True, timeout=3)
+        except SerialTimeoutException:
+            self.logger.warning("Checking id No response")
+            raise InvalidOutputException
+        if not ret:
+            raise InvalidOutputException
+        return self._id_parse(res_l[0])
+
+    async def remount(self, target, options=u'rw'):
+        '''Coroutine version of SerialLinux.remount'''
+        cmd = u'mount -o {0},remount {1}'.format(options, target)
+        try:
+            ret, exitcode, raw_data = await self.exitcode_expect_for_write(cmd, timeout=5)
+        except SerialTimeoutException:
+            self.logger.warning("remount No response")
+            raise InvalidOutputException
+        if not ret:
+            raise InvalidOutputException
+        if exitcode == u'0':
+            return
+        self.logger.error("remount exit with %s. Raw Data: %r", exitcode, raw_data)
+        raise ExitNonZeroException
+
+    async def remount_system(self):
+        await self.remount(u'/system', u'rw')
+
+    async def reboot(self):
+        await self.write(u'reboot\n')
+
+    async def files_property(self, folderpath, timeformat='%Y-%m-%d %H:%M'):
+        '''Coroutine version of SerialLinux.files_property'''
+        cmd = u'ls -al "{}"'.format(folderpath)
+        try:
+            ret, _, raw_data = await self.exitcode_expect_for_write(cmd, timeout=5)
+        except SerialTimeoutException:
+            self.logger.warning("ls No response")
+            raise InvalidOutputException
+        if not ret:
+            if u'No such file or directory' in raw_data:
+                raise NotFoundException
+            raise InvalidOutputException
+        return self._files_property_parse(raw_data, timeformat)
+
+    async def file_remove(self, filepath, timeout=60):
+        '''Coroutine version of SerialLinux.file_remove'''
+        cmd = u'rm -rf "{0}"'.format(filepath)
+        try:
+            ret, exitcode, raw_data = await self.exitcode_expect_for_write(cmd, timeout=timeout)
+        except SerialTimeoutException:
+            self.logger.warning("rm No response")
+            raise InvalidOutputException
+        if not ret:
+            raise InvalidOutputException
+        if exitcode == u'0':
+            return
+        self.logger.error("rm -rf exit with %s. Raw Data: %r", exitcode, raw_data)
+        raise ExitNonZeroException
+
+    async def interface_list_get(self):
+        '''Coroutine version of SerialLinux.interface_list_get'''
+        try:
+            ret, _, raw_data = await self.exitcode_expect_for_write(u'ifconfig', timeout=5)
+        except SerialTimeoutException:
+            self.logger.warning("ifconfig No response")
+            raise InvalidOutputException
+        if not ret:
+            raise InvalidOutputException
+        return self._interface_list_parse(raw_data)
+
+    async def selinux_get(self):
+        exit_code, res = await self.command_output(u'getenforce', timeout=5)
+        return self._selinux_parse(exit_code, res)
+
+    async def selinux_set(self, to_disable=True):
+        value = u'0' if to_disable else u'1'
+        exit_code, res = await self.command_output(u'setenforce ' + value, timeout=5)
+        if exit_code != u'0':
+            self.logger.warning("Set SELinux to %s Failed: %s", value, res.strip())
+            raise InvalidOutputException
+
+    async def md5sum(self, filepath, timeout=5):
+        exit_code, res = await self.command_output(u'md5sum ' + filepath, timeout=timeout)
+        return self._md5sum_parse(filepath, exit_code, res)
+
+    async def meminfo(self):
+        exit_code, res = await self.command_output(u'cat /proc/meminfo', timeout=5)
+        return self._meminfo_parse(exit_code, res)
+
+class AsyncSerialAndroid(AsyncSerialLinux):
+    '''asyncio version of SerialAndroid, parsers are shared with SerialAndroid'''
+    prop_re = SerialAndroid.prop_re
+    _getprops_parse = SerialAndroid._getprops_parse
+    _getprop_parse = SerialAndroid._getprop_parse
+    _dumpsys_parse = SerialAndroid._dumpsys_parse
+
+    async def su_enter(self):
+        '''Coroutine version of SerialAndroid.su_enter'''
+        try:
+            if await self.is_root():
+                return
+        except InvalidOutputException:
+            self.logger.warning("Get Root Status Fail")
+            await asyncio.sleep(1)
+        try:
+            _, res_l, _ = await self.expects_for_write(u'su\n', [u'root', u'su: not found', u' # '], timeout=5)
+        except SerialTimeoutException:
+            raise AndroidInvalidOutputException
+        if res_l[0] in (u'root', u' # '):
+            self.logger.info("Enter su")
+            return
+        if res_l[0] == u'su: not found':
+            self.logger.error("There is no su in PATH")
+            raise AndroidNotFoundException
+
+    async def su_exit(self):
+        '''Coroutine version of SerialAndroid.su_exit'''
+        if not await self.is_root():
+            return
+        try:
+            ret, _, _ = await self.expects_for_write(u'exit\n', [u'shell', u' $ '])
+        except SerialTimeoutException:
+            self.logger.warning("exit no response")
+            raise AndroidInvalidOutputException
+        if not ret:
+            raise AndroidInvalidOutputException
+
+    async def wait_boot_complete(self, timeout=60):
+        '''Coroutine version of SerialAndroid.wait_boot_complete'''
+        start = time.time()
+        while time.time() - start <= timeout:
+            try:
+                if await self.getprop('dev.bootcomplete') == '1':
+                    self.logger.info("Android Boot Complete")
+                    return
+            except AndroidInvalidOutputException:
+                await asyncio.sleep(0.5)
+        self.logger.warning("Android Boot up timeout")
+        raise AndroidInvalidOutputException
+
+    async def getprops(self):
+        '''Coroutine version of SerialAndroid.getprops'''
+        try:
+            ret, exit_code, raw_data = await self.exitcode_expect_for_write(
+                u'getprop', repeat=True, repeat_gap=3, timeout=10)
+        except SerialTimeoutException:
+            self.logger.warning("getprop no response")
+            raise AndroidInvalidOutputException
+        if not ret:
+            raise AndroidInvalidOutputException
+        return self._getprops_parse(exit_code, raw_data)
+
+    async def getprop(self, item):
+        '''Coroutine version of SerialAndroid.getprop'''
+        cmd = u'echo "#[$(getprop {})]#"'.format(item)
+        try:
+            ret, exit_code, raw_data = await self.exitcode_expect_for_write(
+                cmd, repeat=True, repeat_gap=1, timeout=10)
+        except SerialTimeoutException:
+            self.logger.warning("getprop no response")
+            raise AndroidInvalidOutputException
+        finally:
+            await self.write(chr(3))
+        if not ret:
+            raise AndroidInvalidOutputException
+        return self._getprop_parse(item, exit_code, raw_data)
+
+    async def setprop(self, key, value):
+        await self.write(u' '.join([u'setprop', key, value, u'\n']))
+
+    async def dumpsys(self, service=None):
+        '''Coroutine version of SerialAndroid.dumpsys'''
+        cmd = u'dumpsys {}'.format(service) if service else u'dumpsys'
+        try:
+            _, _, raw_data = await self.exitcode_expect_for_write(cmd, timeout=60)
+        except SerialTimeoutException:
+            self.logger.warning("cat dumpsys no response")
+            raise AndroidInvalidOutputException
+        return self._dumpsys_parse(service, raw_data)
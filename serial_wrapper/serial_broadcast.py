@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+'''
+Console broadcast server: many viewers (localhost TCP or Unix socket) watch one serial,
+update in notify thread only appends to bounded buffer of every viewer, sockets are served by own thread,
+so slow viewer never blocks serial; input of viewers can be written back to serial by own input thread,
+so blocking serial write never stalls viewers
+Viewer can be serial_monitor.py (python serial_monitor.py <port or unix path> <coding>), nc, socat ...
+'''
+import os
+import errno
+import socket
+import select
+import binascii
+import threading
+import logging
+from collections import deque
+
+from .serial_wrapper import BaseHandler
+from .serial_wrapper import HEXMODE
+from .serial_wrapper import LOCALHOST
+from .serial_wrapper import SOCKET_STOPFLAG
+from .serial_wrapper import SerialWrapperException
+
+BROADCAST_CLIENT_BUFFER = 1024 * 1024   # Max bytes waiting to be sent for one viewer
+BROADCAST_MAX_CLIENTS = 16
+BROADCAST_SELECT_GAP = 0.5              # Max block time of server thread, bound stop latency
+BROADCAST_RECV_SIZE = 4096
+BROADCAST_INPUT_BUFFER = 64 * 1024      # Max bytes of viewer input waiting to be written to serial
+SLOW_DROP = 'drop'                      # Disconnect viewer once its buffer is full
+SLOW_SKIP = 'skip'                      # Skip data for viewer once its buffer is full, keep connection
+
+_WOULDBLOCK = (errno.EAGAIN, errno.EWOULDBLOCK, getattr(errno, 'WSAEWOULDBLOCK', errno.EWOULDBLOCK))
+
+class BroadcastClient(object):
+    '''One viewer: socket and data not sent yet'''
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.buffer = bytearray()
+        self.skipped = 0 # Bytes skipped for SLOW_SKIP
+        self.sent = 0
+        self.closing = False # Buffer full for SLOW_DROP, closed by server thread
+
+    def __repr__(self):
+        return "BroadcastClient({!r})".format(self.addr)
+
+class BroadcastServer(BaseHandler):
+    '''
+    Raw handler which broadcasts serial data to all connected viewers without blocking notify thread
+    '''
+    raw = True
+
+    def __init__(self, address=0, logger=None, coding=None, client_buffer=BROADCAST_CLIENT_BUFFER,
+                 slow_policy=SLOW_DROP, input_enabled=False, max_clients=BROADCAST_MAX_CLIENTS):
+        '''
+        Input:
+                address: port on localhost (int)[0 for any free port] or Unix socket path (str)
+                logger: logging-like
+                coding: coding of serial (str)[HEXMODE data is sent as hexlify lines]
+                client_buffer: max bytes waiting to be sent for one viewer (int)
+                slow_policy: SLOW_DROP/SLOW_SKIP for viewer whose buffer is full
+                input_enabled: write data received from viewers to serial (bool)
+                max_clients: max viewers connected at once (int)
+        '''
+        assert slow_policy in (SLOW_DROP, SLOW_SKIP), "Invalid slow_policy: {}".format(slow_policy)
+        self.listen_socket = None
+        self.thread = None
+        super(BroadcastServer, self).__init__(logger if logger is not None else logging, coding)
+        self.address = address
+        self.client_buffer = client_buffer
+        self.slow_policy = slow_policy
+        self.input_enabled = input_enabled
+        self.max_clients = max_clients
+        self.serialthread = None # Set by SerialThread.create_broadcast_server, for input of viewers
+        self.clients = []
+        self.dropped = 0 # Viewers disconnected for SLOW_DROP
+        self.lock = threading.Lock()
+        self.alive = False
+        self.input_queue = deque() # Viewer input waiting for input thread
+        self.input_size = 0
+        self.input_dropped = 0 # Bytes of viewer input dropped for buffer full or write fail
+        self.input_cond = threading.Condition()
+        self.input_thread = None
+        self._wakeup_r = self._wakeup_w = None
+        self._wakeup_pending = False
+
+    def __repr__(self):
+        return "BroadcastServer({!r})".format(self.address)
+
+    def start(self):
+        '''Listen on address and start server thread, address is updated to bound port for port 0'''
+        if isinstance(self.address, int):
+            self.listen_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.listen_socket.bind((LOCALHOST, self.address))
+            self.address = self.listen_socket.getsockname()[1]
+        else:
+            if os.path.exists(self.address):
+                os.remove(self.address) # Stale socket file of last run
+            self.listen_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.listen_socket.bind(self.address)
+        self.listen_socket.listen(self.max_clients)
+        self.listen_socket.setblocking(False)
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_w.setblocking(False)
+        self.alive = True
+        self.thread = threading.Thread(target=self._run, name='broadcast')
+        self.thread.daemon = True
+        self.thread.start()
+        if self.input_enabled:
+            self.input_thread = threading.Thread(target=self._input_writer, name='broadcast-input')
+            self.input_thread.daemon = True
+            self.input_thread.start()
+        self.logger.info("Broadcast Server Start: {}".format(self.address))
+        return self.address
+
+    def update(self, serialthread, data_tuple):
+        '''Append data to buffer of every viewer, never block on socket'''
+        data = data_tuple[0]
+        if self.coding == HEXMODE:
+            data = binascii.hexlify(data) + b'\n'
+        with self.lock:
+            if not self.clients:
+                return
+            for client in self.clients:
+                if client.closing:
+                    continue
+                if len(client.buffer) + len(data) > self.client_buffer:
+                    if self.slow_policy == SLOW_DROP:
+                        client.closing = True
+                        self.dropped += 1
+                    else:
+                        client.skipped += len(data)
+                    continue
+                client.buffer += data
+            self._wakeup()
+
+    def _wakeup(self):
+        '''Wake up server thread to send, called with self.lock'''
+        if self._wakeup_pending:
+            return
+        self._wakeup_pending = True
+        try:
+            self._wakeup_w.send(b'w')
+        except socket.error:
+            pass # Wakeup already pending in socket
+
+    def _run(self):
+        '''Accept viewers, send buffers, read viewer input, until stop'''
+        while self.alive:
+            with self.lock:
+                clients = list(self.clients)
+                writers = [client.sock for client in clients if client.buffer]
+            readers = [self.listen_socket, self._wakeup_r] + [client.sock for client in clients]
+            try:
+                readable, writable, _ = select.select(readers, writers, [], BROADCAST_SELECT_GAP)
+            except (select.error, ValueError, socket.error) as err:
+                self.logger.error("Broadcast select fail: {!r}".format(err))
+                continue
+            if self._wakeup_r in readable:
+                with self.lock:
+                    self._wakeup_pending = False
+                    self._wakeup_r.recv(BROADCAST_RECV_SIZE)
+            if self.listen_socket in readable:
+                self._accept()
+            for client in clients:
+                if client.sock in readable:
+                    self._receive(client)
+                if client.sock in writable and not client.closing:
+                    self._send(client)
+                if client.closing:
+                    self._remove(client)
+
+    def _accept(self):
+        try:
+            sock, addr = self.listen_socket.accept()
+        except socket.error:
+            return
+        with self.lock:
+            if len(self.clients) >= self.max_clients:
+                self.logger.warning("Broadcast viewers up to max {}, reject {!r}".format(self.max_clients, addr))
+                sock.close()
+                return
+            sock.setblocking(False)
+            self.clients.append(BroadcastClient(sock, addr))
+        self.logger.info("Broadcast Viewer Connect: {!r}".format(addr))
+
+    def _receive(self, client):
+        try:
+            data = client.sock.recv(BROADCAST_RECV_SIZE)
+        except socket.error as err:
+            if err.args[0] in _WOULDBLOCK:
+                return
+            data = b''
+        if not data:
+            client.closing = True # Viewer closed
+            return
+        if self.input_enabled and self.serialthread is not None:
+            with self.input_cond:
+                if not self.input_enabled:
+                    return # Disabled by input thread on serial fail
+                if self.input_size + len(data) > BROADCAST_INPUT_BUFFER:
+                    self.input_dropped += len(data)
+                    return
+                self.input_queue.append(data)
+                self.input_size += len(data)
+                self.input_cond.notify()
+
+    def _input_writer(self):
+        '''Write queued viewer input to serial, until stop'''
+        while True:
+            with self.input_cond:
+                while not self.input_queue and self.alive:
+                    self.input_cond.wait()
+                if not self.input_queue:
+                    return
+                data_list = list(self.input_queue)
+                self.input_queue.clear()
+                self.input_size = 0
+            if self.serialthread is None:
+                continue
+            size = sum(len(data) for data in data_list)
+            try:
+                written = self.serialthread.write_many(data_list, log_payload=False)
+            except SerialWrapperException:
+                self.logger.exception("Broadcast Input: serial fail")
+                with self.input_cond:
+                    self.input_enabled = False
+                    self.input_dropped += size + self.input_size
+                    self.logger.error("Broadcast Input: disabled for serial fail, drop {} bytes".format(
+                        size + self.input_size))
+                    self.input_queue.clear()
+                    self.input_size = 0
+                continue
+            except Exception: # pylint: disable=broad-except
+                self.logger.exception("Broadcast Input: write {} bytes fail, keep serving".format(size))
+                written = False
+            if written:
+                self.logger.debug("Broadcast Input: {} bytes".format(size))
+            else:
+                self.logger.warning("Broadcast Input: drop {} bytes not written".format(size))
+                with self.input_cond:
+                    self.input_dropped += size
+
+    def _send(self, client):
+        with self.lock:
+            try:
+                sent = client.sock.send(client.buffer)
+            except socket.error as err:
+                if err.args[0] not in _WOULDBLOCK:
+                    client.closing = True
+                return
+            del client.buffer[:sent]
+            client.sent += sent
+
+    def _remove(self, client):
+        with self.lock:
+            if client in self.clients:
+                self.clients.remove(client)
+            client.buffer = bytearray()
+        try:
+            client.sock.close()
+        except socket.error:
+            pass
+        self.logger.info("Broadcast Viewer Disconnect: {0!r} (Sent: {1}, Skipped: {2})".format(
+            client.addr, client.sent, client.skipped))
+
+    def close(self):
+        '''Stop server thread, send SOCKET_STOPFLAG to viewers and close them'''
+        if self.thread is None:
+            return
+        with self.lock:
+            self.alive = False
+            self._wakeup()
+        self.thread.join()
+        self.thread = None
+        if self.input_thread is not None:
+            with self.input_cond:
+                self.input_cond.notify_all()
+            self.input_thread.join()
+            self.input_thread = None
+        for client in list(self.clients):
+            try:
+                client.sock.send(SOCKET_STOPFLAG)
+            except socket.error:
+                pass
+            self._remove(client)
+        for sock in (self.listen_socket, self._wakeup_r, self._wakeup_w):
+            sock.close()
+        if not isinstance(self.address, int) and os.path.exists(self.address):
+            os.remove(self.address)
+        self.logger.info("Broadcast Server Stop: {0} (Dropped viewers: {1}, Dropped input: {2})".format(
+            self.address, self.dropped, self.input_dropped))
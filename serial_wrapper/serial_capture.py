@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+'''
+Binary capture of serial traffic, keep raw bytes and chunk boundary of every read
+Capture file: header (magic, start time) + records (time offset ns, length, raw bytes)
+Index file (<capture>.idx): sparse (time offset ns, file offset) entries for seek by time
+'''
+import os
+import struct
+import threading
+import logging
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+from .serial_wrapper import BaseHandler
+from .serial_wrapper import IOHandler
+from .serial_clock import CLOCK
+
+CAPTURE_MAGIC = b'SWCAP\x00\x01\x00'
+CAPTURE_HEADER = struct.Struct('<8sd')  # magic, start time (epoch seconds)
+RECORD_HEADER = struct.Struct('<qI')    # time offset from start (ns), length of raw bytes
+INDEX_ENTRY = struct.Struct('<qQ')      # time offset from start (ns), file offset of record
+CAPTURE_INDEX_INTERVAL = 65536      # Write index entry once records written since last entry reach it (bytes)
+INDEX_SUFFIX = '.idx'
+
+_EPOCH = datetime(1970, 1, 1)
+
+def _epoch_seconds(data_time):
+    return (data_time - _EPOCH).total_seconds()
+
+class CaptureFormatException(Exception):
+    pass
+
+class CaptureHandler(BaseHandler):
+    '''
+    Handler which write every chunk from serial to capture file as raw bytes record
+    Time of record never goes back, so index can be searched by bisect
+    '''
+    raw = True
+
+    def __init__(self, filepath, logger=None, coding='UTF-8', index_interval=CAPTURE_INDEX_INTERVAL):
+        '''
+        Input:
+                filepath: capture filepath (str), index is written to filepath + '.idx'
+                logger: logging-like
+                coding: coding of serial (str)[capture always keeps raw bytes]
+                index_interval: bytes of records between index entries (int)
+        '''
+        self.lock = threading.Lock()
+        self.file_handler = self.index_handler = None
+        super(CaptureHandler, self).__init__(logger if logger is not None else logging, coding)
+        self.filepath = filepath
+        self.index_interval = index_interval
+        self.start_time = None # Wall time of first record (datetime)
+        self.start_ns = None # Stamp of first record (monotonic ns, see serial_clock)
+        self.last_stamp = 0
+        self.offset = CAPTURE_HEADER.size
+        self.index_offset = None # File offset of last index entry
+        self.records = 0
+        self.file_handler = open(filepath, 'wb')
+        self.index_handler = open(filepath + INDEX_SUFFIX, 'wb')
+        self.logger.info("Create Capture: {}".format(filepath))
+
+    def update(self, serialthread, data_tuple):
+        data, data_time = data_tuple
+        with self.lock:
+            if self.file_handler.closed:
+                return
+            if self.start_ns is None:
+                self.start_ns = CLOCK.to_ns(data_time)
+                self.start_time = CLOCK.to_datetime(data_time)
+                self.file_handler.write(CAPTURE_HEADER.pack(CAPTURE_MAGIC, _epoch_seconds(self.start_time)))
+            stamp = CLOCK.to_ns(data_time) - self.start_ns
+            if stamp < self.last_stamp:
+                stamp = self.last_stamp # Keep time order for bisect even if clock goes back
+            self.last_stamp = stamp
+            if self.index_offset is None or self.offset - self.index_offset >= self.index_interval:
+                self.index_handler.write(INDEX_ENTRY.pack(stamp, self.offset))
+                self.index_offset = self.offset
+            self.file_handler.write(RECORD_HEADER.pack(stamp, len(data)))
+            self.file_handler.write(data)
+            self.offset += RECORD_HEADER.size + len(data)
+            self.records += 1
+
+    def update_many(self, serialthread, chunks):
+        '''Queued chunks are recorded one by one, so every record keeps its own time'''
+        for data_tuple in chunks:
+            self.update(serialthread, data_tuple)
+
+    def flush(self):
+        with self.lock:
+            if not self.file_handler.closed:
+                self.file_handler.flush()
+                self.index_handler.flush()
+
+    def close(self):
+        with self.lock:
+            for handler in (self.file_handler, self.index_handler):
+                if handler is not None and not handler.closed:
+                    handler.close()
+        self.logger.info("Close Capture: {0} ({1} records)".format(self.filepath, self.records))
+
+class CaptureReader(object):
+    '''
+    Read capture file, seek to time range by sparse index
+    Record is (raw bytes, timestamp (datetime)), same as data tuple in handler update
+    '''
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.file_handler = open(filepath, 'rb')
+        header = self.file_handler.read(CAPTURE_HEADER.size)
+        if len(header) == 0:
+            self.start_time = None # Capture without any record
+        else:
+            if len(header) < CAPTURE_HEADER.size:
+                raise CaptureFormatException("Invalid capture header: {}".format(filepath))
+            magic, start = CAPTURE_HEADER.unpack(header)
+            if magic != CAPTURE_MAGIC:
+                raise CaptureFormatException("Invalid capture magic: {!r}".format(magic))
+            self.start_time = _EPOCH + timedelta(seconds=start)
+        self.index_times = []
+        self.index_offsets = []
+        self._load_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        return self.records()
+
+    def close(self):
+        self.file_handler.close()
+
+    def _load_index(self):
+        '''Load index file, or scan capture to build index if index file not exist'''
+        if self.start_time is None:
+            return
+        try:
+            with open(self.filepath + INDEX_SUFFIX, 'rb') as index_f:
+                index_data = index_f.read()
+        except IOError:
+            index_data = None
+        if index_data:
+            count = len(index_data) // INDEX_ENTRY.size
+            for index in range(count):
+                stamp, offset = INDEX_ENTRY.unpack_from(index_data, index * INDEX_ENTRY.size)
+                self.index_times.append(stamp)
+                self.index_offsets.append(offset)
+            return
+        last_offset = None
+        for stamp, offset, _ in self._scan(CAPTURE_HEADER.size, with_data=False):
+            if last_offset is None or offset - last_offset >= CAPTURE_INDEX_INTERVAL:
+                self.index_times.append(stamp)
+                self.index_offsets.append(offset)
+                last_offset = offset
+
+    def _scan(self, offset, with_data=True):
+        '''Yield (stamp, offset, data) from offset, stop at end or incomplete record'''
+        read = self.file_handler.read
+        self.file_handler.seek(offset)
+        while True:
+            header = read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            stamp, length = RECORD_HEADER.unpack(header)
+            if with_data:
+                data = read(length)
+                if len(data) < length:
+                    return
+            else:
+                data = None
+                self.file_handler.seek(length, os.SEEK_CUR)
+            yield stamp, offset, data
+            offset += RECORD_HEADER.size + length
+
+    def _to_stamp(self, time_point):
+        '''Convert datetime/seconds from start (float) to time offset (ns)'''
+        if time_point is None:
+            return None
+        if isinstance(time_point, datetime):
+            return int((time_point - self.start_time).total_seconds() * 1e9)
+        return int(time_point * 1e9)
+
+    def records(self, start=None, end=None):
+        '''
+        Yield records in time range, seek by index without scanning whole file
+        Input: start/end (datetime/float)[datetime or seconds from capture start, None for no limit]
+        Output: generator of (data (bytes), timestamp (datetime))
+        '''
+        if self.start_time is None:
+            return
+        start_stamp, end_stamp = self._to_stamp(start), self._to_stamp(end)
+        offset = CAPTURE_HEADER.size
+        if start_stamp is not None and self.index_times:
+            # Last entry before start, entries at same time may have record before start time in same block
+            index = bisect_right(self.index_times, start_stamp - 1) - 1
+            if index >= 0:
+                offset = self.index_offsets[index]
+        for stamp, _, data in self._scan(offset):
+            if start_stamp is not None and stamp < start_stamp:
+                continue
+            if end_stamp is not None and stamp > end_stamp:
+                return
+            yield data, self.start_time + timedelta(microseconds=stamp // 1000)
+
+def capture_to_log(capture_path, log_path, coding='UTF-8', timestamp=True, start=None, end=None):
+    '''
+    Render capture to text/HEX log, same format as file logger of SerialThread
+    Input: capture_path (str)
+           log_path (str)
+           coding (str)[coding of serial, HEX for HEX log]
+           timestamp (bool)
+           start/end (datetime/float)[time range, see CaptureReader.records]
+    '''
+    io = IOHandler(filepath=log_path, logger=logging.getLogger(__name__), coding=coding, timestamp=timestamp,
+                   noread=True, buffer_size=CAPTURE_INDEX_INTERVAL)
+    try:
+        with CaptureReader(capture_path) as reader:
+            for record in reader.records(start, end):
+                io.update(None, record)
+    finally:
+        io.close()
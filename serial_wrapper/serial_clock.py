@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+'''
+Clock of serial data: chunks are stamped with monotonic ns in read path (cheap, not jump with NTP),
+and converted to wall time by one wall-clock anchor only when rendered
+Handlers still accept datetime stamps (such as records of CaptureReader), so both are handled here
+'''
+import time
+from datetime import datetime, timedelta
+
+try:
+    monotonic_ns = time.monotonic_ns
+except AttributeError:
+    try:
+        _monotonic = time.monotonic
+    except AttributeError:
+        _monotonic = time.time # Python 2 has no monotonic clock
+
+    def monotonic_ns():
+        return int(_monotonic() * 1e9)
+
+TIMESTAMP_FORMAT = u"{:%Y-%m-%d %H:%M:%S.%f}"
+_EPOCH = datetime(1970, 1, 1)
+
+def _micros(delta):
+    '''timedelta to int microseconds'''
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+class SerialClock(object):
+    '''
+    Convert monotonic ns stamps to wall time by anchor (monotonic ns and datetime taken together)
+    Wall time of stamps follows monotonic clock after anchor, so NTP jump does not reorder data
+    '''
+    def __init__(self):
+        self.anchor_ns = monotonic_ns()
+        self.anchor_time = datetime.now()
+        self._anchor_us = _micros(self.anchor_time - _EPOCH)
+        self._prefix_cache = (None, None) # (wall millisecond, formatted prefix)
+
+    def now(self):
+        '''Stamp of now (int)[monotonic ns]'''
+        return monotonic_ns()
+
+    def to_datetime(self, stamp):
+        '''Wall time of stamp (int monotonic ns or datetime)'''
+        if isinstance(stamp, datetime):
+            return stamp
+        return self.anchor_time + timedelta(microseconds=(stamp - self.anchor_ns) // 1000)
+
+    def to_ns(self, stamp):
+        '''Monotonic ns of stamp (int monotonic ns or datetime), datetime is mapped by anchor'''
+        if isinstance(stamp, datetime):
+            return self.anchor_ns + _micros(stamp - self.anchor_time) * 1000
+        return stamp
+
+    def elapsed(self, stamp):
+        '''Seconds from stamp (int monotonic ns or datetime) to now'''
+        return (monotonic_ns() - self.to_ns(stamp)) / 1e9
+
+    def prefix(self, stamp):
+        '''
+        Formatted "YYYY-mm-dd HH:MM:SS.fff " of stamp (bytes)
+        Lines of one millisecond share one formatted prefix, so datetime is only made once per millisecond
+        '''
+        if isinstance(stamp, datetime):
+            return (TIMESTAMP_FORMAT.format(stamp)[:-3] + u' ').encode('UTF-8')
+        wall_us = self._anchor_us + (stamp - self.anchor_ns) // 1000
+        millisecond, prefix = self._prefix_cache
+        if millisecond != wall_us // 1000:
+            prefix = (TIMESTAMP_FORMAT.format(_EPOCH + timedelta(microseconds=wall_us))[:-3] + u' ').encode('UTF-8')
+            self._prefix_cache = (wall_us // 1000, prefix) # One tuple, so cache is consistent across threads
+        return prefix
+
+CLOCK = SerialClock() # One anchor for process, stamps of all ports are comparable
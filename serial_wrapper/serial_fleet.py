@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+'''
+SerialFleet: run same method of many SerialLinux/SerialAndroid concurrently,
+so fleet-wide check takes as long as the slowest board instead of sum of all boards
+'''
+import sys
+import time
+import threading
+import logging
+
+if sys.version_info[0] == 2:
+    from Queue import Queue, Empty
+else:
+    from queue import Queue, Empty
+
+from .serial_wrapper import BaseSerialWrapperException
+from .serial_wrapper import SerialTimeoutException
+from .serial_wrapper import DEFAULT_LOGGING_LEVEL
+from .serial_linux import ExitNonZeroException
+
+FLEET_HEALTH_CMD = u'echo alive'    # Command of health_check, exit code 0 means board is healthy
+
+class FleetBusyException(BaseSerialWrapperException):
+    '''Device still runs method of previous timeout run'''
+    pass
+
+class FleetResult(object):
+    '''
+    Result of SerialFleet.run, keyed by port
+    results: {port: return value}
+    errors: {port: exception}[SerialTimeoutException for device timeout]
+    elapsed: {port: seconds}
+    '''
+    def __init__(self, name):
+        self.name = name
+        self.results = {}
+        self.errors = {}
+        self.elapsed = {}
+
+    def __getitem__(self, port):
+        return self.results[port]
+
+    def __contains__(self, port):
+        return port in self.results
+
+    @property
+    def ok(self):
+        '''Whether method success on all devices'''
+        return not self.errors
+
+    @property
+    def failed(self):
+        '''Port list of failed devices'''
+        return sorted(self.errors)
+
+    @property
+    def timeouts(self):
+        '''Port list of timeout devices'''
+        return sorted(port for port, err in self.errors.items() if isinstance(err, SerialTimeoutException))
+
+    def report(self):
+        '''
+        Get partial failure report
+        Output: report (str)
+        '''
+        lines = [u'{0}: {1} success, {2} failed'.format(self.name, len(self.results), len(self.errors))]
+        for port in self.failed:
+            err = self.errors[port]
+            lines.append(u'    {0}: {1} {2} ({3:.3f}s)'.format(port, type(err).__name__, err,
+                                                                 self.elapsed.get(port, 0)))
+        return u'\n'.join(lines)
+
+class SerialFleet(object):
+    '''
+    Hold many SerialThread/SerialLinux/SerialAndroid, and run method on all of them in threads
+    Note: serial port can not be shared with other process, so devices are called in thread pool
+    '''
+    def __init__(self, devices=None, logger=None, max_workers=None):
+        '''
+        Input: devices (list)[SerialThread instances]
+               logger (logging)
+               max_workers (int)[Max devices run at same time, None for all devices]
+        '''
+        if logger is not None:
+            self.logger = logger
+        else:
+            self.logger = logging
+            self.logger.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s',
+                                    level=DEFAULT_LOGGING_LEVEL)
+        self.max_workers = max_workers
+        self._devices = {} # port: device
+        self._busy = set() # Ports which still run method after timeout
+        self._busy_lock = threading.Lock()
+        for device in devices or []:
+            self.add(device)
+
+    def __len__(self):
+        return len(self._devices)
+
+    def __iter__(self):
+        return iter(self._devices.values())
+
+    def __getitem__(self, port):
+        return self._devices[port]
+
+    @property
+    def ports(self):
+        return sorted(self._devices)
+
+    def add(self, device):
+        '''Add device, keyed by its port'''
+        self._devices[device._serial.port] = device
+
+    def remove(self, port):
+        '''Remove device by port, and return it'''
+        return self._devices.pop(port)
+
+    def close(self):
+        '''Close all devices'''
+        for device in self._devices.values():
+            device.close()
+        self._devices.clear()
+
+    def _call(self, port, device, method, args, kwargs, finished):
+        try:
+            if callable(method):
+                value = method(device, *args, **kwargs)
+            else:
+                value = getattr(device, method)(*args, **kwargs)
+        except Exception as err: # pylint: disable=broad-except
+            finished.put((port, False, err))
+        else:
+            finished.put((port, True, value))
+        finally:
+            with self._busy_lock:
+                self._busy.discard(port)
+
+    def run(self, method, args=(), kwargs=None, timeout=None, ports=None):
+        '''
+        Run method on all devices concurrently
+        Input: method (str/function)[method name of device, or function(device, *args, **kwargs)]
+               args (tuple)/kwargs (dict): arguments of method
+               timeout (float)[Per device timeout, None for wait until method return]
+               ports (list)[Only run on these ports, None for all devices]
+        Output: FleetResult
+        Note: timeout device is marked busy and skipped until its method return
+        '''
+        name = method if not callable(method) else getattr(method, '__name__', repr(method))
+        kwargs = kwargs or {}
+        result = FleetResult(name)
+        finished = Queue()
+        waiting = []
+        for port in (ports if ports is not None else self.ports):
+            with self._busy_lock:
+                busy = port in self._busy
+            if busy:
+                self.logger.warning("{0} still busy, skip {1}".format(port, name))
+                result.errors[port] = FleetBusyException(u'still running previous method')
+            else:
+                waiting.append(port)
+        self.logger.info("Fleet Run {0} on {1} devices".format(name, len(waiting)))
+        running = {} # port: start time
+        while waiting or running:
+            while waiting and (not self.max_workers or len(running) < self.max_workers):
+                port = waiting.pop(0)
+                with self._busy_lock:
+                    self._busy.add(port)
+                running[port] = time.time()
+                thread = threading.Thread(target=self._call, name='fleet',
+                                          args=(port, self._devices[port], method, args, kwargs, finished))
+                thread.daemon = True
+                thread.start()
+            wait_time = None
+            if timeout is not None:
+                wait_time = max(min(running.values()) + timeout - time.time(), 0)
+            try:
+                port, success, value = finished.get(timeout=wait_time)
+            except Empty:
+                pass
+            else:
+                if port in running:
+                    result.elapsed[port] = time.time() - running.pop(port)
+                    if success:
+                        result.results[port] = value
+                    else:
+                        self.logger.warning("{0} {1} Fail: {2!r}".format(port, name, value))
+                        result.errors[port] = value
+            if timeout is not None:
+                now = time.time()
+                for port, start in list(running.items()):
+                    if now - start >= timeout:
+                        self.logger.warning("{0} {1} TIMEOUT!".format(port, name))
+                        del running[port]
+                        result.elapsed[port] = now - start
+                        result.errors[port] = SerialTimeoutException(u'timeout after {}s'.format(timeout))
+        self.logger.info(result.report())
+        return result
+
+    def health_check(self, timeout=10):
+        '''
+        Check all devices respond to shell command
+        Output: FleetResult[results is {port: True}, failed device in errors]
+        '''
+        def check(device):
+            exit_code, raw_data = device.command_output(FLEET_HEALTH_CMD, timeout=timeout)
+            if exit_code != u'0':
+                raise ExitNonZeroException(raw_data)
+            return True
+        check.__name__ = 'health_check'
+        return self.run(check, timeout=timeout)
@@ -0,0 +1,421 @@
+# -*- coding: utf-8 -*-
+'''
+Binary protocol framing on raw byte stream of serial (for boards speaking binary protocol, HEX mode)
+Framer splits stream to frames: LengthFramer (length prefix), FixedFramer (fixed header and size),
+SlipFramer (SLIP, RFC 1055), CobsFramer (COBS, 0x00 delimited), all can validate CRC
+FrameHandler runs one framer on serial and shares every frame (parsed once) with subscribers and expect_frame
+'''
+import struct
+import binascii
+import threading
+import logging
+from collections import deque
+
+from .serial_wrapper import BaseHandler
+from .serial_wrapper import SerialTimeoutException
+from .serial_clock import CLOCK
+
+FRAME_HISTORY = 1024        # Frames kept by FrameHandler for expect_frame with cursor
+FRAME_MAX_LENGTH = 65535    # Default max payload length, larger length means broken stream
+
+SLIP_END = b'\xc0'
+SLIP_ESC = b'\xdb'
+SLIP_ESC_END = b'\xdb\xdc'
+SLIP_ESC_ESC = b'\xdb\xdd'
+COBS_DELIMITER = b'\x00'
+
+_INT_FORMATS = {1: 'B', 2: 'H', 4: 'I'}
+_BYTEORDERS = {'big': '>', 'little': '<'}
+
+def _int_struct(size, byteorder):
+    return struct.Struct(_BYTEORDERS[byteorder] + _INT_FORMATS[size])
+
+def _crc16_table(poly, reflect):
+    table = []
+    for byte in range(256):
+        if reflect:
+            crc = byte
+            for _ in range(8):
+                crc = (crc >> 1) ^ poly if crc & 1 else crc >> 1
+        else:
+            crc = byte << 8
+            for _ in range(8):
+                crc = ((crc << 1) ^ poly if crc & 0x8000 else crc << 1) & 0xFFFF
+        table.append(crc)
+    return table
+
+_CRC16_CCITT_TABLE = _crc16_table(0x1021, False)
+_CRC16_MODBUS_TABLE = _crc16_table(0xA001, True)
+
+def crc16_ccitt(data, crc=0xFFFF):
+    '''CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF)'''
+    table = _CRC16_CCITT_TABLE
+    for byte in bytearray(data):
+        crc = ((crc << 8) & 0xFFFF) ^ table[(crc >> 8) ^ byte]
+    return crc
+
+def crc16_modbus(data, crc=0xFFFF):
+    '''CRC-16/MODBUS (poly 0xA001 reflected, init 0xFFFF)'''
+    table = _CRC16_MODBUS_TABLE
+    for byte in bytearray(data):
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+def crc32(data):
+    '''CRC-32 (zlib)'''
+    return binascii.crc32(bytes(data)) & 0xFFFFFFFF
+
+class Crc(object):
+    '''CRC of frame: checksum function and how its value is appended to frame'''
+    def __init__(self, func, size, byteorder='big'):
+        '''
+        Input:
+                func: func(data) returning int checksum
+                size: bytes of checksum in frame (int)[1/2/4]
+                byteorder: big/little (str)
+        '''
+        self.func = func
+        self.size = size
+        self.struct = _int_struct(size, byteorder)
+
+    def pack(self, data):
+        '''Checksum bytes of data'''
+        return self.struct.pack(self.func(data))
+
+    def check(self, data, checksum):
+        '''True if checksum (bytes) is checksum of data'''
+        return self.struct.unpack(bytes(checksum))[0] == self.func(data)
+
+CRC16_CCITT = Crc(crc16_ccitt, 2, 'big')
+CRC16_MODBUS = Crc(crc16_modbus, 2, 'little')
+CRC32 = Crc(crc32, 4, 'little')
+
+def slip_encode(payload):
+    return SLIP_END + bytes(payload).replace(SLIP_ESC, SLIP_ESC_ESC).replace(SLIP_END, SLIP_ESC_END) + SLIP_END
+
+def slip_decode(body):
+    # Second byte of escape is never SLIP_ESC, so replace order can not mix escapes
+    return bytes(body).replace(SLIP_ESC_END, SLIP_END).replace(SLIP_ESC_ESC, SLIP_ESC)
+
+def cobs_encode(payload):
+    '''COBS encoded payload with trailing delimiter'''
+    out = bytearray(b'\x00')
+    code_index = 0
+    code = 1
+    for byte in bytearray(payload):
+        if byte:
+            out.append(byte)
+            code += 1
+        if not byte or code == 0xFF:
+            out[code_index] = code
+            code_index = len(out)
+            out.append(0)
+            code = 1
+    out[code_index] = code
+    return bytes(out) + COBS_DELIMITER
+
+def cobs_decode(body):
+    '''Decode COBS body (without delimiter), raise ValueError if invalid'''
+    body = bytearray(body)
+    out = bytearray()
+    index = 0
+    while index < len(body):
+        code = body[index]
+        if not code or index + code > len(body):
+            raise ValueError("Invalid COBS code {0} at {1}".format(code, index))
+        out += body[index + 1:index + code]
+        index += code
+        if code < 0xFF and index < len(body):
+            out.append(0)
+    return bytes(out)
+
+class Frame(object):
+    '''Complete frame, shared by all subscribers of FrameHandler'''
+    __slots__ = ('data', 'time', 'index')
+
+    def __init__(self, data, time, index):
+        self.data = data # Payload (bytes)[without header/length/crc/escape]
+        self.time = time # Stamp of chunk which completes frame (monotonic ns, see serial_clock)
+        self.index = index # Index of frame in FrameHandler, cursor of expect_frame
+
+    def __repr__(self):
+        return "Frame({0}, {1})".format(self.index, binascii.hexlify(self.data).decode('ascii'))
+
+class Framer(object):
+    '''
+    Base of framers: feed bytes of stream, get payloads of complete frames
+    Broken frame (bad CRC/escape/length) is dropped and counted in errors,
+    bytes out of frame (before header) are skipped without count
+    '''
+    def __init__(self, crc=None):
+        self.crc = crc
+        self.buffer = bytearray()
+        self.frames = 0
+        self.errors = 0
+
+    def feed(self, data):
+        '''
+        Input: data (bytes)[chunk of stream]
+        Output: payloads of frames completed by data (list)
+        '''
+        self.buffer += data
+        payloads = self._parse()
+        self.frames += len(payloads)
+        return payloads
+
+    def reset(self):
+        '''Drop partial frame'''
+        del self.buffer[:]
+
+    def encode(self, payload):
+        '''Frame bytes of payload for write'''
+        raise NotImplementedError
+
+    def _parse(self):
+        raise NotImplementedError
+
+    def _check_crc(self, body):
+        '''Payload of body with trailing CRC, None (counted in errors) if CRC mismatch'''
+        if self.crc is None:
+            return body
+        size = self.crc.size
+        if len(body) < size or not self.crc.check(body[:-size], body[-size:]):
+            self.errors += 1
+            return None
+        return body[:-size]
+
+class LengthFramer(Framer):
+    '''
+    Frame: [header] length payload [crc], length counts payload (and crc if length_with_crc)
+    CRC is over header, length and payload
+    '''
+    def __init__(self, length_size=2, byteorder='big', header=b'', crc=None, length_with_crc=False,
+                 max_length=FRAME_MAX_LENGTH):
+        '''
+        Input:
+                length_size: bytes of length field (int)[1/2/4]
+                byteorder: byteorder of length field (str)[big/little]
+                header: fixed bytes before length (bytes)[b'' for no header, header is used to resync]
+                crc: Crc of frame (Crc)[None for no CRC]
+                length_with_crc: length field counts crc bytes too (bool)
+                max_length: length larger than it means broken stream (int)
+        '''
+        super(LengthFramer, self).__init__(crc)
+        self.length_struct = _int_struct(length_size, byteorder)
+        self.header = bytes(header)
+        self.length_with_crc = length_with_crc
+        self.max_length = max_length
+
+    def encode(self, payload):
+        crc_size = self.crc.size if self.crc is not None else 0
+        length = len(payload) + (crc_size if self.length_with_crc else 0)
+        frame = self.header + self.length_struct.pack(length) + bytes(payload)
+        return frame + self.crc.pack(frame) if self.crc is not None else frame
+
+    def _resync(self):
+        '''Drop one byte of broken frame, then skip to next header'''
+        self.errors += 1
+        start = self.buffer.find(self.header, 1) if self.header else 1
+        del self.buffer[:start if start >= 0 else len(self.buffer)]
+
+    def _parse(self):
+        payloads = []
+        buffer = self.buffer
+        prefix = len(self.header) + self.length_struct.size
+        crc_size = self.crc.size if self.crc is not None else 0
+        while True:
+            if self.header:
+                start = buffer.find(self.header)
+                if start < 0:
+                    # Keep tail which may be start of header
+                    del buffer[:max(len(buffer) - len(self.header) + 1, 0)]
+                    break
+                if start:
+                    del buffer[:start] # Bytes out of frame
+            if len(buffer) < prefix:
+                break
+            length = self.length_struct.unpack_from(buffer, len(self.header))[0]
+            if self.length_with_crc:
+                length -= crc_size
+            if length < 0 or length > self.max_length:
+                self._resync()
+                continue
+            end = prefix + length + crc_size
+            if len(buffer) < end:
+                break
+            if crc_size and not self.crc.check(buffer[:end - crc_size], buffer[end - crc_size:end]):
+                self._resync()
+                continue
+            payloads.append(bytes(buffer[prefix:prefix + length]))
+            del buffer[:end]
+        return payloads
+
+class FixedFramer(LengthFramer):
+    '''Frame: header payload (fixed size) [crc], CRC is over header and payload'''
+    def __init__(self, header, size, crc=None):
+        '''
+        Input:
+                header: fixed bytes starting every frame (bytes)
+                size: bytes of payload (int)
+                crc: Crc of frame (Crc)[None for no CRC]
+        '''
+        assert header, "FixedFramer need header to resync"
+        super(FixedFramer, self).__init__(header=header, crc=crc, max_length=size)
+        self.size = size
+
+    def encode(self, payload):
+        assert len(payload) == self.size, "Payload should be {} bytes".format(self.size)
+        frame = self.header + bytes(payload)
+        return frame + self.crc.pack(frame) if self.crc is not None else frame
+
+    def _parse(self):
+        payloads = []
+        buffer = self.buffer
+        prefix = len(self.header)
+        end = prefix + self.size + (self.crc.size if self.crc is not None else 0)
+        while True:
+            start = buffer.find(self.header)
+            if start < 0:
+                del buffer[:max(len(buffer) - len(self.header) + 1, 0)]
+                break
+            if start:
+                del buffer[:start]
+            if len(buffer) < end:
+                break
+            if self.crc is not None and not self.crc.check(buffer[:end - self.crc.size],
+                                                           buffer[end - self.crc.size:end]):
+                self._resync()
+                continue
+            payloads.append(bytes(buffer[prefix:prefix + self.size]))
+            del buffer[:end]
+        return payloads
+
+class SlipFramer(Framer):
+    '''SLIP frame: END escaped-payload [crc] END, CRC is over payload'''
+    def encode(self, payload):
+        return slip_encode(payload + self.crc.pack(payload) if self.crc is not None else payload)
+
+    def _parse(self):
+        payloads = []
+        buffer = self.buffer
+        start = 0
+        while True:
+            end = buffer.find(SLIP_END, start)
+            if end < 0:
+                break
+            if end > start: # Back-to-back END is not frame
+                body = slip_decode(buffer[start:end])
+                payload = self._check_crc(body)
+                if payload is not None:
+                    payloads.append(payload)
+            start = end + 1
+        del buffer[:start]
+        return payloads
+
+class CobsFramer(Framer):
+    '''COBS frame: encoded payload [crc] 0x00, CRC is over payload'''
+    def encode(self, payload):
+        return cobs_encode(payload + self.crc.pack(payload) if self.crc is not None else payload)
+
+    def _parse(self):
+        payloads = []
+        buffer = self.buffer
+        start = 0
+        while True:
+            end = buffer.find(COBS_DELIMITER, start)
+            if end < 0:
+                break
+            if end > start:
+                try:
+                    body = cobs_decode(buffer[start:end])
+                except ValueError:
+                    self.errors += 1
+                else:
+                    payload = self._check_crc(body)
+                    if payload is not None:
+                        payloads.append(payload)
+            start = end + 1
+        del buffer[:start]
+        return payloads
+
+class FrameHandler(BaseHandler):
+    '''
+    Raw handler which runs framer on serial stream, every frame is parsed once,
+    then shared (same Frame object) with subscribers and expect_frame
+    '''
+    raw = True
+
+    def __init__(self, framer, logger=None, coding=None, history=FRAME_HISTORY):
+        '''
+        Input:
+                framer: Framer (LengthFramer/FixedFramer/SlipFramer/CobsFramer or subclass)
+                logger: logging-like
+                coding: coding of serial (str)[framer always works on raw bytes]
+                history: frames kept for expect_frame with cursor (int)
+        '''
+        super(FrameHandler, self).__init__(logger if logger is not None else logging, coding)
+        self.framer = framer
+        self.serialthread = None # Set by SerialThread.create_framer, for write_frame
+        self.subscribers = []
+        self.history = deque(maxlen=history)
+        self.count = 0 # Frames got, cursor of next frame
+        self.lock = threading.Lock()
+        self.updated = threading.Condition(self.lock)
+
+    def subscribe(self, callback):
+        '''callback(frame) is called for every frame, in notify (or worker) thread of serial'''
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    def update(self, serialthread, data_tuple):
+        data, data_time = data_tuple
+        payloads = self.framer.feed(data)
+        if not payloads:
+            return
+        with self.lock:
+            frames = []
+            for payload in payloads:
+                frames.append(Frame(payload, data_time, self.count))
+                self.count += 1
+            self.history.extend(frames)
+            self.updated.notify_all()
+        for frame in frames:
+            for callback in self.subscribers:
+                try:
+                    callback(frame)
+                except Exception: # Subscriber error should not stop frames to others
+                    self.logger.exception("Frame subscriber {!r} fail".format(callback))
+
+    def expect_frame(self, predicate=None, timeout=None, cursor=None):
+        '''
+        Block until frame matching predicate come
+        Input: predicate (function)[predicate(frame) returning bool, None for any frame]
+               timeout (float)[None for wait forever]
+               cursor (int)[Check frames from index cursor (such as count before write),
+                            None for only frames come after call]
+        Output: frame (Frame)
+        Raise SerialTimeoutException if no frame matched in timeout
+        '''
+        deadline = None if timeout is None else CLOCK.now() + int(timeout * 1e9)
+        with self.updated:
+            index = self.count if cursor is None else cursor
+            while True:
+                for frame in self.history:
+                    if frame.index >= index and (predicate is None or predicate(frame)):
+                        return frame
+                index = self.count
+                wait = None if deadline is None else (deadline - CLOCK.now()) / 1e9
+                if wait is not None and wait <= 0:
+                    self.logger.warning("Expect Frame TIMEOUT!")
+                    raise SerialTimeoutException
+                self.updated.wait(wait)
+
+    def write_frame(self, payload):
+        '''Encode payload by framer and write to serial'''
+        return self.serialthread.write(self.framer.encode(payload))
+
+    def close(self):
+        self.framer.reset()
+        self.subscribers = []
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+'''
+SerialHub: one selector thread which reads all registered ports (POSIX port with fd)
+and dispatches data to handlers of each port, instead of reader/notify threads per port
+'''
+import os
+import select
+import threading
+import logging
+try:
+    import fcntl
+except ImportError:
+    fcntl = None # Windows, port has no fd to join hub
+
+from .serial_wrapper import DEFAULT_LOGGING_LEVEL
+
+HUB_SELECT_TIMEOUT = 1.0            # Max blocking time of hub select, bound stop latency if wakeup lost
+
+class SerialHub(object):
+    '''
+    Shared I/O hub for many SerialThread
+    SerialThread joins hub by SerialThread(..., hub=hub) or serialthread.attach_hub(hub)
+    Note: handlers without queue_policy run in hub thread, so slow handler delays all ports
+    '''
+    def __init__(self, logger=None):
+        if logger is not None:
+            self.logger = logger
+        else:
+            self.logger = logging
+            self.logger.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s',
+                                    level=DEFAULT_LOGGING_LEVEL)
+        self._ports = {} # fd: SerialThread
+        self._lock = threading.Lock()
+        self._round_lock = threading.RLock() # Held by hub thread while reading/dispatching one round
+        self._changed = True
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        for fd in (self._wakeup_r, self._wakeup_w):
+            if fcntl is None:
+                break
+            flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+            fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+        self._alive = False
+        self.thread = None
+
+    def __len__(self):
+        return len(self._ports)
+
+    def register(self, serialthread):
+        '''
+        Let hub read port of serialthread, start hub thread if not started
+        Input: serialthread (SerialThread)[_serial_fd should be ready]
+        '''
+        with self._lock:
+            self._ports[serialthread._serial_fd] = serialthread
+            self._changed = True
+        self.logger.info("Hub Register: {0} (fd {1})".format(serialthread._serial.port, serialthread._serial_fd))
+        if not self._alive:
+            self.start()
+        self._wakeup()
+
+    def unregister(self, serialthread):
+        '''Stop reading port of serialthread, return after current dispatch round of hub finish'''
+        with self._lock:
+            for fd, port in list(self._ports.items()):
+                if port is serialthread:
+                    del self._ports[fd]
+                    self._changed = True
+        self._wakeup()
+        with self._round_lock:
+            self.logger.info("Hub Unregister: {}".format(serialthread._serial.port))
+
+    def start(self):
+        '''Start hub thread'''
+        self._alive = True
+        self.thread = threading.Thread(target=self._loop, name='hub')
+        self.thread.daemon = True
+        self.thread.start()
+        self.logger.info("Serial Hub Thread Start")
+
+    def stop(self):
+        '''Stop hub thread, wait for clean exit of thread'''
+        if self._alive:
+            self._alive = False
+            self._wakeup()
+            if self.thread is not threading.current_thread():
+                self.thread.join()
+            self.logger.info("Serial Hub Thread Stop")
+
+    def close(self):
+        '''Stop hub thread and release wakeup pipe, registered ports are not closed'''
+        self.stop()
+        for fd in (self._wakeup_r, self._wakeup_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _wakeup(self):
+        try:
+            os.write(self._wakeup_w, b'\0')
+        except OSError:
+            pass # Pipe full means hub is already waked up
+
+    def _poller(self):
+        '''Get select function of current fd list'''
+        with self._lock:
+            fds = list(self._ports) + [self._wakeup_r]
+            self._changed = False
+        if hasattr(select, 'poll'):
+            poller = select.poll()
+            for fd in fds:
+                poller.register(fd, select.POLLIN | select.POLLPRI)
+            return lambda: [fd for fd, _ in poller.poll(HUB_SELECT_TIMEOUT * 1000)]
+        return lambda: select.select(fds, [], [], HUB_SELECT_TIMEOUT)[0]
+
+    def _loop(self):
+        '''loop select all ports, and let port read and notify its handlers'''
+        poll = None
+        while self._alive:
+            if self._changed or poll is None:
+                poll = self._poller()
+            try:
+                readable = poll()
+            except (select.error, OSError, ValueError) as err:
+                self.logger.error("Hub Select Exception: {!r}".format(err))
+                poll = None # fd may be closed, rebuild fd list
+                continue
+            with self._round_lock:
+                for fd in readable:
+                    if fd == self._wakeup_r:
+                        try:
+                            os.read(self._wakeup_r, 4096)
+                        except OSError:
+                            pass
+                        continue
+                    port = self._ports.get(fd)
+                    if port is None:
+                        continue
+                    try:
+                        if port._hub_read():
+                            continue
+                    except Exception: # pylint: disable=broad-except
+                        self.logger.exception("Hub Dispatch Exception of {}".format(port._serial.port))
+                        continue
+                    self.logger.critical("Hub drop port {} for serial exception".format(port._serial.port))
+                    self.unregister(port)
+        self.logger.info("Hub Thread Stop")
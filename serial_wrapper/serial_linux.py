@@ -35,6 +35,7 @@ class SerialLinux(SerialThread):
                                         r'(?P<datetime>\d{4}-\d{1,2}-\d{1,2} \d{1,2}:\d{1,2}) *'
                                         r'(?P<filename>.*)'))
     exitcode_re = re.compile(r'ExitCode:(\d+)\.')
+    id_re = re.compile(r'uid=(\d+)\(([^)]+)\)')
     ifconfig_re = re.compile((r'(?P<interfacename>[\w\-]+)\s*Link encap:(?P<linkencap>\w+)\s*'
                               r'(?:Loopback|\s*?HWaddr (?P<mac>[0-9a-fA-F]{2}[:][0-9a-fA-F]{2}[:][0-9a-fA-F]{2}[:][0-9a-fA-F]{2}[:][0-9a-fA-F]{2}[:][0-9a-fA-F]{2}))\s*'
                               r'(?:Driver (?P<driver>\w+)\s*)?'
@@ -42,25 +43,32 @@ class SerialLinux(SerialThread):
                               r'(?:Bcast:(?P<bcast>\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})\s*)?'
                               r'(?:Mask:(?P<mask>\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}) *)?'))
 
-    def __init__(self, serial_port, coding=DEFAULTCODING, serial_config=None, console_monitor=True, logger=None):
-        super(SerialLinux, self).__init__(serial_port, coding, serial_config, console_monitor, logger)
+    def __init__(self, serial_port, coding=DEFAULTCODING, serial_config=None, console_monitor=True, logger=None,
+                 **kwargs):
+        super(SerialLinux, self).__init__(serial_port, coding, serial_config, console_monitor, logger, **kwargs)
+
+    def _exitcode_cmd(self, cmd):
+        '''Get (uid, command with echo exitcode, exitcode regex) for exitcode_expect_for_write'''
+        uid = u''.join(random.SystemRandom().choice(string.ascii_uppercase + string.digits) for _ in range(8))
+        exitecho_cmd = u'echo "({})ExitCode:$?."'.format(uid)
+        exitecho_re = re.compile(r'\({}\)ExitCode:(\d+)\.'.format(uid))
+        return uid, u'{cmd};{echo_cmd}\n'.format(cmd=cmd, echo_cmd=exitecho_cmd), exitecho_re
+
+    def _exitcode_parse(self, uid, exitecho_re, res_l, raw_data):
+        '''Get (exit_code, raw_data before exitcode) from result of exitcode_expect_for_write'''
+        exit_code = exitecho_re.findall(res_l[0])[0]
+        ext_str_pos = raw_data.find('({})ExitCode:{}'.format(uid, exit_code))
+        self.logger.debug("Exit Code Position: %d", ext_str_pos)
+        return exit_code, raw_data[:ext_str_pos]
 
     def exitcode_expect_for_write(self, cmd, repeat=False, repeat_gap=1, timeout=None):
         '''Try get run command exit with unified id to avoid conflict with out command
         Mainly call expect_for_write, but will add echo exitcode cmd / and target exitcode return
         '''
-        def exitecho_cmd(uid):
-            return u'echo "({})ExitCode:$?."'.format(uid)
-        def exitecho_re(uid):
-            return re.compile(r'\({}\)ExitCode:(\d+)\.'.format(uid))
-        uid = u''.join(random.SystemRandom().choice(string.ascii_uppercase + string.digits) for _ in range(8))
+        uid, exitcode_cmd, exitecho_re = self._exitcode_cmd(cmd)
         ret, res_l, raw_data = self.expect_for_write(
-            u'{cmd};{echo_cmd}\n'.format(cmd=cmd, echo_cmd=exitecho_cmd(uid)),
-            exitecho_re(uid), repeat=repeat, repeat_gap=repeat_gap, timeout=timeout)
-        exit_code = exitecho_re(uid).findall(res_l[0])[0]
-        ext_str_pos = raw_data.find('({})ExitCode:{}'.format(uid, exit_code))
-        self.logger.debug("Exit Code Position: %d", ext_str_pos)
-        raw_data = raw_data[:ext_str_pos]
+            exitcode_cmd, exitecho_re, repeat=repeat, repeat_gap=repeat_gap, timeout=timeout)
+        exit_code, raw_data = self._exitcode_parse(uid, exitecho_re, res_l, raw_data)
         return ret, exit_code, raw_data
 
     def command_output(self, cmd, timeout=None):
@@ -70,28 +78,31 @@ class SerialLinux(SerialThread):
         raw_data = raw_data[raw_data.rfind('[!Start!]')+9:].strip()
         return exit_code, raw_data
 
+    def _id_parse(self, id_str):
+        '''Check whether output of id is root or not'''
+        pair = self.id_re.search(id_str)
+        id_id = pair.group(1)
+        id_name = pair.group(2)
+        self.logger.info("Current User: uid=%s(%s)", id_id, id_name)
+        if id_id == u'0' and id_name == u'root':
+            return True
+        else:
+            return False
+
     def is_root(self):
         '''
         Check whether target is root or not
         '''
         self.write(chr(26))
         self.write('\n')
-        id_re = re.compile(r'uid=(\d+)\(([^)]+)\)')
         try:
-            ret, res_l, _ = self.expect_for_write(u'id\n', id_re, repeat=True, timeout=3)
+            ret, res_l, _ = self.expect_for_write(u'id\n', self.id_re, repeat=True, timeout=3)
         except SerialTimeoutException:
             self.logger.warning("Checking id No response")
             raise InvalidOutputException
         else:
             if ret:
-                pair = id_re.search(res_l[0])
-                id_id = pair.group(1)
-                id_name = pair.group(2)
-                self.logger.info("Current User: uid=%s(%s)", id_id, id_name)
-                if id_id == u'0' and id_name == u'root':
-                    return True
-                else:
-                    return False
+                return self._id_parse(res_l[0])
             else:
                 raise InvalidOutputException
 
@@ -129,6 +140,10 @@ class SerialLinux(SerialThread):
                     raise NotFoundException
                 self.logger.info("Files Property: %r", raw_data)
                 raise InvalidOutputException
+        return self._files_property_parse(raw_data, timeformat)
+
+    def _files_property_parse(self, raw_data, timeformat='%Y-%m-%d %H:%M'):
+        '''Get files property dict from output of ls -al'''
         property_iter = self.file_property_nose_re.finditer(raw_data)
         files = {}
         for match in property_iter:
@@ -237,6 +252,10 @@ class SerialLinux(SerialThread):
         else:
             if not ret:
                 raise InvalidOutputException
+        return self._interface_list_parse(raw_data)
+
+    def _interface_list_parse(self, raw_data):
+        '''Get interface list from output of ifconfig'''
         interfaces_list = []
         if not self.ifconfig_re.search(raw_data):
             self.logger.warning("Fail to find any network interface")
@@ -288,13 +307,13 @@ class SerialLinux(SerialThread):
     def get_process_list(self):
         pass
 
-    def selinux_get(self):
+    def _selinux_parse(self, exit_code, res):
+        '''Get SELinux enforcing status from output of getenforce'''
         string_map = {
             u'Enforcing': True,
             u'Permissive': False,
             u'Disabled': False,
         }
-        exit_code, res = self.command_output(u'getenforce', timeout=5)
         if exit_code != u'0':
             raise InvalidOutputException
         if res.strip() in string_map:
@@ -302,6 +321,10 @@ class SerialLinux(SerialThread):
         else:
             raise InvalidOutputException
 
+    def selinux_get(self):
+        exit_code, res = self.command_output(u'getenforce', timeout=5)
+        return self._selinux_parse(exit_code, res)
+
     def selinux_set(self, to_disable=True):
         value = u'0' if to_disable else u'1'
         exit_code, res = self.command_output(u'setenforce ' + value, timeout=5)
@@ -311,6 +334,10 @@ class SerialLinux(SerialThread):
 
     def md5sum(self, filepath, timeout=5):
         exit_code, res = self.command_output(u'md5sum ' + filepath, timeout=timeout)
+        return self._md5sum_parse(filepath, exit_code, res)
+
+    def _md5sum_parse(self, filepath, exit_code, res):
+        '''Get {filename: md5} from output of md5sum'''
         if exit_code != u'0':
             self.logger.warning("Cal md5 of %s Failed: %s", filepath, res.strip())
             raise InvalidOutputException
@@ -321,6 +348,10 @@ class SerialLinux(SerialThread):
 
     def meminfo(self):
         exit_code, res = self.command_output(u'cat /proc/meminfo', timeout=5)
+        return self._meminfo_parse(exit_code, res)
+
+    def _meminfo_parse(self, exit_code, res):
+        '''Get {key: value} from /proc/meminfo'''
         if exit_code != u'0':
             self.logger.warning("Fail to get meminfo: %s", res.strip())
             raise InvalidOutputException
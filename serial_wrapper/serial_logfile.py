@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+'''
+RotatingLogFile: file for IOHandler which rotates by size/time,
+compresses rotated segments in background thread, or writes compressed file directly
+'''
+import os
+import sys
+import time
+import shutil
+import threading
+import logging
+import gzip
+import bz2
+try:
+    import lzma
+except ImportError:
+    lzma = None # Python 2 has no xz in stdlib
+
+if sys.version_info[0] == 2:
+    from Queue import Queue
+else:
+    from queue import Queue
+
+COMPRESS_GZIP = 'gzip'
+COMPRESS_BZ2 = 'bz2'
+COMPRESS_XZ = 'xz'
+COMPRESS_EXT = {COMPRESS_GZIP: '.gz', COMPRESS_BZ2: '.bz2', COMPRESS_XZ: '.xz'}
+COMPRESS_CHUNK = 1024 * 1024        # Read size when compress rotated segment
+ROTATE_TIME_FORMAT = '%Y%m%d-%H%M%S'
+
+def compress_of(filepath):
+    '''Get compress type from extension of filepath, None for plain file'''
+    for compress, ext in COMPRESS_EXT.items():
+        if filepath.endswith(ext):
+            return compress
+    return None
+
+def open_compressed(filepath, compress, mode='ab'):
+    '''Open file with compress type (COMPRESS_GZIP/COMPRESS_BZ2/COMPRESS_XZ), or plain file for None'''
+    if compress == COMPRESS_GZIP:
+        return gzip.open(filepath, mode)
+    if compress == COMPRESS_BZ2:
+        return bz2.BZ2File(filepath, mode.replace('b', ''))
+    if compress == COMPRESS_XZ:
+        if lzma is None:
+            raise ValueError("xz compress need lzma (Python 3.3+)")
+        return lzma.open(filepath, mode)
+    if compress is None:
+        return open(filepath, mode, 0)
+    raise ValueError("Invalid compress: {}".format(compress))
+
+class RotatingLogFile(object):
+    '''
+    File-like object (write/flush/close/closed/name) of serial log
+    Rotated segment is renamed to <filepath>.<time>[.ext], write always start a new segment at whole batch,
+    so line written by IOHandler is never split
+    '''
+    def __init__(self, filepath, rotate_size=None, rotate_interval=None, compress=None, logger=None):
+        '''
+        Input:
+                filepath: log filepath (str)[end with .gz/.bz2/.xz for write compressed file directly]
+                rotate_size: rotate once segment reach rotate_size (int)[bytes before compress, None for no limit]
+                rotate_interval: rotate every rotate_interval (float)[seconds, None for no limit]
+                compress: compress rotated plain segment in background (str)
+                          [COMPRESS_GZIP/COMPRESS_BZ2/COMPRESS_XZ, None for keep plain]
+                logger: logging-like
+        '''
+        self.logger = logger if logger is not None else logging
+        self.name = filepath
+        self.rotate_size = rotate_size
+        self.rotate_interval = rotate_interval
+        self.live_compress = compress_of(filepath)
+        self.compress = None if self.live_compress else compress
+        if self.compress is not None:
+            assert self.compress in COMPRESS_EXT, "Invalid compress: {}".format(self.compress)
+        self.segments = [] # Rotated segment filepath (after compress)
+        self.size = 0
+        self.next_rotate = None
+        self.closed = False
+        self._compress_q = None
+        self._compress_thread = None
+        self._open()
+
+    def _open(self):
+        self.file_handler = open_compressed(self.name, self.live_compress)
+        self.size = os.path.getsize(self.name) if not self.live_compress else 0
+        if self.rotate_interval:
+            self.next_rotate = time.time() + self.rotate_interval
+
+    def _segment_path(self):
+        base, ext = self.name, ''
+        if self.live_compress:
+            ext = COMPRESS_EXT[self.live_compress]
+            base = self.name[:-len(ext)]
+        stamp = time.strftime(ROTATE_TIME_FORMAT)
+        segment = u'{0}.{1}{2}'.format(base, stamp, ext)
+        index = 1
+        while os.path.exists(segment) or (self.compress and os.path.exists(segment + COMPRESS_EXT[self.compress])):
+            segment = u'{0}.{1}.{2}{3}'.format(base, stamp, index, ext)
+            index += 1
+        return segment
+
+    def write(self, data):
+        size = len(data)
+        if self.size and ((self.rotate_size and self.size + size > self.rotate_size) or
+                          (self.next_rotate is not None and time.time() >= self.next_rotate)):
+            self.rotate()
+        self.file_handler.write(data)
+        self.size += size
+
+    def flush(self):
+        self.file_handler.flush()
+
+    def rotate(self):
+        '''Close current segment, rename it and open new segment'''
+        self.file_handler.close()
+        segment = self._segment_path()
+        os.rename(self.name, segment)
+        self.logger.info("Rotate Log: {0} -> {1}".format(self.name, segment))
+        if self.compress:
+            self._start_compress(segment)
+        else:
+            self.segments.append(segment)
+        self._open()
+
+    def _start_compress(self, segment):
+        if self._compress_thread is None:
+            self._compress_q = Queue()
+            self._compress_thread = threading.Thread(target=self._compressor, name='compress')
+            self._compress_thread.daemon = True
+            self._compress_thread.start()
+        self._compress_q.put(segment)
+
+    def _compressor(self):
+        '''loop compress rotated segment, remove plain segment once compressed'''
+        while True:
+            segment = self._compress_q.get()
+            if segment is None:
+                break
+            target = segment + COMPRESS_EXT[self.compress]
+            try:
+                with open(segment, 'rb') as plain_f:
+                    compressed_f = open_compressed(target, self.compress, 'wb')
+                    try:
+                        shutil.copyfileobj(plain_f, compressed_f, COMPRESS_CHUNK)
+                    finally:
+                        compressed_f.close()
+                os.remove(segment)
+            except (IOError, OSError) as err:
+                self.logger.error("Compress {0} Fail: {1!r}".format(segment, err))
+                self.segments.append(segment)
+            else:
+                self.logger.info("Compress Log: {}".format(target))
+                self.segments.append(target)
+
+    def close(self):
+        '''Close current segment, wait background compress finish'''
+        if self.closed:
+            return
+        self.closed = True
+        self.file_handler.close()
+        if self._compress_thread is not None:
+            self._compress_q.put(None)
+            self._compress_thread.join()
@@ -0,0 +1,395 @@
+# -*- coding: utf-8 -*-
+import re
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+try:
+    RE_TYPE = re._pattern_type
+except AttributeError:
+    RE_TYPE = re.Pattern
+
+MATCHER_UNBOUNDED = None            # Width of regex without bounded width (such as \d+/.*)
+KEYWORDSET_MAX_CACHE = 128          # Max compiled KeywordSet kept by compile_keywords
+KEYWORDSET_GATE_MIN = 2             # Min keywords for combined scan, one keyword is searched by itself
+_GROUP_NAME = 'k{}'                 # Named group of keyword index in combined regex
+_SCOPED_FLAGS = ((re.IGNORECASE, 'i'), (re.MULTILINE, 'm'), (re.DOTALL, 's'), (re.VERBOSE, 'x'))
+_GLOBAL_FLAGS_RE = re.compile(r'^(?:\(\?[aiLmsux]+\))+')  # Inline flags at start, already in flags of regex
+_RE_ASCII = getattr(re, 'ASCII', 0)
+
+def keyword_width(keyword):
+    '''
+    Get max possible match length of keyword
+    Input: keyword (str/bytes/re)
+    Output: width (int)[MATCHER_UNBOUNDED if regex width is unbounded]
+    '''
+    if not isinstance(keyword, RE_TYPE):
+        return len(keyword)
+    try:
+        _, width = sre_parse.parse(keyword.pattern, keyword.flags).getwidth()
+    except Exception: # pylint: disable=broad-except
+        return MATCHER_UNBOUNDED
+    return MATCHER_UNBOUNDED if width >= sre_parse.MAXREPEAT else width
+
+def keyword_prefix(keyword):
+    '''
+    Get literal prefix which every match of keyword starts with
+    Input: keyword (str/bytes/re)
+    Output: prefix (str/bytes)[empty if regex starts with no literal or ignores case]
+    '''
+    if not isinstance(keyword, RE_TYPE):
+        return keyword
+    codes = []
+    if not keyword.flags & re.IGNORECASE:
+        try:
+            for op, value in sre_parse.parse(keyword.pattern, keyword.flags).data:
+                if op != sre_parse.LITERAL:
+                    break
+                codes.append(value)
+        except Exception: # pylint: disable=broad-except
+            codes = []
+    if isinstance(keyword.pattern, bytes):
+        return bytes(bytearray(codes))
+    return u''.join(u'%c' % code for code in codes)
+
+def _has_groupref(keyword):
+    '''Whether regex has backreference (\\1, (?P=name), (?(1)...)) to its own group'''
+    refs = (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS)
+    try:
+        stack = [sre_parse.parse(keyword.pattern, keyword.flags)]
+    except Exception: # pylint: disable=broad-except
+        return True
+    while stack:
+        item = stack.pop()
+        if isinstance(item, sre_parse.SubPattern):
+            item = item.data
+        if isinstance(item, (list, tuple)):
+            if len(item) == 2 and item[0] in refs:
+                return True
+            stack.extend(item)
+    return False
+
+def keyword_pattern(keyword):
+    '''
+    Get regex source of keyword which can be one branch of combined regex
+    Input: keyword (str/bytes/re)
+    Output: source (str/bytes)[None if regex refers its own groups or has flags which can not be scoped]
+    '''
+    if not isinstance(keyword, RE_TYPE):
+        return re.escape(keyword)
+    flags = keyword.flags
+    scoped = ''
+    for flag, letter in _SCOPED_FLAGS:
+        if flags & flag:
+            scoped += letter
+            flags &= ~flag
+    if isinstance(keyword.pattern, bytes):
+        flags &= ~_RE_ASCII
+    else:
+        flags &= ~re.UNICODE
+        if flags & _RE_ASCII:
+            scoped += 'a'
+            flags &= ~_RE_ASCII
+    if flags or (keyword.groups and _has_groupref(keyword)):
+        return None # Group references would point to other groups in combined regex
+    try:
+        is_bytes = isinstance(keyword.pattern, bytes)
+        pattern = keyword.pattern.decode('latin-1') if is_bytes else keyword.pattern
+        # Comment of verbose regex runs to end of line, so close branch on new line
+        source = u'(?{}:{}{})'.format(scoped, _GLOBAL_FLAGS_RE.sub(u'', pattern), u'\n' if 'x' in scoped else u'')
+        if is_bytes:
+            source = source.encode('latin-1')
+        re.compile(source) # Inline global flags can not be in branch
+    except (re.error, TypeError, ValueError):
+        return None
+    return source
+
+def combine_keywords(keywords, named=False):
+    '''
+    Compile keywords into one alternation regex
+    Input: keywords (list)[Can be str/bytes or re.compile]
+           named (bool)[True for each keyword in named group of its index (k0, k1...), see gate_index,
+                        False for plain alternation, which keeps first-character scan of re and is much faster]
+    Output: re / None if keywords can not be combined (mixed str and bytes, or keyword_pattern fails)
+    '''
+    sources = [keyword_pattern(keyword) for keyword in keywords]
+    if not sources or any(source is None for source in sources):
+        return None
+    kinds = set(isinstance(source, bytes) for source in sources)
+    if len(kinds) != 1:
+        return None
+    if named:
+        branches = [(u'(?P<{}>'.format(_GROUP_NAME.format(index)), u')') for index in range(len(sources))]
+    else:
+        branches = [(u'', u'')] * len(sources)
+    if kinds.pop():
+        combined = b'|'.join([head.encode('ascii') + source + tail.encode('ascii')
+                              for (head, tail), source in zip(branches, sources)])
+    else:
+        combined = u'|'.join([head + source + tail for (head, tail), source in zip(branches, sources)])
+    try:
+        return re.compile(combined)
+    except (re.error, OverflowError, RuntimeError): # Too many groups or too deep
+        return None
+
+def combine_gates(keywords):
+    '''
+    Compile keywords into gates: alternation of keywords which start with literal (re scans it by first-character
+    set, fast), and alternation of other keywords (anchored, ignore case...), which would disable that scan
+    Input: keywords (list)[Can be str/bytes or re.compile]
+    Output: tuple of re[empty if keywords can not be combined or fewer than KEYWORDSET_GATE_MIN]
+    '''
+    if len(keywords) < KEYWORDSET_GATE_MIN:
+        return ()
+    groups = ([], [])
+    for keyword in keywords:
+        groups[0 if keyword_prefix(keyword) else 1].append(keyword)
+    gates = tuple(combine_keywords(group) for group in groups if group)
+    if any(gate is None for gate in gates):
+        return ()
+    return gates
+
+def gate_search(gates, data, pos):
+    '''First match of gates (list of re) in data from pos, None if no gate matches'''
+    for gate in gates:
+        res = gate.search(data, pos)
+        if res is not None:
+            return res
+    return None
+
+def gate_index(res):
+    '''Keyword index of match of named combined regex'''
+    return int(res.lastgroup[1:])
+
+class KeywordSet(object):
+    '''
+    Compiled keyword list for wait_for_strings/expects_for_write, cached by compile_keywords
+    Width, literal prefix and kind of every keyword are computed once, and keyword list of
+    KEYWORDSET_GATE_MIN or more keywords is compiled into alternation regex of literals and regexes (gates,
+    see combine_gates). Data is scanned once by gates, keywords are only searched one by one when gate finds something,
+    so result is still in keyword order; named group per keyword (see gate_index) tells which keyword
+    gate found first. stream_gates for StreamMatcher have literal prefix instead of unbounded regex.
+    Alternation of literals is the multi-literal scan: re checks first-character set in C, an Aho-Corasick
+    automaton in pure Python steps every character in Python and is slower.
+    StreamMatcher on 1 MB console text fed in 256 bytes chunks without match (benchmarks/bench_serial.py
+    keywords, CPython 3.11), gates vs one by one: 20 literals 28ms vs 88-96ms, 50 literals 73-82ms vs 227-259ms,
+    20 mixed (1/3 regex) 79-102ms vs 138-193ms, 50 mixed 133-143ms vs 235-266ms
+    '''
+    def __init__(self, keywords):
+        '''
+        Input: keywords (list)[Can be str/bytes or re.compile]
+        '''
+        self.keywords = tuple(keywords)
+        self.widths = tuple(keyword_width(keyword) for keyword in self.keywords)
+        self.prefixes = tuple(keyword_prefix(keyword) for keyword in self.keywords)
+        self.is_regex = tuple(isinstance(keyword, RE_TYPE) for keyword in self.keywords)
+        self.gates = combine_gates(self.keywords)
+        # Unbounded regex is gated by its literal prefix, regex without prefix is left out of stream_gates
+        gated = [keyword if width is not MATCHER_UNBOUNDED else prefix
+                 for keyword, width, prefix in zip(self.keywords, self.widths, self.prefixes)
+                 if width is not MATCHER_UNBOUNDED or prefix]
+        self.stream_gates = self.gates if gated == list(self.keywords) else combine_gates(gated)
+        self._named_gate = None # Gate with named group per keyword, compiled at first match of gate
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def match(self, index, data, pos=0):
+        '''
+        Search one keyword in data from pos
+        Output: (string, start, end) / None
+        '''
+        keyword = self.keywords[index]
+        if self.is_regex[index]:
+            res = keyword.search(data, pos)
+            if res:
+                return res.group(0), res.start(), res.end()
+            return None
+        start = data.find(keyword, pos)
+        if start < 0:
+            return None
+        return keyword, start, start + len(keyword)
+
+    def search(self, data, pos=0, expect_all=False):
+        '''
+        Search keywords in data from pos
+        Input: data (str/bytes)
+               pos (int)
+               expect_all (bool)[True for search all keywords/False for first found in keyword order]
+        Output: [(index, string, start, end), ...] in keyword order
+        '''
+        found = []
+        indexes = range(len(self.keywords))
+        if self.gates:
+            if gate_search(self.gates, data, pos) is None:
+                return found
+            if not expect_all:
+                if self._named_gate is None:
+                    self._named_gate = combine_keywords(self.keywords, named=True)
+                if self._named_gate is not None:
+                    # Keyword after first keyword found by gate is never first in keyword order
+                    indexes = range(gate_index(self._named_gate.search(data, pos)) + 1)
+        for index in indexes:
+            res = self.match(index, data, pos)
+            if res:
+                found.append((index,) + res)
+                if not expect_all:
+                    break
+        return found
+
+_keywordset_cache = {}
+
+def _keyword_key(keyword):
+    if isinstance(keyword, RE_TYPE):
+        return (RE_TYPE, type(keyword.pattern), keyword.pattern, keyword.flags)
+    return (type(keyword), keyword)
+
+def compile_keywords(keywords):
+    '''
+    Get KeywordSet of keywords, cached by keyword list
+    Input: keywords (list)[Can be str/bytes or re.compile]
+    Output: KeywordSet
+    '''
+    key = tuple(_keyword_key(keyword) for keyword in keywords)
+    try:
+        return _keywordset_cache[key]
+    except KeyError:
+        pass
+    if len(_keywordset_cache) >= KEYWORDSET_MAX_CACHE:
+        _keywordset_cache.clear()
+    keywordset = _keywordset_cache[key] = KeywordSet(keywords)
+    return keywordset
+
+class StreamMatcher(object):
+    '''
+    Incremental matcher for keyword list on stream data
+    Only scan new data plus an overlap window of each keyword (max match length - 1),
+    so cost of every feed is O(new data) instead of O(all data)
+    Regex with unbounded width is rescanned from first occurrence of its literal prefix
+    (from start of stream if it has no prefix), so it finds same match as search on whole stream
+    One character before scan start is kept, so anchor (^) or word boundary never matches at cut edge of window
+    With stream_gates of KeywordSet, new data is scanned once by gate for all gated keywords,
+    they are only searched one by one when gate finds something
+    '''
+    def __init__(self, keywords, expect_all=False):
+        '''
+        Input: keywords (list/KeywordSet)[Can be str/bytes or re.compile]
+               expect_all (bool)[True for find all keywords/False for find one keyword]
+        '''
+        self.keywordset = keywords if isinstance(keywords, KeywordSet) else compile_keywords(keywords)
+        self.keywords = self.keywordset.keywords
+        self.expect_all = expect_all
+        self.found = [] # Found string list, same as string_found of input_output_blocking
+        self.matches = [] # (index, string, start, end) of found keyword, position is offset in whole stream
+        self._overlaps = [None if width is MATCHER_UNBOUNDED else max(width - 1, 0)
+                          for width in self.keywordset.widths]
+        self._starts = [0] * len(self.keywords) # Stream offset from which keyword may still match
+        self._pending = list(range(len(self.keywords)))
+        self._window = None # Kept tail of stream for overlap, same type as data
+        self._window_base = 0 # Stream offset of self._window[0]
+        self._fed = False
+        # Gated keywords not found by gate advance together by _floor, with overlap of keyword or its prefix
+        if not self.keywordset.stream_gates:
+            self._gated = [False] * len(self.keywords)
+        else:
+            self._gated = [overlap is not None or bool(prefix)
+                           for overlap, prefix in zip(self._overlaps, self.keywordset.prefixes)]
+        gate_overlaps = [len(prefix) - 1 if overlap is None else overlap
+                         for overlap, prefix, gated in zip(self._overlaps, self.keywordset.prefixes, self._gated)
+                         if gated]
+        self._max_overlap = max(gate_overlaps) if gate_overlaps else 0
+        self._floor = 0 # Stream offset, start of every gated keyword (not held) is at least _floor
+        self._gate_from = 0 # Stream offset from which gate scans
+        self._held = set() # Unbounded keyword held at occurrence of its prefix, searched one by one
+        self._update_pending()
+
+    @property
+    def done(self):
+        '''Whether match condition reached'''
+        if self.expect_all:
+            return not self._pending
+        return bool(self.found)
+
+    def _start(self, index):
+        '''Stream offset from which pending keyword is scanned'''
+        start = self._starts[index]
+        if self._gated[index] and index not in self._held and self._floor > start:
+            return self._floor
+        return start
+
+    def _update_pending(self):
+        '''Split pending keywords into ones covered by gate and ones always searched one by one'''
+        self._solo_pending = [index for index in self._pending if not self._gated[index] or index in self._held]
+        self._gated_pending = len(self._solo_pending) < len(self._pending)
+
+    def feed(self, data):
+        '''
+        Feed new data from stream and scan pending keywords
+        Input: data (str/bytes)
+        Output: found string list of this feed (list)
+        '''
+        if self.done or (self._fed and not data):
+            return []
+        self._fed = True
+        window = data if self._window is None else self._window + data
+        end = self._window_base + len(window)
+        gates = self.keywordset.stream_gates
+        if gates and self._gated_pending and gate_search(gates, window, self._gate_from - self._window_base) is None:
+            # No gated keyword matches, they advance together, only others are searched
+            self._floor = max(end - self._max_overlap, self._floor)
+            indexes = self._solo_pending
+            skipped = True
+        else:
+            indexes = self._pending[:]
+            skipped = False
+        newfound = []
+        match = self.keywordset.match
+        for index in indexes:
+            pos = self._start(index) - self._window_base
+            res = match(index, window, pos)
+            if not res:
+                self._starts[index] = self._next_start(index, window, pos, end)
+                continue
+            string, start, stop = res
+            self._pending.remove(index)
+            self.found.append(string)
+            self.matches.append((index, string, self._window_base + start, self._window_base + stop))
+            newfound.append(string)
+            if not self.expect_all:
+                break
+        if skipped and not newfound:
+            # Held keyword stays held at its prefix, so split of pending keywords not changed
+            self._gate_from = self._floor
+            keep_from = min([self._starts[index] for index in self._solo_pending] + [self._floor])
+        else:
+            self._update_pending()
+            starts = [(index, self._start(index)) for index in self._pending]
+            self._gate_from = min([start for index, start in starts if self._gated[index] and index not in self._held]
+                                  or [end])
+            keep_from = min([start for _, start in starts] or [end])
+        self._keep(window, keep_from)
+        return newfound
+
+    def _keep(self, window, keep_from):
+        '''Keep window from keep_from (stream offset) for next feed'''
+        keep_from = max(keep_from - 1, self._window_base) # One character before scan start as context
+        self._window = window[keep_from - self._window_base:]
+        self._window_base = keep_from
+
+    def _next_start(self, index, window, pos, end):
+        '''Stream offset from which keyword not found in window[pos:] may still match after more data'''
+        start = self._window_base + pos
+        overlap = self._overlaps[index]
+        if overlap is not None:
+            return max(end - overlap, start)
+        prefix = self.keywordset.prefixes[index]
+        if not prefix:
+            return start # Match may start anywhere, keep all data
+        found = window.find(prefix, pos)
+        if found >= 0:
+            self._held.add(index)
+            return self._window_base + found # Match may start here once more data come
+        self._held.discard(index)
+        return max(end - len(prefix) + 1, start)
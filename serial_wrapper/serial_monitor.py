@@ -4,6 +4,7 @@ import sys
 import socket
 import threading
 import time
+import codecs
 
 _ver = sys.version_info
 is_py2 = (_ver[0] == 2)
@@ -33,10 +34,16 @@ class SerialMonitor(object):
         self.sleep_time = 0.001
         self.connect_retry = 3
         self.coding = coding
-        self.client=socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if str(port).isdigit():
+            self.client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            address = (LOCALHOST, int(port))
+        else:
+            # Unix socket path of BroadcastServer
+            self.client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            address = port
         for _ in range(self.connect_retry):
             try:
-                self.client.connect((LOCALHOST, int(port)))
+                self.client.connect(address)
             except Exception as e:
                 print("Connect Exception: {!r}".format(e))
                 print("Wait 3s then retry")
@@ -63,6 +70,8 @@ class SerialMonitor(object):
 
     def receive_data(self):
         data=u''
+        # HEX mode send hexlify string, keep split multibyte character for others
+        decoder = codecs.getincrementaldecoder('ascii' if self.coding == 'HEX' else self.coding)('replace')
         while 1:
             try:
                 data = self.client.recv(BUFSIZ)
@@ -80,7 +89,7 @@ class SerialMonitor(object):
                 time.sleep(10)
                 break
             try:
-                print(data.decode(self.coding), end='')
+                print(decoder.decode(data), end='')
             except Exception as e:
                 print("")
                 print("="*40)
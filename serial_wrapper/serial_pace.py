@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+'''
+Paced write for DUT without flow control: long command line/script is sent in chunks sized by baudrate,
+each chunk waits for its echo (or fitted delay from echo latency seen before) before next one,
+so tty line buffer / UART FIFO of DUT never overflow
+Chunk size adapts: grows while echo comes fast, halves once echo is late (characters likely dropped),
+then never grows beyond halved size, as probing larger chunk would drop characters of real input
+Line end is only sent after echo of whole line come, line with late echo is cancelled (Ctrl-C) and resent
+with smaller chunk, so DUT never runs mangled line
+'''
+import re
+import time
+import threading
+
+from .serial_wrapper import BaseHandler
+from .serial_clock import CLOCK
+
+PACE_CHUNK_TIME = 0.005     # Initial chunk is bytes transmitted in PACE_CHUNK_TIME at baudrate
+PACE_MIN_CHUNK = 8
+PACE_INITIAL_MAX_CHUNK = 64 # Common UART FIFO size, initial chunk is never larger than it
+PACE_MAX_CHUNK = 1024       # Chunk never grows larger, below tty line buffer (4096)
+PACE_GROW_AFTER = 4         # Grow chunk after so many fast echoes in a row
+PACE_ECHO_TIMEOUT = 1.0     # Max wait of echo for one chunk, then chunk is halved
+PACE_ECHO_KEY = 8           # Bytes of chunk tail searched in echo
+PACE_ECHO_WINDOW = 65536    # Bytes of stream kept by EchoWaiter
+PACE_LATENCY_WEIGHT = 0.25  # Weight of new echo latency in moving average
+PACE_BYTE_BITS = 10         # Start + 8 data + stop bits
+PACE_CANCEL = b'\x03'       # Ctrl-C, cancel line of DUT shell once its echo is late
+PACE_MAX_RETRY = 3          # Max resend of one line after cancel
+PACE_SETTLE_GAP = 0.05      # Quiet time of stream after cancel, before resend
+_LINE_END_RE = re.compile(b'[\r\n]+')
+_ECHO_SKIP_RE = re.compile(b'[\\x00-\\x1f\\x7f]') # Control characters may be echoed differently (^C, \r\n)
+
+class EchoWaiter(BaseHandler):
+    '''Raw handler keeping recent stream, for waiting echo of written chunk'''
+    raw = True
+
+    def __init__(self, logger=None, coding=None):
+        super(EchoWaiter, self).__init__(logger, coding)
+        self.received = bytearray()
+        self.offset = 0 # Stream offset of self.received[0]
+        self.lock = threading.Lock()
+        self.updated = threading.Condition(self.lock)
+
+    @property
+    def cursor(self):
+        '''Stream offset after all received data'''
+        with self.lock:
+            return self.offset + len(self.received)
+
+    def update(self, serialthread, data_tuple):
+        with self.lock:
+            self.received += data_tuple[0]
+            if len(self.received) > PACE_ECHO_WINDOW:
+                cut = len(self.received) - PACE_ECHO_WINDOW
+                del self.received[:cut]
+                self.offset += cut
+            self.updated.notify_all()
+
+    def wait(self, key, cursor, timeout):
+        '''
+        Block until key (bytes, b'' for any data) is received after stream offset cursor
+        Output: Result (bool)[False for timeout]
+        '''
+        deadline = time.time() + timeout
+        with self.updated:
+            while True:
+                start = max(cursor - self.offset, 0)
+                found = self.received.find(key, start) >= 0 if key else len(self.received) > start
+                if found:
+                    return True
+                wait = deadline - time.time()
+                if wait <= 0:
+                    return False
+                self.updated.wait(wait)
+
+    def close(self):
+        with self.lock:
+            del self.received[:]
+
+class PacedWriter(object):
+    '''
+    Write in chunks acknowledged by echo, adapt chunk size and fitted delay to echo latency
+    State (chunk size/latency) is kept between writes, so one PacedWriter serves one port
+    '''
+    def __init__(self, serialthread, chunk_size=None, echo_timeout=PACE_ECHO_TIMEOUT, cancel=PACE_CANCEL,
+                 retries=PACE_MAX_RETRY):
+        '''
+        Input:
+                serialthread: SerialThread to write
+                chunk_size: initial chunk size (int)[None for bytes of PACE_CHUNK_TIME at baudrate]
+                echo_timeout: max wait of echo for one chunk (float)
+                cancel: bytes to cancel current line of DUT once echo is late (bytes)
+                        [None for no resend, write returns False at once]
+                retries: max resend of one line (int)
+        '''
+        self.serialthread = serialthread
+        self.logger = serialthread.logger
+        baudrate = getattr(serialthread._serial, 'baudrate', None) or 115200
+        self.byte_time = float(PACE_BYTE_BITS) / baudrate # Seconds to transmit one byte
+        if chunk_size is None:
+            chunk_size = min(max(int(PACE_CHUNK_TIME / self.byte_time), PACE_MIN_CHUNK), PACE_INITIAL_MAX_CHUNK)
+        self.chunk_size = chunk_size
+        self.limit = PACE_MAX_CHUNK + 1 # Chunk stays below it, set to halved size once echo was late
+        self.echo_timeout = echo_timeout
+        self.cancel = cancel
+        self.retries = retries
+        self.resent = 0 # Lines cancelled and resent
+        self.latency = None # Moving average of echo latency beyond transmission time (float)[seconds]
+        self.echo_timeouts = 0
+        self.chunks = 0
+        self._fast = 0 # Fast echoes in a row
+
+    def fitted_delay(self, size):
+        '''Seconds to wait after chunk of size when echo is not checked'''
+        return size * self.byte_time + (self.latency or 0)
+
+    def write(self, data, echo=True):
+        '''
+        Write data in paced chunks, chunk never crosses line end
+        Input: data (str/bytes)
+               echo (bool)[True for wait echo of every chunk, False for wait fitted delay]
+        Output: True for success / False for serial not writable or line still late after retries
+        '''
+        data = bytes(self.serialthread._encoding(data))
+        waiter = None
+        if echo:
+            waiter = EchoWaiter(logger=self.logger, coding=self.serialthread.coding)
+            self.serialthread._add_handler(waiter)
+        start = CLOCK.now()
+        try:
+            index = 0
+            line_start = 0 # Line end is not sent yet after it, resend from it once line cancelled
+            retries = 0
+            while index < len(data):
+                chunk = self._next_chunk(data, index)
+                line_end = chunk[0:1] in (b'\r', b'\n')
+                cursor = waiter.cursor if waiter is not None else None
+                sent = CLOCK.now()
+                if not self.serialthread.write(chunk, log_payload=False):
+                    return False
+                self.chunks += 1
+                index += len(chunk)
+                if line_end:
+                    line_start, retries = index, 0
+                if waiter is None:
+                    time.sleep(self.fitted_delay(len(chunk)))
+                    continue
+                key = _ECHO_SKIP_RE.sub(b'', chunk)[-PACE_ECHO_KEY:]
+                if waiter.wait(key, cursor, self.echo_timeout + len(chunk) * self.byte_time):
+                    self._echo(len(chunk), (CLOCK.now() - sent) / 1e9)
+                    continue
+                if line_end:
+                    continue # Whole line was echoed before its line end, echo of line end may wait for command
+                self._late()
+                if self.cancel is None or retries >= self.retries:
+                    self.logger.error("Paced Write echo still late after {} resend, line not sent".format(retries))
+                    if self.cancel is not None:
+                        self.serialthread.write(self.cancel, log_payload=False)
+                    return False
+                retries += 1
+                self.resent += 1
+                self.logger.warning("Paced Write cancel line, resend in chunk {}".format(self.chunk_size))
+                self._cancel(waiter)
+                index = line_start
+        finally:
+            if waiter is not None:
+                self.serialthread._remove_handler(waiter)
+        self.logger.info("Paced Write: {0} bytes in {1:.3f}s (chunk {2}, echo latency {3})".format(
+            len(data), (CLOCK.now() - start) / 1e9, self.chunk_size, self.latency))
+        return True
+
+    def _next_chunk(self, data, index):
+        '''Line end chars are sent alone, line content in chunks of chunk_size'''
+        line_end = _LINE_END_RE.match(data, index)
+        if line_end:
+            return line_end.group(0)
+        end = min(index + self.chunk_size, len(data))
+        line_end = _LINE_END_RE.search(data, index, end)
+        return data[index:line_end.start() if line_end else end]
+
+    def _cancel(self, waiter):
+        '''Cancel current line of DUT, wait until its output (such as ^C and prompt) settle'''
+        cursor = waiter.cursor
+        self.serialthread.write(self.cancel, log_payload=False)
+        waiter.wait(b'', cursor, self.echo_timeout)
+        cursor = waiter.cursor
+        while waiter.wait(b'', cursor, PACE_SETTLE_GAP):
+            cursor = waiter.cursor
+
+    def _echo(self, size, seconds):
+        '''Echo of chunk come, update latency, grow chunk after fast echoes'''
+        latency = max(seconds - size * self.byte_time, 0)
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += (latency - self.latency) * PACE_LATENCY_WEIGHT
+        if latency <= 2 * self.latency + size * self.byte_time:
+            self._fast += 1
+            if self._fast >= PACE_GROW_AFTER and self.chunk_size < self.limit - 1:
+                self.chunk_size = min(self.chunk_size * 2, self.limit - 1)
+                self._fast = 0
+                self.logger.debug("Paced Write chunk grows to {}".format(self.chunk_size))
+        else:
+            self._fast = 0
+
+    def _late(self):
+        '''Echo not come in time, characters likely dropped by DUT, halve chunk'''
+        self.echo_timeouts += 1
+        self._fast = 0
+        self.chunk_size = max(self.chunk_size // 2, PACE_MIN_CHUNK)
+        self.limit = min(self.limit, self.chunk_size + 1) # Growth probe would drop characters of user input
+        self.logger.warning("Paced Write echo timeout, chunk shrinks to {}".format(self.chunk_size))
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+'''
+PortPool: process-wide registry of open, running SerialThread keyed by port,
+lease returns idle SerialThread of same port and settings without open/enumerate/thread start,
+release cleans handlers left by user and keeps port open for next lease
+Port can be any pyserial URL (socket://, rfc2217://, loop://, replay://...) or device/PTY path
+'''
+import time
+import atexit
+import threading
+import logging
+from contextlib import contextmanager
+
+from .serial_wrapper import SerialThread
+from .serial_wrapper import BaseSerialWrapperException
+from .serial_wrapper import DEFAULT_LOGGING_LEVEL
+
+class PortBusyException(BaseSerialWrapperException):
+    '''Port is leased by others and not released in time'''
+    pass
+
+class PoolEntry(object):
+    '''One pooled port: SerialThread, settings it was created with, and lease state'''
+    def __init__(self, port, serialthread, serial_class, kwargs):
+        self.port = port
+        self.serialthread = serialthread
+        self.serial_class = serial_class
+        self.kwargs = kwargs
+        self.leased = False
+        self.leases = 0
+
+    def __repr__(self):
+        return "PoolEntry({0!r}, leased={1})".format(self.port, self.leased)
+
+    def healthy(self):
+        '''Port still open and read by reader thread or hub'''
+        serialthread = self.serialthread
+        return (serialthread.alive and serialthread._serial.is_open and # close() keeps alive flag
+                (serialthread._reader_alive or serialthread._hub_attached))
+
+class PortPool(object):
+    '''
+    Lease running SerialThread by port, one lease per port at a time
+    Usage:
+        with PORT_POOL.port('/dev/ttyUSB0', serial_class=SerialLinux) as serial:
+            serial.command_output(u'uname -a')
+    '''
+    def __init__(self, logger=None):
+        if logger is not None:
+            self.logger = logger
+        else:
+            self.logger = logging
+            self.logger.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s',
+                                    level=DEFAULT_LOGGING_LEVEL)
+        self._entries = {} # port: PoolEntry
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self.hits = 0   # Lease served by pooled SerialThread
+        self.misses = 0 # Lease which open port
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, port):
+        with self._lock:
+            return port in self._entries
+
+    def lease(self, port, serial_class=SerialThread, timeout=0, logger=None, **kwargs):
+        '''
+        Get running SerialThread of port, open port only if no pooled one with same settings
+        Input:
+                port: serial port or pyserial URL (str), pool key as given
+                serial_class: SerialThread/SerialLinux/SerialAndroid... (class)
+                timeout: wait for port leased by others (float)[0 for raise at once]
+                logger: logging-like, set to pooled SerialThread[None for keep its logger]
+                kwargs: other arguments of serial_class (coding/serial_config/reader_mode...)
+        Output: SerialThread, must be given back by release
+        '''
+        deadline = time.time() + timeout
+        stale = None
+        with self._released:
+            entry = self._entries.get(port)
+            while entry is not None and entry.leased:
+                wait = deadline - time.time()
+                if wait <= 0:
+                    raise PortBusyException("{} is leased".format(port))
+                self._released.wait(wait)
+                entry = self._entries.get(port)
+            if entry is not None and (entry.serial_class is not serial_class or entry.kwargs != kwargs
+                                      or not entry.healthy()):
+                self.logger.info("Pool Drop {0}: settings changed or port dead".format(port))
+                stale = self._entries.pop(port)
+                entry = None
+            if entry is not None:
+                entry.leased = True
+                entry.leases += 1
+                self.hits += 1
+        if stale is not None:
+            stale.serialthread.close()
+        if entry is not None:
+            serialthread = entry.serialthread
+            if logger is not None:
+                serialthread.logger = logger
+            self.logger.info("Pool Lease {0} (Leases: {1})".format(port, entry.leases))
+            return serialthread
+        serialthread = serial_class(port, logger=logger, **kwargs)
+        with self._released:
+            if port in self._entries:
+                serialthread.close()
+                raise PortBusyException("{} is opened by other lease at same time".format(port))
+            entry = PoolEntry(port, serialthread, serial_class, kwargs)
+            entry.leased = True
+            entry.leases = 1
+            self._entries[port] = entry
+            self.misses += 1
+        self.logger.info("Pool Open {}".format(port))
+        return serialthread
+
+    def release(self, serialthread):
+        '''
+        Give back leased SerialThread: remove handlers and stats reporter left by user, keep port open
+        SerialThread closed or failed during lease is dropped from pool
+        '''
+        entry = self._find(serialthread)
+        if entry is None:
+            self.logger.warning("Pool Release: {!r} not leased from pool".format(serialthread))
+            return
+        serialthread.stop_stats_reporter()
+        for handler in serialthread._serial_handlers[:]:
+            serialthread._remove_handler(handler)
+        serialthread.disable_trace()
+        serialthread.log_payload = True
+        serialthread.paced_write = False
+        if serialthread._decoder is not None:
+            serialthread._decoder.reset() # Drop split character of last lease
+        healthy = entry.healthy()
+        with self._released:
+            entry.leased = False
+            if not healthy:
+                del self._entries[entry.port]
+            self._released.notify_all()
+        if not healthy:
+            self.logger.info("Pool Drop {}: port dead".format(entry.port))
+            serialthread.close()
+
+    def _find(self, serialthread):
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.serialthread is serialthread and entry.leased:
+                    return entry
+        return None
+
+    @contextmanager
+    def port(self, port, serial_class=SerialThread, timeout=0, logger=None, **kwargs):
+        '''Lease as context, release at exit'''
+        serialthread = self.lease(port, serial_class=serial_class, timeout=timeout, logger=logger, **kwargs)
+        try:
+            yield serialthread
+        finally:
+            self.release(serialthread)
+
+    def discard(self, port):
+        '''
+        Close idle SerialThread of port and remove it from pool
+        Output: True for closed / False for port not pooled or leased
+        '''
+        with self._lock:
+            entry = self._entries.get(port)
+            if entry is None or entry.leased:
+                return False
+            del self._entries[port]
+        entry.serialthread.close()
+        return True
+
+    def close(self):
+        '''Close all idle SerialThread, leased ones are left to their users'''
+        with self._lock:
+            entries = [entry for entry in self._entries.values() if not entry.leased]
+            for entry in entries:
+                del self._entries[entry.port]
+        for entry in entries:
+            entry.serialthread.close()
+        if entries:
+            self.logger.info("Pool Close: {0} ports (Hits: {1}, Misses: {2})".format(
+                len(entries), self.hits, self.misses))
+
+PORT_POOL = PortPool(logger=logging.getLogger(__name__)) # Process-wide pool
+atexit.register(PORT_POOL.close)
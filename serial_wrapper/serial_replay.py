@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+'''
+Replay capture (see serial_capture) through SerialThread as a file-backed fake port
+Port URL: replay://<capture path>[?speed=max|<factor>][&hold=1][&sync=write][&chunk=<bytes>]
+    speed: max for as fast as possible, factor of original timing (1 by default)
+    chunk: max bytes released to input buffer at once (REPLAY_CHUNK by default),
+           small chunk keeps record boundary for benchmark of per chunk cost
+    hold: keep port silent until ReplaySerial.resume, so handlers can be added first
+    sync: write for release output of one command per write, up to its exitcode marker
+          (see SerialLinux.exitcode_expect_for_write), recorded uid is rewritten to uid of the write,
+          so command methods (files_property/dumpsys/cpm_status...) parse recorded output
+'''
+import re
+import time
+import threading
+try:
+    from urllib.parse import urlsplit, parse_qs, quote, unquote
+except ImportError:
+    from urlparse import urlsplit, parse_qs
+    from urllib import quote, unquote
+
+from serial.serialutil import SerialBase, SerialException, PortNotOpenError, to_bytes
+
+from .serial_capture import CaptureReader, CaptureFormatException
+from .serial_wrapper import SerialThread, BaseHandler, DEFAULTCODING, READER_POLL
+
+REPLAY_SCHEME = 'replay'
+REPLAY_SPEED_MAX = 'max'
+REPLAY_CHUNK = 65536            # Max bytes released to input buffer at once, like kernel tty buffer
+REPLAY_HOLD_GAP = 0.001         # Read check gap of port opened with hold before resume
+REPLAY_SYNC_WRITE = 'write'
+EXITCODE_UID_RE = re.compile(br'\(([0-9A-Z]{8})\)ExitCode:')   # uid in command and its exitcode echo
+EXITCODE_MARK_RE = re.compile(br'\([0-9A-Z]{8}\)ExitCode:\d+\.') # exitcode echo, end of command output
+EXITCODE_MARK_MAX = 32          # Max length of exitcode echo, rescan when it is split between records
+REPLAY_TIMEOUT = 600            # Default max seconds of replay_throughput
+
+def replay_url(capture_path, speed=1, hold=False, sync=None, chunk=None):
+    '''
+    Build replay port URL for SerialThread
+    Input: capture_path (str)
+           speed (float/str)[factor of original timing, REPLAY_SPEED_MAX for as fast as possible]
+           hold (bool)[keep port silent until ReplaySerial.resume]
+           sync (str)[REPLAY_SYNC_WRITE for release one command output per write, None for by time only]
+           chunk (int)[Max bytes released to input buffer at once, None for REPLAY_CHUNK]
+    Output: url (str)
+    '''
+    url = u'{0}://{1}?speed={2}'.format(REPLAY_SCHEME, quote(capture_path), speed)
+    if hold:
+        url += u'&hold=1'
+    if sync:
+        url += u'&sync={}'.format(sync)
+    if chunk:
+        url += u'&chunk={}'.format(chunk)
+    return url
+
+class ReplaySerial(SerialBase):
+    '''
+    pyserial port which reads records of capture at their time offset (scaled by speed),
+    write is accepted and dropped (counted in written)
+    '''
+    def __init__(self, *args, **kwargs):
+        self.capture = None
+        self.speed = 1.0 # None for max speed
+        self.hold = False
+        self.sync = None
+        self.chunk = REPLAY_CHUNK
+        self.bytes_replayed = 0
+        self.written = 0
+        self._records = None
+        self._pending = None # (data, due offset seconds) of next record not in buffer
+        self._buffer = bytearray()
+        self._start = None
+        self._commands = 0 # Commands written but output not released, for REPLAY_SYNC_WRITE
+        self._uid = None # uid of last written command
+        self._marker_end = 0 # End of last counted exitcode echo in buffer
+        self._lock = threading.Lock()
+        super(ReplaySerial, self).__init__(*args, **kwargs)
+
+    def from_url(self, url):
+        '''Parse capture path and options from url'''
+        parts = urlsplit(url)
+        if parts.scheme != REPLAY_SCHEME:
+            raise SerialException("expected replay://<capture path>: {!r}".format(url))
+        for option, values in parse_qs(parts.query, True).items():
+            if option == 'speed':
+                self.speed = None if values[0] == REPLAY_SPEED_MAX else float(values[0])
+                if self.speed is not None and self.speed <= 0:
+                    raise SerialException("Invalid replay speed: {}".format(values[0]))
+            elif option == 'hold':
+                self.hold = values[0] not in ('', '0')
+            elif option == 'sync':
+                if values[0] != REPLAY_SYNC_WRITE:
+                    raise SerialException("Invalid replay sync: {}".format(values[0]))
+                self.sync = values[0]
+            elif option == 'chunk':
+                self.chunk = int(values[0])
+                if self.chunk <= 0:
+                    raise SerialException("Invalid replay chunk: {}".format(values[0]))
+            else:
+                raise SerialException("Unknown replay option: {!r}".format(option))
+        return unquote(parts.netloc + parts.path)
+
+    def open(self):
+        if self.is_open:
+            raise SerialException("Port is already open.")
+        if self._port is None:
+            raise SerialException("Port must be configured before it can be used.")
+        capture_path = self.from_url(self.port)
+        try:
+            self.capture = CaptureReader(capture_path)
+        except (IOError, OSError, CaptureFormatException) as err:
+            raise SerialException("Open capture {0} fail: {1!r}".format(capture_path, err))
+        self._records = self.capture.records()
+        self._next()
+        self._start = None if self.hold else time.time()
+        self.is_open = True
+
+    def close(self):
+        if self.is_open:
+            self.is_open = False
+            self.capture.close()
+        super(ReplaySerial, self).close()
+
+    def resume(self):
+        '''Start replay of port opened with hold, time of records count from now'''
+        with self._lock:
+            if self._start is None:
+                self._start = time.time()
+
+    @property
+    def replay_done(self):
+        '''True once all records are read from port'''
+        return self._pending is None and not self._buffer
+
+    def _next(self):
+        try:
+            data, data_time = next(self._records)
+        except StopIteration:
+            self._pending = None
+        else:
+            self._pending = (data, (data_time - self.capture.start_time).total_seconds())
+
+    def _due(self):
+        '''Seconds until next record is due, 0 for max speed'''
+        if self._start is None or (self.sync and self._commands <= 0):
+            return None
+        if self.speed is None:
+            return 0
+        return self._start + self._pending[1] / self.speed - time.time()
+
+    def _release(self, limit=None):
+        '''Move due records to input buffer, until buffer reach limit (chunk by default)'''
+        if self._start is None:
+            return
+        limit = limit or self.chunk
+        now = time.time()
+        while self._pending is not None and len(self._buffer) < limit:
+            if self.sync and self._commands <= 0:
+                break
+            data, offset = self._pending
+            if self.speed is not None and self._start + offset / self.speed > now:
+                break
+            self._buffer += data
+            self.bytes_replayed += len(data)
+            if self.sync:
+                self._sync(len(self._buffer) - len(data))
+            self._next()
+
+    def _sync(self, start):
+        '''Rewrite recorded uid to uid of last write, count exitcode echo from start of buffer'''
+        start = max(start - EXITCODE_MARK_MAX, 0)
+        tail = bytes(self._buffer[start:])
+        if self._uid is not None:
+            tail = EXITCODE_UID_RE.sub(b'(' + self._uid + b')ExitCode:', tail)
+            self._buffer[start:] = tail
+        for match in EXITCODE_MARK_RE.finditer(tail):
+            if start + match.end() > self._marker_end:
+                self._marker_end = start + match.end()
+                self._commands -= 1
+
+    def _reconfigure_port(self):
+        '''Settings are ignored by replay'''
+        pass
+
+    @property
+    def in_waiting(self):
+        if not self.is_open:
+            raise PortNotOpenError()
+        with self._lock:
+            self._release()
+            return len(self._buffer)
+
+    def read(self, size=1):
+        '''
+        Read like real port: block until size bytes or timeout,
+        return what is left once replay done instead of block forever without timeout
+        '''
+        if not self.is_open:
+            raise PortNotOpenError()
+        deadline = None if self._timeout is None else time.time() + self._timeout
+        while self.is_open:
+            with self._lock:
+                self._release(max(size, self.chunk))
+                if len(self._buffer) >= size:
+                    break
+                if self._pending is None:
+                    wait = None # Replay done
+                else:
+                    wait = self._due()
+                    if wait is None:
+                        wait = REPLAY_HOLD_GAP # Hold or wait command write
+            if deadline is not None:
+                left = deadline - time.time()
+                if left <= 0:
+                    break
+                wait = left if wait is None else min(wait, left)
+            elif wait is None:
+                break # Replay done without timeout, nothing more will come
+            if wait > 0:
+                time.sleep(wait)
+        with self._lock:
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+            self._marker_end = max(self._marker_end - len(data), 0)
+        return data
+
+    def write(self, data):
+        if not self.is_open:
+            raise PortNotOpenError()
+        data = to_bytes(data)
+        self.written += len(data)
+        if self.sync:
+            match = EXITCODE_UID_RE.search(data)
+            if match is not None:
+                with self._lock:
+                    self._uid = match.group(1)
+                    if self._commands <= 0 and self._pending is not None and self._start is not None:
+                        # Output of command starts from now, keep gaps between its records
+                        self._start = time.time() - self._pending[1] / (self.speed or 1)
+                    self._commands += 1
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        if not self.is_open:
+            raise PortNotOpenError()
+        with self._lock:
+            del self._buffer[:]
+            self._marker_end = 0
+
+    def reset_output_buffer(self):
+        if not self.is_open:
+            raise PortNotOpenError()
+
+    @property
+    def out_waiting(self):
+        return 0
+
+    def _update_break_state(self):
+        pass
+
+    def _update_rts_state(self):
+        pass
+
+    def _update_dtr_state(self):
+        pass
+
+    @property
+    def cts(self):
+        return True
+
+    @property
+    def dsr(self):
+        return True
+
+    @property
+    def ri(self):
+        return False
+
+    @property
+    def cd(self):
+        return True
+
+class CountHandler(BaseHandler):
+    '''Raw handler which count bytes notified, set done once all replayed bytes arrive'''
+    raw = True
+
+    def __init__(self, port, logger=None, coding=None):
+        super(CountHandler, self).__init__(logger, coding)
+        self.port = port
+        self.bytes = 0
+        self.chunks = 0
+        self.first_time = None
+        self.done = threading.Event()
+
+    def update(self, serialthread, data_tuple):
+        if self.first_time is None:
+            self.first_time = time.time()
+        self.bytes += len(data_tuple[0])
+        self.chunks += 1
+        if self.port.replay_done and self.bytes >= self.port.bytes_replayed:
+            self.done.set()
+
+    def close(self):
+        pass
+
+def replay_throughput(capture_path, speed=REPLAY_SPEED_MAX, coding=DEFAULTCODING, reader_mode=READER_POLL,
+                      setup=None, logger=None, timeout=REPLAY_TIMEOUT, serial_class=SerialThread, chunk=None):
+    '''
+    Replay capture through reader/notify/handlers of SerialThread, measure throughput of host pipeline
+    Input: capture_path (str)
+           speed (float/str)[factor of original timing, REPLAY_SPEED_MAX for as fast as possible]
+           coding (str)
+           reader_mode (str)[READER_POLL/READER_EVENT]
+           setup (function)[setup(serialthread) to add loggers/handlers before replay start]
+           logger: logging-like
+           timeout (float)[Max seconds to wait replay done]
+           serial_class (class)[SerialThread or subclass like SerialLinux]
+           chunk (int)[Max bytes of one read from port, None for REPLAY_CHUNK]
+    Output: dict (bytes/chunks/seconds/mb_per_sec/done)[done is False if timeout]
+    '''
+    serialthread = serial_class(replay_url(capture_path, speed, hold=True, chunk=chunk), coding=coding, logger=logger,
+                                reader_mode=reader_mode)
+    try:
+        port = serialthread._serial
+        counter = CountHandler(port, logger=serialthread.logger, coding=serialthread.coding)
+        if setup is not None:
+            setup(serialthread)
+        serialthread._add_handler(counter)
+        empty = port.replay_done
+        start = time.time()
+        port.resume()
+        done = True if empty else counter.done.wait(timeout)
+        seconds = max(time.time() - start, 1e-6)
+        serialthread.flush_loggers()
+    finally:
+        serialthread.close()
+    result = {
+        'bytes': counter.bytes,
+        'chunks': counter.chunks,
+        'seconds': seconds,
+        'mb_per_sec': counter.bytes / seconds / 1e6,
+        'done': done,
+    }
+    serialthread.logger.info("Replay {0}: {1} bytes in {2:.3f}s ({3:.2f} MB/s)".format(
+        capture_path, result['bytes'], seconds, result['mb_per_sec']))
+    return result
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+'''
+Simulated DUT: scriptable fake shell behind Linux pseudo-terminal,
+port of SimulatedShell can be used by SerialThread/SerialLinux/SerialAndroid like real serial port
+Note: Only work for POSIX (pty)
+'''
+import os
+import re
+import time
+import codecs
+import random
+import select
+import threading
+import logging
+
+SIM_ROOT_PROMPT = u'console:/ # '
+SIM_SHELL_PROMPT = u'console:/ $ '
+SIM_SELECT_GAP = 0.05               # Max block time of shell thread, bound stop latency and noise jitter
+SIM_PACE_SLICES = 100               # Throughput pacing writes output in 1/SIM_PACE_SLICES second slices
+SIM_NOISE = (
+    u'[  123.456789] healthd: battery l=100 v=4200 t=25.0 h=2 st=5 chg=u',
+    u'[  124.000001] init: Service \'vendor.sim\' (pid 321) exited with status 0',
+)
+CTRL_C = u'\x03'
+
+SIM_PROPS = {
+    u'ro.build.version.sdk': u'28',
+    u'ro.build.version.incremental': u'eng.sim.20200101',
+    u'ro.product.model': u'SimDUT',
+    u'dev.bootcomplete': u'1',
+}
+
+SIM_LS = u'''drwxrwx--x system   system            2020-01-01 08:00 app
+-rw-r--r-- root     root         1024 2020-01-01 08:01 boot.img
+lrwxrwxrwx root     root              2020-01-01 08:02 vendor -> /system/vendor
+'''
+
+SIM_IFCONFIG = u'''eth0      Link encap:Ethernet  HWaddr 00:11:22:33:44:55  Driver r8169
+          inet addr:192.168.1.100  Bcast:192.168.1.255  Mask:255.255.255.0
+          UP BROADCAST RUNNING MULTICAST  MTU:1500  Metric:1
+
+lo        Link encap:Local Loopback
+          inet addr:127.0.0.1  Mask:255.0.0.0
+          UP LOOPBACK RUNNING  MTU:65536  Metric:1
+'''
+
+SIM_MEMINFO = u'''MemTotal:        2048000 kB
+MemFree:          512000 kB
+MemAvailable:    1024000 kB
+Buffers:           32000 kB
+Cached:           256000 kB
+'''
+
+SIM_DUMPSYS_POWER = u'''POWER MANAGER (dumpsys power)
+
+Power Manager State:
+  mDirty=0x0
+  mWakefulness=Awake
+  mIsPowered=true
+  mPlugType=1
+  mBatteryLevel=100
+
+Wake Locks: size=1
+  PARTIAL_WAKE_LOCK              'AudioMix' ACQ=-1s123ms (uid=1041 pid=300)
+
+Suspend Blockers: size=2
+  PowerManagerService.WakeLocks: ref count=1
+  PowerManagerService.Display: ref count=0
+
+Display Power: state=ON
+'''
+
+class SimulatedShell(object):
+    '''
+    Fake shell behind pty: echo input, print prompt, run canned commands,
+    support ';' list, echo with $? and $(command), su/exit/id for root state
+    Commands are checked by regex fullmatch, user commands first, output can be
+    str or callable(shell, match) returning str or (str, exit code)
+    '''
+    def __init__(self, commands=None, props=None, prompt=SIM_ROOT_PROMPT, echo=True, throughput=None, latency=0,
+                 noise=None, noise_interval=1.0, fifo_size=None, logger=None):
+        '''
+        Input:
+                commands: {regex (str): output} to add/override canned commands (dict)
+                props: props for getprop (dict)[Updated over SIM_PROPS]
+                prompt: SIM_ROOT_PROMPT/SIM_SHELL_PROMPT (str)[Start as root or not]
+                echo: echo input like tty (bool)
+                throughput: max output bytes per second (int)[None for no limit]
+                latency: seconds before output of every command (float)
+                noise: lines print to console every noise_interval when idle (list)[None for no noise,
+                       True for SIM_NOISE]
+                noise_interval: seconds between noise lines (float)
+                fifo_size: max input bytes taken at once, rest is dropped like UART FIFO overflow
+                           without flow control (int)[None for no limit]
+                logger: logging-like
+        '''
+        self.logger = logger if logger is not None else logging
+        self.props = dict(SIM_PROPS)
+        if props:
+            self.props.update(props)
+        self.commands = [(re.compile(pattern), output) for pattern, output in (commands or {}).items()]
+        self.commands.extend((re.compile(pattern), output) for pattern, output in (
+            (r'ls -al? *"?(?P<path>[^"]*)"?', SIM_LS),
+            (r'ifconfig', SIM_IFCONFIG),
+            (r'cat /proc/meminfo', SIM_MEMINFO),
+            (r'getprop', lambda shell, match: u''.join(
+                u'[{0}]: [{1}]\n'.format(key, value) for key, value in sorted(shell.props.items()))),
+            (r'getprop (?P<key>\S+)', lambda shell, match: shell.props.get(match.group('key'), u'') + u'\n'),
+            (r'setprop (?P<key>\S+) (?P<value>.*)', lambda shell, match: shell.props.update(
+                {match.group('key'): match.group('value').strip(u'"\'')}) or u''),
+            (r'dumpsys power', SIM_DUMPSYS_POWER),
+            (r'id', lambda shell, match: u'uid=0(root) gid=0(root) groups=0(root)\n' if shell.root
+             else u'uid=2000(shell) gid=2000(shell) groups=2000(shell)\n'),
+            (r'su', lambda shell, match: shell._set_root(True)),
+            (r'exit', lambda shell, match: shell._set_root(False)),
+        ))
+        self.root = prompt == SIM_ROOT_PROMPT
+        self.prompt = prompt
+        self.echo = echo
+        self.throughput = throughput
+        self.latency = latency
+        self.noise = list(SIM_NOISE) if noise is True else noise
+        self.noise_interval = noise_interval
+        self.fifo_size = fifo_size
+        self.dropped = 0 # Input bytes dropped by fifo_size
+        self.exit_code = 0
+        self.received = 0
+        self.sent = 0
+        self.master_fd = None
+        self.slave_fd = None
+        self.port = None
+        self.thread = None
+        self._alive = False
+        self._line = u''
+        self._last_cr = False
+        self._decoder = codecs.getincrementaldecoder('UTF-8')('replace')
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        '''Create pty and start shell thread, port is path of pty slave'''
+        import pty
+        import tty
+        self.master_fd, self.slave_fd = pty.openpty()
+        tty.setraw(self.slave_fd) # Keep slave open, so pty lives when port is reopened
+        self.port = os.ttyname(self.slave_fd)
+        self._alive = True
+        self.thread = threading.Thread(target=self._run, name='sim')
+        self.thread.daemon = True
+        self.thread.start()
+        self.logger.info("Simulated Shell Start: {}".format(self.port))
+        return self.port
+
+    def stop(self):
+        '''Stop shell thread and close pty'''
+        if not self._alive:
+            return
+        self._alive = False
+        self.thread.join()
+        os.close(self.master_fd)
+        os.close(self.slave_fd)
+        self.logger.info("Simulated Shell Stop: {0} (received {1}, sent {2})".format(
+            self.port, self.received, self.sent))
+
+    def _set_root(self, root):
+        self.root = root
+        self.prompt = SIM_ROOT_PROMPT if root else SIM_SHELL_PROMPT
+        return u''
+
+    def _run(self):
+        '''loop read input from pty, echo and run command once line complete'''
+        next_noise = time.time() + self.noise_interval if self.noise else None
+        while self._alive:
+            readable, _, _ = select.select([self.master_fd], [], [], SIM_SELECT_GAP)
+            if next_noise is not None and time.time() >= next_noise:
+                self._send(u'\r\n{}\r\n'.format(random.choice(self.noise)))
+                next_noise = time.time() + self.noise_interval
+            if not readable:
+                continue
+            try:
+                data = os.read(self.master_fd, 4096)
+            except OSError:
+                continue # No one opens slave yet
+            if self.fifo_size and len(data) > self.fifo_size:
+                self.dropped += len(data) - self.fifo_size
+                data = data[:self.fifo_size]
+            self.received += len(data)
+            self._input(self._decoder.decode(data))
+
+    def _input(self, text):
+        for char in text:
+            last_cr, self._last_cr = self._last_cr, char == u'\r'
+            if char == CTRL_C:
+                self._line = u''
+                self._send(u'^C\r\n' + self.prompt)
+            elif char == u'\n' and last_cr:
+                continue # \n of \r\n, line already run by \r
+            elif char in u'\r\n':
+                line, self._line = self._line, u''
+                if self.echo:
+                    self._send(u'\r\n')
+                output = self.run_line(line)
+                if self.latency:
+                    time.sleep(self.latency)
+                self._send(output.replace(u'\n', u'\r\n') + self.prompt)
+            else:
+                self._line += char
+                if self.echo:
+                    self._send(char)
+
+    def run_line(self, line):
+        '''Run command list of one line, return output'''
+        output = []
+        for cmd in _split_commands(line):
+            cmd_output, self.exit_code = self.run_command(cmd)
+            output.append(cmd_output)
+        return u''.join(output)
+
+    def run_command(self, cmd):
+        '''
+        Run one command
+        Output: output (str)
+                exit code (int)
+        '''
+        cmd = cmd.strip()
+        if not cmd:
+            return u'', self.exit_code
+        if cmd == u'echo' or cmd.startswith(u'echo '):
+            return self._expand(cmd[5:]) + u'\n', 0
+        for pattern, output in self.commands:
+            match = pattern.match(cmd)
+            if match is None or match.end() != len(cmd):
+                continue
+            if callable(output):
+                output = output(self, match)
+            if isinstance(output, tuple):
+                return output
+            return output, 0
+        return u'/system/bin/sh: {}: not found\n'.format(cmd.split()[0]), 127
+
+    def _expand(self, args):
+        '''Expand $? and $(command) in echo args, and remove quotes'''
+        args = re.sub(r'\$\(([^)]*)\)', lambda match: self.run_command(match.group(1))[0].strip(), args)
+        args = args.replace(u'$?', str(self.exit_code))
+        return re.sub(r'["\']', u'', args.strip())
+
+    def _send(self, text):
+        '''Write text to pty, paced by throughput'''
+        data = text.encode('UTF-8')
+        slice_size = max(self.throughput // SIM_PACE_SLICES, 1) if self.throughput else len(data)
+        for start in range(0, len(data), slice_size or 1):
+            if not self._write(data[start:start + slice_size]):
+                return
+            if self.throughput:
+                time.sleep(1.0 / SIM_PACE_SLICES)
+
+    def _write(self, data):
+        '''Write all data unless shell stop, port may not read while output is large'''
+        while data:
+            if not self._alive:
+                return False
+            _, writable, _ = select.select([], [self.master_fd], [], SIM_SELECT_GAP)
+            if writable:
+                size = os.write(self.master_fd, data)
+                self.sent += size
+                data = data[size:]
+        return True
+
+def _split_commands(line):
+    '''Split command line by ; out of quotes and $()'''
+    commands = []
+    current = []
+    quote = None
+    depth = 0
+    for index, char in enumerate(line):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in u'"\'':
+            quote = char
+        elif char == u'(' and line[index - 1:index] == u'$':
+            depth += 1
+        elif char == u')' and depth:
+            depth -= 1
+        elif char == u';' and not depth:
+            commands.append(u''.join(current))
+            current = []
+            continue
+        current.append(char)
+    commands.append(u''.join(current))
+    return commands
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+'''
+Runtime statistics of SerialThread: read/write throughput, queue depth,
+handler update latency, expect match latency, serial exception and flush time
+'''
+import time
+import threading
+from bisect import bisect_left
+
+# Upper bound (seconds) of latency histogram buckets, last bucket is for larger latency
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+STATS_REPORT_INTERVAL = 10          # Default interval (seconds) of StatsReporter
+
+class LatencyHistogram(object):
+    '''Fixed bucket histogram of latency (seconds)'''
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, latency):
+        self.counts[bisect_left(self.buckets, latency)] += 1
+        self.count += 1
+        self.total += latency
+        if latency > self.max:
+            self.max = latency
+
+    def percentile(self, percent):
+        '''
+        Get upper bound of bucket which percent of latency fall in
+        Input: percent (float)[0-100]
+        Output: latency (float)[max latency if in last bucket, 0 if no data]
+        '''
+        if not self.count:
+            return 0.0
+        rank = self.count * percent / 100.0
+        total = 0
+        for index, count in enumerate(self.counts):
+            total += count
+            if total >= rank and count:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self):
+        '''
+        Output: dict (count/mean/max/p50/p99/buckets)[buckets is {upper bound: count}, 'inf' for last bucket]
+        '''
+        buckets = dict(zip(self.buckets, self.counts))
+        buckets['inf'] = self.counts[-1]
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'buckets': buckets,
+        }
+
+class SerialStats(object):
+    '''
+    Counters and histograms updated by SerialThread
+    Note: counters are updated without lock, snapshot may be a little inconsistent under load
+    '''
+    def __init__(self):
+        self.start_time = time.time()
+        self.bytes_read = 0
+        self.chunks_read = 0
+        self.bytes_written = 0
+        self.writes = 0
+        self.read_exceptions = 0
+        self.write_exceptions = 0
+        self.retries = 0
+        self.handler_latency = {} # handler name: LatencyHistogram
+        self.match_latency = LatencyHistogram()
+        self.flush_latency = LatencyHistogram()
+        self._lock = threading.Lock() # Only for create handler histogram
+
+    def add_read(self, size):
+        self.bytes_read += size
+        self.chunks_read += 1
+
+    def add_write(self, size, flush_time=None):
+        self.bytes_written += size
+        self.writes += 1
+        if flush_time is not None:
+            self.flush_latency.add(flush_time)
+
+    def add_handler(self, name, latency):
+        histogram = self.handler_latency.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.handler_latency.setdefault(name, LatencyHistogram())
+        histogram.add(latency)
+
+    def add_match(self, latency):
+        self.match_latency.add(latency)
+
+    def snapshot(self):
+        '''
+        Output: dict of all counters, rates since start and histogram snapshots
+        '''
+        uptime = max(time.time() - self.start_time, 1e-6)
+        return {
+            'uptime': uptime,
+            'bytes_read': self.bytes_read,
+            'chunks_read': self.chunks_read,
+            'read_bytes_per_sec': self.bytes_read / uptime,
+            'read_chunks_per_sec': self.chunks_read / uptime,
+            'bytes_written': self.bytes_written,
+            'writes': self.writes,
+            'read_exceptions': self.read_exceptions,
+            'write_exceptions': self.write_exceptions,
+            'retries': self.retries,
+            'handler_latency': dict((name, histogram.snapshot())
+                                    for name, histogram in list(self.handler_latency.items())),
+            'match_latency': self.match_latency.snapshot(),
+            'flush_latency': self.flush_latency.snapshot(),
+        }
+
+class StatsReporter(object):
+    '''Report stats of SerialThread periodically, by callback or logger at INFO'''
+    def __init__(self, serialthread, interval=STATS_REPORT_INTERVAL, callback=None):
+        '''
+        Input: serialthread (SerialThread)
+               interval (float)[seconds]
+               callback (function)[callback(stats dict), None for log summary]
+        '''
+        self.serialthread = serialthread
+        self.logger = serialthread.logger
+        self.interval = interval
+        self.callback = callback
+        self._stop_event = threading.Event()
+        self._last = None
+        self.thread = None
+
+    def start(self):
+        self._last = self.serialthread.stats()
+        self.thread = threading.Thread(target=self._run, name='stats')
+        self.thread.daemon = True
+        self.thread.start()
+        self.logger.info("Stats Reporter Start: every {}s".format(self.interval))
+
+    def stop(self):
+        self._stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.logger.info("Stats Reporter Stop")
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            stats = self.serialthread.stats()
+            gap = max(stats['uptime'] - self._last['uptime'], 1e-6)
+            stats['interval_read_bytes_per_sec'] = (stats['bytes_read'] - self._last['bytes_read']) / gap
+            stats['interval_read_chunks_per_sec'] = (stats['chunks_read'] - self._last['chunks_read']) / gap
+            self._last = stats
+            if self.callback is not None:
+                self.callback(stats)
+            else:
+                self.logger.info(format_stats(stats))
+
+def format_stats(stats):
+    '''Format stats dict to one line summary'''
+    return (u"Stats: read {0:.0f}B/s ({1:.1f} chunk/s) queue {2} exceptions {3}/{4} "
+            u"match p99 {5:.4f}s flush p99 {6:.4f}s handlers {7}").format(
+                stats.get('interval_read_bytes_per_sec', stats['read_bytes_per_sec']),
+                stats.get('interval_read_chunks_per_sec', stats['read_chunks_per_sec']),
+                stats.get('queue_depth', 0), stats['read_exceptions'], stats['write_exceptions'],
+                stats['match_latency']['p99'], stats['flush_latency']['p99'],
+                u', '.join(u'{0} p99 {1:.4f}s'.format(name, value['p99'])
+                           for name, value in sorted(stats['handler_latency'].items())))
@@ -47,6 +47,9 @@ CPM_PATTERNS = {
         ),
 }
 
+PREPARE_PROMPTS = (u'login:', u' # ', u' $ ', u'# ') # Prompts checked by serial_prepare, in priority order
+PREPARE_TAIL = 8 # Longer than any of PREPARE_PROMPTS
+PREPARE_POLL = 0.1 # Max wait of serial_prepare for new output
 
 
 class SynaBaseException(AndroidBaseException):
@@ -57,8 +60,9 @@ class SynaInvalidOutputException(SynaBaseException):
 
 class SerialSyna(SerialAndroid):
 
-    def __init__(self, serial_port, coding=DEFAULTCODING, serial_config=None, console_monitor=True, logger=None):
-        super(SerialSyna, self).__init__(serial_port, coding, serial_config, console_monitor, logger)
+    def __init__(self, serial_port, coding=DEFAULTCODING, serial_config=None, console_monitor=True, logger=None,
+                 **kwargs):
+        super(SerialSyna, self).__init__(serial_port, coding, serial_config, console_monitor, logger, **kwargs)
 
     def serial_prepare(self, timeout=10):
         '''Prepare serial in root state for later work
@@ -75,31 +79,43 @@ class SerialSyna(SerialAndroid):
         time.sleep(0.1)
         self.write(u'\n')
         os = None
-        while time.time() - start_time < timeout:
-            if u'login:' in output_hd.readall():
-                self.logger.info("DUT is Synaptics Linux")
-                os = 'linux'
-                break
-            elif u' # ' in output_hd.readall():
-                self.logger.info("DUT is Android root")
-                os = 'android'
-                return
-            elif u' $ ' in output_hd.readall():
-                self.logger.info("DUT is Android none-root")
-                os = 'android'
-                break
-            elif u'# ' in output_hd.readall():
-                self.logger.info("DUT is Synaptics Linux root")
-                os = 'linux'
-                return
-        else:
-            output = output_hd.readall()
-            if output:
-                self.logger.error("Timeout(%ss) to prepare serial, unknown response", timeout)
-                self.logger.error("output: %r", )
+        found = set()
+        cursor = 0
+        tail = u''
+        try:
+            while time.time() - start_time < timeout:
+                # Only scan new output, tail keeps prompt split between reads
+                data, cursor = output_hd.read_since(cursor)
+                window = tail + data
+                found.update(prompt for prompt in PREPARE_PROMPTS if prompt in window)
+                tail = window[-PREPARE_TAIL:]
+                if u'login:' in found:
+                    self.logger.info("DUT is Synaptics Linux")
+                    os = 'linux'
+                    break
+                elif u' # ' in found:
+                    self.logger.info("DUT is Android root")
+                    os = 'android'
+                    return
+                elif u' $ ' in found:
+                    self.logger.info("DUT is Android none-root")
+                    os = 'android'
+                    break
+                elif u'# ' in found:
+                    self.logger.info("DUT is Synaptics Linux root")
+                    os = 'linux'
+                    return
+                output_hd.wait_since(cursor, PREPARE_POLL)
             else:
-                self.logger.error("Serial no response? DUT no power or serial config wrong?")
-            raise SynaInvalidOutputException
+                output = output_hd.readall()
+                if output:
+                    self.logger.error("Timeout(%ss) to prepare serial, unknown response", timeout)
+                    self.logger.error("output: %r", output)
+                else:
+                    self.logger.error("Serial no response? DUT no power or serial config wrong?")
+                raise SynaInvalidOutputException
+        finally:
+            self.close_logger(output_hd)
         if os == 'linux':
             try:
                 self.expect_for_write("root\n", "#", True, timeout=time.time()+timeout-start_time)
@@ -291,6 +307,12 @@ class SerialSyna(SerialAndroid):
                 leakage/temp/voltage(int)
                 status(string)
         '''
+        cmd = u'cat /proc/cpm/status'
+        _, res = self.command_output(cmd, timeout=5)
+        return self._cpm_status_parse(res)
+
+    def _cpm_status_parse(self, res):
+        '''Get cpm status dict from output of cat /proc/cpm/status'''
         def filter_data(ret):
             int_data_keys = (
                 u'total',
@@ -323,9 +345,6 @@ class SerialSyna(SerialAndroid):
                             assert value[bool_data] in check_list
                             value[bool_data] = value[bool_data] == check_list[0]
 
-        cmd = u'cat /proc/cpm/status'
-        _, res = self.command_output(cmd, timeout=5)
-
         ret = {}
         for module, pattern in CPM_PATTERNS.items():
             values = {}
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+'''
+Tracer: record hot path events (read/notify/handler update/readall...) into
+preallocated ring buffer of fixed-size records (time, event, value) instead of logging
+Hot path only checks "if self.tracer", so tracing costs almost nothing when disabled
+'''
+import time
+from array import array
+from datetime import datetime
+
+TRACE_RING_SIZE = 4096              # Default records kept by Tracer
+
+TRACE_READ = 1                      # value: bytes read from serial
+TRACE_QUEUE_PUT = 2                 # value: _serial_q size after put
+TRACE_NOTIFY = 3                    # value: bytes of chunk got by notify
+TRACE_HANDLER = 4                   # value: index of handler updated in dispatch
+TRACE_DISPATCH_DONE = 5             # value: handler count of dispatch
+TRACE_IO_UPDATE = 6                 # value: bytes of IOHandler update
+TRACE_IO_LINES = 7                  # value: lines written to file by IOHandler update
+TRACE_READALL = 8                   # value: length of IOHandler readall
+TRACE_WRITE = 9                     # value: bytes written to serial
+TRACE_SERIAL_EXCEPTION = 10         # value: serial exception time
+TRACE_EXPECT_FOUND = 11             # value: found keyword count
+TRACE_EXPECT_TIMEOUT = 12           # value: found keyword count
+TRACE_HUB_READ = 13                 # value: bytes read by SerialHub
+
+TRACE_NAMES = {
+    TRACE_READ: 'read',
+    TRACE_QUEUE_PUT: 'queue_put',
+    TRACE_NOTIFY: 'notify',
+    TRACE_HANDLER: 'handler',
+    TRACE_DISPATCH_DONE: 'dispatch_done',
+    TRACE_IO_UPDATE: 'io_update',
+    TRACE_IO_LINES: 'io_lines',
+    TRACE_READALL: 'readall',
+    TRACE_WRITE: 'write',
+    TRACE_SERIAL_EXCEPTION: 'serial_exception',
+    TRACE_EXPECT_FOUND: 'expect_found',
+    TRACE_EXPECT_TIMEOUT: 'expect_timeout',
+    TRACE_HUB_READ: 'hub_read',
+}
+
+class Tracer(object):
+    '''
+    Ring buffer of fixed-size trace records, all arrays are allocated once
+    Note: record takes no lock, records from threads at same time may overwrite each other
+    '''
+    def __init__(self, size=TRACE_RING_SIZE):
+        self.size = size
+        self.times = array('d', [0.0]) * size
+        self.events = array('B', [0]) * size
+        self.values = array('l', [0]) * size
+        self.index = 0 # Next record slot
+        self.count = 0 # Total records, include overwritten
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def __bool__(self):
+        return True # Tracer without records is still enabled for "if self.tracer" check
+    __nonzero__ = __bool__
+
+    def record(self, event, value=0):
+        '''
+        Record one event
+        Input: event (int)[TRACE_*]
+               value (int)
+        '''
+        index = self.index
+        self.index = (index + 1) % self.size
+        self.times[index] = time.time()
+        self.events[index] = event
+        self.values[index] = value
+        self.count += 1
+
+    def clear(self):
+        self.index = 0
+        self.count = 0
+
+    def records(self):
+        '''
+        Get kept records from oldest to newest
+        Output: [(time (float), event name (str), value (int)), ...]
+        '''
+        if self.count < self.size:
+            indexes = range(self.count)
+        else:
+            indexes = list(range(self.index, self.size)) + list(range(self.index))
+        return [(self.times[index], TRACE_NAMES.get(self.events[index], str(self.events[index])),
+                 self.values[index]) for index in indexes]
+
+    def dump(self, logger=None, last=None):
+        '''
+        Format kept records, and log them at WARNING if logger is defined
+        Input: logger (logging)
+               last (int)[Only dump last records, None for all kept records]
+        Output: lines (list)
+        '''
+        records = self.records()
+        if last is not None:
+            records = records[-last:]
+        lines = [u"{0} {1:<16} {2}".format(datetime.fromtimestamp(rtime).strftime('%H:%M:%S.%f'), name, value)
+                 for rtime, name, value in records]
+        if logger is not None:
+            logger.warning("Trace Dump: {0} records ({1} dropped)".format(len(lines), self.count - len(self)))
+            for line in lines:
+                logger.warning("    " + line)
+        return lines
@@ -4,7 +4,6 @@ import logging
 import threading
 from io import open
 import time
-from datetime import datetime
 import re
 from collections import deque
 import socket
@@ -13,6 +12,11 @@ import os
 import random
 import binascii
 import platform
+import select
+import codecs
+import pickle
+import tempfile
+import errno
 
 _VER = sys.version_info
 IS_PY2 = (_VER[0] == 2)
@@ -38,6 +42,18 @@ import serial
 from serial.tools.list_ports import comports
 from serial import SerialException
 
+from .serial_matcher import StreamMatcher
+from .serial_logfile import RotatingLogFile
+from .serial_logfile import compress_of
+from .serial_clock import CLOCK
+from .serial_trace import Tracer
+from .serial_stats import SerialStats
+from .serial_stats import StatsReporter
+from .serial_stats import STATS_REPORT_INTERVAL
+from .serial_trace import TRACE_RING_SIZE, TRACE_READ, TRACE_QUEUE_PUT, TRACE_NOTIFY, TRACE_HANDLER
+from .serial_trace import TRACE_DISPATCH_DONE, TRACE_IO_UPDATE, TRACE_IO_LINES, TRACE_READALL, TRACE_WRITE
+from .serial_trace import TRACE_SERIAL_EXCEPTION, TRACE_EXPECT_FOUND, TRACE_EXPECT_TIMEOUT, TRACE_HUB_READ
+
 try:
     RE_TYPE = re._pattern_type
 except AttributeError:
@@ -64,6 +80,56 @@ TIMEOUT = u'Timeout'
 MAX_SERIAL_EXCEPTION_TIMES = 3      # Define max retry time if find serial exception
 RETRY_GAP = 0.5                     # When serial exception happen, retry gap time
 SERIAL_READ_GAP = 0.001             # Normal serial read gap time
+READER_POLL = 'poll'                # Reader polls in_waiting and sleeps SERIAL_READ_GAP if no data
+READER_EVENT = 'event'              # Reader blocks on port fd (select) or on port read timeout
+READER_BLOCK_TIMEOUT = 0.1          # Max blocking time in event reader, bound stop latency of reader
+QUEUE_BLOCK = 'block'               # Handler queue full: block notify until handler catch up
+QUEUE_DROP_OLDEST = 'drop_oldest'   # Handler queue full: drop oldest chunk
+QUEUE_SPILL = 'spill'               # Handler queue full: save chunks to temp file, and update later
+HANDLER_QUEUE_SIZE = 256            # Default max chunks in one handler queue
+WRITE_IOV_MAX = 1024                # Max buffers in one writev of write_many
+BYTES_TYPES = (bytes, bytearray, memoryview) # Data types written to serial without encode/copy
+LOG_BUFFER_SIZE = 65536             # Default buffer size of file logger created by create_logger
+LOG_FLUSH_INTERVAL = 1.0            # Max time (seconds) lines stay in buffer of file logger
+LOG_FLUSH_TIMEOUT = 5.0             # Max time to wait queued logger catch up when flush
+LINESEP = os.linesep.encode('UTF-8')
+
+URL_HANDLER_PACKAGE = __name__.rpartition('.')[0] # Package of protocol_* url handlers, like replay://
+if URL_HANDLER_PACKAGE and URL_HANDLER_PACKAGE not in serial.protocol_handler_packages:
+    serial.protocol_handler_packages.append(URL_HANDLER_PACKAGE)
+
+DEFAULT_SERIAL_CONFIG = {
+    'baudrate': 115200,
+    'bytesize': EIGHTBITS,
+    'parity': PARITY_NONE,
+    'stopbits': STOPBITS_ONE,
+    'xonxoff': False,
+    'rtscts': False,
+    'dsrdtr': False,
+    'write_timeout': None,
+}
+
+try:
+    _is_ascii = bytes.isascii
+except AttributeError:
+    def _is_ascii(data):
+        '''Check whether bytes only contain ASCII'''
+        try:
+            data.decode('ascii')
+        except UnicodeDecodeError:
+            return False
+        return True
+
+def byte_view(data):
+    '''Get 1-D unsigned byte memoryview of bytes-like data without copy'''
+    view = memoryview(data)
+    if IS_PY3 and (view.ndim != 1 or view.format != 'B'):
+        view = view.cast('B')
+    return view
+
+def incremental_decoder(coding):
+    '''Get stateful decoder of coding, which keep multibyte character split between 2 chunks'''
+    return codecs.getincrementaldecoder(coding)('ignore')
 
 class BaseSerialWrapperException(Exception):
     pass
@@ -74,8 +140,19 @@ class SerialWrapperException(BaseSerialWrapperException):
 class SerialTimeoutException(BaseSerialWrapperException):
     pass
 
+def merged_update(handler, serialthread, chunks):
+    '''Update handler once with data of all chunks (list of data_tuple) and timestamp of first chunk'''
+    if len(chunks) == 1:
+        handler.update(serialthread, chunks[0])
+    else:
+        handler.update(serialthread, (chunks[0][0][:0].join([data for data, _ in chunks]), chunks[0][1]))
+
 class BaseHandler(object):
     '''BaseHandler for IOHander/SocketHandler'''
+    raw = False # True for get raw bytes from serial in update, False for get decoded string
+    tracer = None # Tracer of serial, set by SerialThread.enable_trace
+    stats_name = None # Name in stats of serial, set by SerialThread._add_handler if None
+
     def __init__(self, logger=None, coding=None):
         self.logger = logger
         self.coding = coding # This define data coding from serial
@@ -85,10 +162,29 @@ class BaseHandler(object):
         self.close()
 
     def update(self, serialthread, data_tuple):
+        '''
+        Called with every chunk read from serial
+        Input:
+                serialthread: SerialThread which read the chunk
+                data_tuple: (data, timestamp)[data is bytes for raw handler or decoded string,
+                            timestamp is int monotonic ns (not datetime), use CLOCK.to_datetime(timestamp)
+                            for wall time, or CLOCK.elapsed/CLOCK.to_ns to compare with other stamps]
+        '''
         _, _ = serialthread, data_tuple
         self.logger.critical("Must define update in subclass")
         raise NotImplementedError
 
+    def update_many(self, serialthread, chunks):
+        '''
+        Called with all chunks queued for handler which falls behind (see HandlerQueue)
+        Default merges chunks into one update with timestamp of first chunk,
+        handler which needs time of every chunk should override it
+        Input:
+                serialthread: SerialThread which read the chunks
+                chunks: [(data, timestamp), ...] (list)[same as data_tuple of update, in read order]
+        '''
+        merged_update(self, serialthread, chunks)
+
     def close(self):
         self.logger.critical("Must define close in subclass")
         raise NotImplementedError
@@ -97,8 +193,13 @@ class IOHandler(BaseHandler):
     '''
     This is a object which offer IOHandler for SerialThread.
     Using it when create input_output_blocking/create_logger from SerialThread
+    Get raw bytes from serial, and only decode when read
     '''
-    def __init__(self, filepath=None, logger=None, coding=None, timestamp=True, noread=False):
+    raw = True
+
+    def __init__(self, filepath=None, logger=None, coding=None, timestamp=True, noread=False, readnew=False,
+                 buffer_size=0, flush_interval=LOG_FLUSH_INTERVAL, rotate_size=None, rotate_interval=None,
+                 compress=None):
         '''
         Always create BytesIO for read (without timestmap)
         If define filepath, will use file handler (with or without timestamp)
@@ -107,19 +208,48 @@ class IOHandler(BaseHandler):
                 logger: logging-like (should have function debug/info/critical/exception ...)
                 timestamp: Control whether write line to file with timestamp or not(bool)
                 noread: only logging, not need to read (False)
+                readnew: keep new data for readnew (False)
+                buffer_size: buffer formatted lines and write file once buffer reach buffer_size (int)
+                             [0 for write lines of every update to file at once]
+                flush_interval: max time lines stay in buffer (float)[seconds]
+                rotate_size: rotate file once it reach rotate_size (int)[bytes, None for no limit]
+                rotate_interval: rotate file every rotate_interval (float)[seconds, None for no limit]
+                compress: compress rotated file in background (str)[gzip/bz2/xz, None for keep plain],
+                          filepath end with .gz/.bz2/.xz is written compressed directly
         '''
         super(IOHandler, self).__init__(logger, coding)
         self.filepath = filepath
         self.timestamp = timestamp
-        self.tempdata = u'' # TempData for save data without new line temprarily
+        self.tempdata = bytearray() # TempData for save data without new line temprarily
         self.temptime = '' # TempTime for save timestamp for TempData
+        self.rawlist = deque() # Save (Data, TimeStamp) not decoded yet
+        self.decoder = None if self.coding == HEXMODE else incremental_decoder(self.coding)
+        self.file_utf8 = self.coding != HEXMODE and codecs.lookup(self.coding).name == 'utf-8'
         self.stringlist = deque() # Save all Data as string list
-        self.stringcache = u'' # Once user try to get all data, merge all Data from stringlist
+        self.stringcache = b'' if self.coding == HEXMODE else u'' # Once user try to get all data, merge all Data from stringlist
         self.noread = noread
+        self.readnew_enable = readnew and not noread
+        self.newlist = deque() # Save (Data, TimeStamp) not get by readnew yet
+        self.length = 0 # Length of all data saved for read, cursor of read_since is offset of it
         self.lock = threading.Lock()
+        self.updated = threading.Condition(self.lock) # Notify all waiters on every update
+        self.update_count = 0
+        self.update_time = None # Arrival time of last data (monotonic ns, see serial_clock)
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.file_buffer = bytearray() # Formatted lines not written to file yet
+        self.flush_due = None # Time buffered lines must be written by flusher thread
+        self.flush_cond = threading.Condition(self.lock) # Wake up flusher thread when lines buffered or close
+        self.flusher = None # One long-lived flusher thread, started at first buffered lines
+        self.flusher_alive = False
         if self.filepath:
             try:
-                self.file_handler = open(self.filepath, 'ab', 0)
+                if rotate_size or rotate_interval or compress or compress_of(self.filepath):
+                    self.file_handler = RotatingLogFile(self.filepath, rotate_size=rotate_size,
+                                                        rotate_interval=rotate_interval, compress=compress,
+                                                        logger=self.logger)
+                else:
+                    self.file_handler = open(self.filepath, 'ab', 0)
                 self.logger.debug("Open {} for Serial Output logging".format(self.filepath))
                 self.logger.debug("Timestamp: {}".format(self.timestamp))
             except IOError as err:
@@ -135,105 +265,635 @@ class IOHandler(BaseHandler):
 
     def update(self, serialthread, data_tuple):
         '''Get Serial Data/TimeStamp'''
-        self.logger.debug("IOHandler Get Update")
         data, data_time = data_tuple
+        if self.tracer:
+            self.tracer.record(TRACE_IO_UPDATE, len(data))
         # if sys.platform == 'win32':
         #     data.replace(u'\r',u'')
         if not self.noread:
             self.lock.acquire()
-            self.stringlist.append(data)
+            self._store(data, data_time)
+            self.update_count += 1
+            self.update_time = data_time
+            self.updated.notify_all()
             self.lock.release()
         if self.filepath:
-            if self.coding == HEXMODE:
-                self.write(data, data_time)
-            else:
-                if self.tempdata:
-                    self.logger.debug("Tempdata exist")
-                    alldata = self.tempdata + data
-                    start = 1 # Write first line with old timestamp (self.temptime)
-                else:
-                    self.logger.debug("Tempdata not exist")
-                    alldata = data
-                    start = 0 # Write first line with new timestamp (data_time)
-                    self.logger.debug("TempTime Update")
-                    self.temptime = data_time
-                data_list = alldata.split(u'\n')
-                assert len(data_list) >= 1, "alldata is blank"
-                if len(data_list) == 1:
-                    # There is no new line flag, wait for new data
-                    self.logger.debug("There is no new line flag, skip to write line to file")
-                    self.tempdata = data_list[0]
-                    return
-                if self.tempdata:
-                    self.logger.debug("Write Tempdata to line with TempTime")
-                    self.write(data_list[0], self.temptime)
-                last = len(data_list) - 1
-                if data_list[-1] == u'':
-                    # If last unit is blank, mean there is no new data for tempdata
-                    self.logger.debug("AllData with \\n at end, Reset TempData")
-                    self.tempdata = u''
-                else:
-                    self.logger.debug("AllData without \\n at end, Set TempData and TempTime")
-                    self.tempdata = data_list[-1]
-                    self.temptime = data_time
-                assert last >= start, "Invalid last({0}) or start({1})".format(last, start)
-                self.logger.debug("Write AllData to file from line {0} to {1}".format(start, last))
-                for line in range(start, last):
-                    self.write(data_list[line], data_time)
+            for lines, timestamp in self._split_lines(data, data_time):
+                self.write_lines(lines, timestamp)
         return
 
+    def update_many(self, serialthread, chunks):
+        '''
+        Get all queued chunks in one update, every chunk keeps its own timestamp for read and file,
+        lines of all chunks are written to file in one batch
+        '''
+        if self.tracer:
+            for data, _ in chunks:
+                self.tracer.record(TRACE_IO_UPDATE, len(data))
+        if not self.noread:
+            with self.lock:
+                for data, data_time in chunks:
+                    self._store(data, data_time)
+                self.update_count += len(chunks)
+                self.update_time = chunks[-1][1]
+                self.updated.notify_all()
+        if self.filepath:
+            self._write_formatted(b''.join([self._format_lines(lines, timestamp)
+                                            for data, data_time in chunks
+                                            for lines, timestamp in self._split_lines(data, data_time)]))
+
+    def _split_lines(self, data, data_time):
+        '''
+        Split complete lines of new data for file, line without new line flag is kept in tempdata
+        Output: [(lines, timestamp), ...] (list)
+        '''
+        if self.coding == HEXMODE:
+            return [([data], data_time)]
+        if b'\n' not in data:
+            # There is no new line flag, wait for new data
+            if not self.tempdata:
+                self.temptime = data_time
+            self.tempdata += data
+            return []
+        # Only split new data, so long line without new line flag is not rescanned on every update
+        data_list = data.split(b'\n')
+        batches = []
+        if self.tempdata:
+            self.tempdata += data_list[0]
+            batches.append(([bytes(self.tempdata)], self.temptime))
+            start = 1 # First line already written with old timestamp (self.temptime)
+        else:
+            start = 0 # Write first line with new timestamp (data_time)
+        last = len(data_list) - 1
+        # If last unit is blank, mean there is no new data for tempdata
+        self.tempdata = bytearray(data_list[-1])
+        self.temptime = data_time
+        assert last >= start, "Invalid last({0}) or start({1})".format(last, start)
+        if self.tracer:
+            self.tracer.record(TRACE_IO_LINES, last - start)
+        if last > start:
+            batches.append((data_list[start:last], data_time))
+        return batches
+
+    def _store(self, data, data_time):
+        '''Save raw data for read, called with self.lock'''
+        if self.decoder is None:
+            self._store_text(data, data_time)
+        else:
+            self.rawlist.append((data, data_time))
+
+    def _store_text(self, data, data_time):
+        '''Save decoded data for read, called with self.lock'''
+        self.stringlist.append(data)
+        self.length += len(data)
+        if self.readnew_enable:
+            self.newlist.append((data, data_time))
+
+    def _decode(self):
+        '''Decode raw data which not decoded yet, called with self.lock'''
+        if not self.rawlist:
+            return
+        if self.readnew_enable:
+            # Decode chunk by chunk, so readnew_chunks keeps arrival time of every chunk
+            for raw, data_time in self.rawlist:
+                data = self.decoder.decode(raw)
+                if data:
+                    self._store_text(data, data_time)
+        else:
+            data = self.decoder.decode(b''.join([raw for raw, _ in self.rawlist]))
+            if data:
+                self._store_text(data, self.rawlist[-1][1])
+        self.rawlist.clear()
+
+    def _line_utf8(self, line):
+        '''Get UTF-8 bytes of line for file, ASCII line of UTF-8 coding need no decoding'''
+        if self.file_utf8 and _is_ascii(line):
+            return line
+        return line.decode(self.coding, 'ignore').encode('UTF-8')
+
     def write(self, data, timestamp=None):
-        '''Write Data to FileHandler'''
-        tstr = u"{:%Y-%m-%d %H:%M:%S.%f}".format(timestamp)[:-3] + u' ' if self.timestamp else u''
+        '''
+        Write one line to FileHandler
+        Input: data (str/bytes)[str is encoded with coding of handler]
+               timestamp (int/datetime)[monotonic ns or datetime, None for now]
+        '''
+        if not isinstance(data, (bytes, bytearray)):
+            data = data.encode('UTF-8' if self.coding == HEXMODE else self.coding)
+        self.write_lines([bytes(data)], timestamp)
+
+    def write_lines(self, lines, timestamp=None):
+        '''
+        Format lines (bytes) with same timestamp (int monotonic ns or datetime, None for now) in one batch,
+        and write to FileHandler or buffer
+        '''
+        if not lines:
+            return
+        self._write_formatted(self._format_lines(lines, timestamp))
+
+    def _format_lines(self, lines, timestamp):
+        '''Format lines (bytes) with same timestamp for file'''
+        if not self.timestamp:
+            tstr = b''
+        else:
+            tstr = CLOCK.prefix(CLOCK.now() if timestamp is None else timestamp)
         if self.coding == HEXMODE:
-            write_data = u"{}".format(binascii.hexlify(data).decode('ascii'))
+            write_data = [binascii.hexlify(line) for line in lines]
         else:
-            write_data = u"{}".format(data)
-        write_line = u"{0}{1}{2}".format(tstr, write_data.strip(), os.linesep)
+            write_data = [self._line_utf8(line.strip()) for line in lines]
+        return b''.join([tstr + line + LINESEP for line in write_data])
+
+    def _write_formatted(self, write_lines):
+        '''Write formatted lines to FileHandler or buffer'''
+        if not write_lines:
+            return
         with self.lock:
-            try:
-                self.file_handler.write(write_line.encode('UTF-8'))
-            except IOError as err:
-                self.logger.critical("Write {} Fail".format(self.file_handler.name))
-                self.logger.critical("Exception: {!r}".format(err))
-                self.logger.exception("Stack: ")
-                raise
-            else:
-                self.logger.debug("Write data to file successfully")
+            if not self.buffer_size:
+                self._write_file(write_lines)
+                return
+            self.file_buffer += write_lines
+            if len(self.file_buffer) >= self.buffer_size:
+                self._flush_file()
+            elif self.flush_due is None:
+                self.flush_due = time.time() + self.flush_interval
+                if self.flusher is None:
+                    self.flusher_alive = True
+                    self.flusher = threading.Thread(target=self._flusher, name='flusher')
+                    self.flusher.daemon = True
+                    self.flusher.start()
+                else:
+                    self.flush_cond.notify()
+
+    def _flusher(self):
+        '''Write buffered lines to file once they stay flush_interval in buffer, until close'''
+        with self.lock:
+            while self.flusher_alive:
+                if self.flush_due is None:
+                    self.flush_cond.wait()
+                    continue
+                wait_time = self.flush_due - time.time()
+                if wait_time > 0:
+                    self.flush_cond.wait(wait_time)
+                    continue
+                if self.file_handler.closed:
+                    break
+                self._flush_file()
+                self.file_handler.flush()
+
+    def _write_file(self, data):
+        '''Write bytes to FileHandler, called with self.lock'''
+        try:
+            self.file_handler.write(data)
+        except IOError as err:
+            self.logger.critical("Write {} Fail".format(self.file_handler.name))
+            self.logger.critical("Exception: {!r}".format(err))
+            self.logger.exception("Stack: ")
+            raise
+
+    def _flush_file(self):
+        '''Write buffered lines to FileHandler, called with self.lock'''
+        self.flush_due = None
+        if self.file_buffer:
+            self._write_file(self.file_buffer)
+            self.file_buffer = bytearray()
+
+    def flush(self):
+        '''Write buffered lines to file, line without new line flag yet is kept'''
+        if self.filepath:
+            with self.lock:
+                if not self.file_handler.closed:
+                    self._flush_file()
+                    self.file_handler.flush()
 
     def readall(self):
         '''Return all data, if noread is True, return False'''
         if not self.noread:
             blank = b'' if self.coding == HEXMODE else u''
             self.lock.acquire()
+            self._decode()
             self.stringlist.appendleft(self.stringcache)
             self.stringcache = blank.join(self.stringlist)
             self.stringlist.clear()
             self.lock.release()
-            if len(self.stringcache):
-                self.logger.debug("Readall: {}".format(len(self.stringcache)))
+            if self.tracer:
+                self.tracer.record(TRACE_READALL, len(self.stringcache))
             return self.stringcache
         return False
 
+    def readnew(self):
+        '''Return data since last readnew (readnew should be True), if noread is True, return False'''
+        if self.readnew_enable:
+            blank = b'' if self.coding == HEXMODE else u''
+            with self.lock:
+                self._decode()
+                data = blank.join([chunk for chunk, _ in self.newlist])
+                self.newlist.clear()
+            return data
+        return False
+
+    def readnew_chunks(self):
+        '''
+        Return chunks since last readnew with their arrival time (readnew should be True)
+        Output: [(data, timestamp), ...] (list)[timestamp is monotonic ns, see serial_clock]
+        '''
+        if self.readnew_enable:
+            with self.lock:
+                self._decode()
+                chunks = list(self.newlist)
+                self.newlist.clear()
+            return chunks
+        return False
+
+    def _join(self, parts):
+        '''Merge parts of stringlist/stringcache into data for read'''
+        return (b'' if self.coding == HEXMODE else u'').join(parts)
+
+    def _join_held(self, parts):
+        '''
+        Merge parts into data for read_since
+        Output: data, size of tail held back for next read (int)[character split at end]
+        '''
+        return self._join(parts), 0
+
+    def _since(self, cursor):
+        '''
+        Parts of data from cursor to end, called with self.lock
+        Only walk chunks after cursor, so cost is O(new data) but not O(all data)
+        '''
+        parts = []
+        pos = self.length
+        for chunk in reversed(self.stringlist):
+            if pos <= cursor:
+                break
+            pos -= len(chunk)
+            parts.append(chunk)
+        parts.reverse()
+        if parts and pos < cursor:
+            parts[0] = parts[0][cursor - pos:]
+        elif pos > cursor and self.stringcache:
+            # stringcache is merged data before stringlist
+            parts.insert(0, self.stringcache[max(cursor - pos + len(self.stringcache), 0):])
+        return parts
+
+    def read_since(self, cursor=0):
+        '''
+        Return data since cursor and new cursor, for polling without re-copy all data
+        Input: cursor (int)[0 for from beginning, or cursor returned by last read_since]
+        Output: data (str)[bytes for HEXMODE, False if noread is True]
+                cursor (int)[Pass to next read_since]
+        '''
+        if self.noread:
+            return False, cursor
+        data, cursor, _ = self._read_since(cursor)
+        return data, cursor
+
+    def _read_since(self, cursor):
+        '''Output: data since cursor, cursor for next read, end of all data'''
+        with self.lock:
+            self._decode()
+            parts = self._since(cursor)
+            end = self.length
+        data, held = self._join_held(parts)
+        return data, end - held, end
+
+    def peek_tail(self, size):
+        '''Return last size of data (not consumed like readnew), if noread is True, return False'''
+        if self.noread:
+            return False
+        with self.lock:
+            self._decode()
+            parts = self._since(max(self.length - size, 0))
+        return self._join(parts)[-size:] if size > 0 else self._join([])
+
+    def iter_chunks(self, timeout=None, cursor=0):
+        '''
+        Yield data chunks as they arrive, stop once no new data in timeout
+        Input: timeout (float)[None for wait forever]
+               cursor (int)[0 for from beginning, self.length for only new data]
+        '''
+        if self.noread:
+            return
+        while True:
+            data, cursor, end = self._read_since(cursor)
+            if data:
+                yield data
+            elif not self.wait_since(end, timeout): # Wait after held split character, not spin on it
+                return
+
+    def iter_lines(self, timeout=None, cursor=0):
+        '''
+        Yield lines (without line end) as they arrive, stop once no new data in timeout
+        Line without new line flag yet is yielded when stop
+        Input: timeout (float)[None for wait forever]
+               cursor (int)[0 for from beginning, self.length for only new data]
+        '''
+        rest = self._join([])
+        for data in self.iter_chunks(timeout, cursor):
+            lines = (rest + data).split(b'\n' if self.coding == HEXMODE else u'\n')
+            rest = lines.pop()
+            for line in lines:
+                yield line.rstrip(b'\r' if self.coding == HEXMODE else u'\r')
+        if rest:
+            yield rest
+
+    def wait_since(self, cursor, timeout=None):
+        '''
+        Block until data after cursor come or timeout, for polling with read_since
+        Input: cursor (int)[cursor returned by read_since]
+               timeout (float)[None for wait forever]
+        Output: Result (bool)[True for data after cursor exist]
+        '''
+        with self.updated:
+            if not (self.rawlist or self.length > cursor):
+                self.updated.wait(timeout)
+            return bool(self.rawlist or self.length > cursor)
+
+    def wait_update(self, timeout=None):
+        '''
+        Block until new data come or timeout
+        If readnew is True, return immediately when data not get by readnew exist
+        Input: timeout (float)[None for wait forever]
+        Output: Result (bool)[True for new data exist]
+        '''
+        with self.updated:
+            if self.readnew_enable:
+                if not (self.newlist or self.rawlist):
+                    self.updated.wait(timeout)
+                return bool(self.newlist or self.rawlist)
+            count = self.update_count
+            self.updated.wait(timeout)
+            return self.update_count != count
+
     def close(self):
         '''Close FileHandler'''
         try:
             if self.filepath:
                 if self.tempdata:
                     self.logger.info("Write rest TempData to file and Reset TempData")
-                    self.write(self.tempdata, self.temptime)
-                    self.tempdata = u''
+                    self.write(bytes(self.tempdata), self.temptime)
+                    self.tempdata = bytearray()
+                with self.lock:
+                    self.flusher_alive = False
+                    self.flush_cond.notify()
+                if self.flusher is not None and self.flusher is not threading.current_thread():
+                    self.flusher.join()
+                    self.flusher = None
                 if not self.file_handler.closed:
+                    with self.lock:
+                        self._flush_file()
                     self.file_handler.close()
                     self.logger.info("Close File Handler - {}".format(self.file_handler.name))
         except AttributeError:
             self.logger.info("filepath already GC")
-        self.stringcache = u''
+        self.stringcache = self.stringcache[:0]
         self.stringlist.clear()
-        self.tempdata = u''
+        self.rawlist.clear()
+        self.newlist.clear()
+        self.length = 0
+        self.tempdata = bytearray()
+
+class RingIOHandler(IOHandler):
+    '''
+    IOHandler which only keep last max_size data for read, for long-running session
+    Older data out of max_size will be dropped, or write to spillpath if defined
+    '''
+    def __init__(self, max_size, spillpath=None, filepath=None, logger=None, coding=None, timestamp=True,
+                 readnew=False, buffer_size=0, flush_interval=LOG_FLUSH_INTERVAL, rotate_size=None,
+                 rotate_interval=None, compress=None):
+        '''
+        Input:
+                max_size: max size of kept raw data (int)[bytes]
+                spillpath: filepath to save raw data out of max_size (str)
+                           None for drop data out of max_size
+                filepath/logger/coding/timestamp/readnew/buffer_size/flush_interval/
+                rotate_size/rotate_interval/compress: see IOHandler
+        '''
+        assert max_size > 0, "max_size should be positive"
+        self.max_size = max_size
+        self.spillpath = spillpath
+        self.size = 0 # Size of raw data in self.stringlist
+        self.dropped = 0 # Size of data out of max_size (dropped or spilled)
+        self.spill_handler = None
+        if self.spillpath:
+            try:
+                self.spill_handler = open(self.spillpath, 'ab')
+            except IOError as err:
+                logger.critical("Open {} Fail".format(self.spillpath))
+                logger.critical("Exception: {!r}".format(err))
+                raise
+        super(RingIOHandler, self).__init__(filepath=filepath, logger=logger, coding=coding, timestamp=timestamp,
+                                            readnew=readnew, buffer_size=buffer_size, flush_interval=flush_interval,
+                                            rotate_size=rotate_size, rotate_interval=rotate_interval,
+                                            compress=compress)
+        self.logger.debug("RingIOHandler max_size: {0} spillpath: {1}".format(self.max_size, self.spillpath))
+
+    def _store(self, data, data_time):
+        '''Save raw data into ring, drop or spill oldest data out of max_size, called with self.lock'''
+        self.stringlist.append(data)
+        if self.readnew_enable:
+            super(RingIOHandler, self)._store(data, data_time)
+        self.size += len(data)
+        self.length += len(data)
+        while self.size > self.max_size:
+            oldest = self.stringlist[0]
+            cut = self.size - self.max_size
+            if len(oldest) <= cut:
+                self.stringlist.popleft()
+                dropped = oldest
+            else:
+                self.stringlist[0] = oldest[cut:]
+                dropped = oldest[:cut]
+            self.size -= len(dropped)
+            if not self.dropped:
+                self.logger.info("RingIOHandler({0}) up to max_size {1}".format(self, self.max_size))
+            self.dropped += len(dropped)
+            if self.spill_handler is not None:
+                self.spill_handler.write(dropped)
+
+    def _store_text(self, data, data_time):
+        '''Ring keep raw data itself, decoded data only for readnew, called with self.lock'''
+        self.newlist.append((data, data_time))
+
+    def _join(self, parts):
+        '''Ring keep raw data, cursor is offset of raw data, data before kept data is skipped'''
+        data = b''.join(parts)
+        if self.coding == HEXMODE:
+            return data
+        return data.decode(self.coding, 'ignore')
+
+    def _join_held(self, parts):
+        '''Decode raw data, multibyte character split at end is held back, so next read_since decode it whole'''
+        data = b''.join(parts)
+        if self.coding == HEXMODE:
+            return data, 0
+        decoder = incremental_decoder(self.coding)
+        text = decoder.decode(data)
+        return text, len(decoder.getstate()[0])
+
+    def readall(self):
+        '''Return all kept data (last max_size), if noread is True, return False'''
+        if not self.noread:
+            with self.lock:
+                # Not merge into one string, so dropping oldest data only cut small chunk
+                data = b''.join(self.stringlist)
+            if self.coding == HEXMODE:
+                return data
+            return data.decode(self.coding, 'ignore')
+        return False
+
+    def close(self):
+        '''Close FileHandler and Spill FileHandler'''
+        super(RingIOHandler, self).close()
+        self.size = 0
+        if self.spill_handler is not None and not self.spill_handler.closed:
+            self.spill_handler.close()
+            self.logger.info("Close Spill File Handler - {}".format(self.spillpath))
+
+class HandlerQueue(object):
+    '''
+    Run update of one handler in its own worker thread with a bounded queue,
+    so slow handler (disk/socket) not delay other handlers of same serial.
+    When handler falls behind, all queued chunks are given in one update_many (see BaseHandler.update_many),
+    so handler catches up with one update while every chunk keeps its own timestamp.
+    '''
+    def __init__(self, handler, logger=None, maxsize=HANDLER_QUEUE_SIZE, policy=QUEUE_BLOCK):
+        '''
+        Input:
+                handler: handler to run in worker thread (BaseHandler)
+                logger: logging-like (should have function debug/info/critical/exception ...)
+                maxsize: max chunks in queue (int)
+                policy: QUEUE_BLOCK/QUEUE_DROP_OLDEST/QUEUE_SPILL when queue is full
+        '''
+        assert policy in (QUEUE_BLOCK, QUEUE_DROP_OLDEST, QUEUE_SPILL), "Invalid policy: {}".format(policy)
+        self.handler = handler
+        self.raw = handler.raw
+        self.logger = logger
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0 # Dropped chunks for QUEUE_DROP_OLDEST
+        self.spilled = 0 # Chunks saved to spill file for QUEUE_SPILL
+        self.queue = deque()
+        self.cond = threading.Condition()
+        self.spill_file = None
+        self.spill_pending = False # New chunk should go to spill file to keep order
+        self.updating = False # Worker is updating handler with chunks taken from queue
+        self.alive = False
+        self.worker_thread = None
+        self.serialthread = None
+        name = getattr(handler, 'stats_name', None) or type(handler).__name__
+        self.stats_name = "{} (queued)".format(name) # Name in stats of serial, for enqueue
+        self.worker_stats_name = "{} (worker)".format(name)
+
+    def __repr__(self):
+        return "HandlerQueue({!r})".format(self.handler)
+
+    def start(self):
+        '''Start worker thread'''
+        self.alive = True
+        self.worker_thread = threading.Thread(target=self._worker, name='handler')
+        self.worker_thread.daemon = True
+        self.worker_thread.start()
+        self.logger.info("Handler Worker Start: {!r}".format(self.handler))
+
+    def stop(self):
+        '''Stop worker thread after rest chunks are updated to handler'''
+        with self.cond:
+            self.alive = False
+            self.cond.notify_all()
+        if self.worker_thread is not None and self.worker_thread.is_alive():
+            self.worker_thread.join()
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+        self.logger.info("Handler Worker Stop: {!r} (Dropped: {}, Spilled: {})".format(
+            self.handler, self.dropped, self.spilled))
+
+    def update(self, serialthread, data_tuple):
+        '''Put chunk into queue, called by notify thread'''
+        self.serialthread = serialthread
+        with self.cond:
+            if self.policy == QUEUE_SPILL and (self.spill_pending or len(self.queue) >= self.maxsize):
+                self._spill(data_tuple)
+            else:
+                if len(self.queue) >= self.maxsize:
+                    if self.policy == QUEUE_BLOCK:
+                        while len(self.queue) >= self.maxsize and self.alive:
+                            self.cond.wait()
+                    else:
+                        self.queue.popleft()
+                        self.dropped += 1
+                self.queue.append(data_tuple)
+            self.cond.notify_all()
+
+    def _spill(self, data_tuple):
+        '''Save chunk to spill file, called with self.cond'''
+        if self.spill_file is None:
+            self.spill_file = tempfile.TemporaryFile()
+            self.logger.warning("Handler({!r}) falls behind, spill chunks to temp file".format(self.handler))
+        pickle.dump(data_tuple, self.spill_file, pickle.HIGHEST_PROTOCOL)
+        self.spill_pending = True
+        self.spilled += 1
+
+    def _unspill(self):
+        '''Load all chunks from spill file into queue, called with self.cond'''
+        self.spill_file.seek(0)
+        while True:
+            try:
+                self.queue.append(pickle.load(self.spill_file))
+            except EOFError:
+                break
+        self.spill_file.seek(0)
+        self.spill_file.truncate()
+        self.spill_pending = False
+
+    def flush(self, timeout=LOG_FLUSH_TIMEOUT):
+        '''Wait until queued chunks updated to handler (at most timeout), then flush handler if it can'''
+        deadline = time.time() + timeout
+        with self.cond:
+            while (self.queue or self.spill_pending or self.updating) and self.alive:
+                wait_time = deadline - time.time()
+                if wait_time <= 0:
+                    self.logger.warning("Handler({!r}) flush timeout".format(self.handler))
+                    break
+                self.cond.wait(wait_time)
+        flush = getattr(self.handler, 'flush', None)
+        if flush is not None:
+            flush()
+
+    def _worker(self):
+        '''loop get all queued chunks and update them to handler at once'''
+        while True:
+            with self.cond:
+                while not self.queue and not self.spill_pending and self.alive:
+                    self.cond.wait()
+                if not self.queue and self.spill_pending:
+                    self._unspill()
+                if not self.queue:
+                    break
+                chunks = list(self.queue)
+                self.queue.clear()
+                self.updating = True
+                self.cond.notify_all()
+            timing = self.serialthread is not None and self.serialthread.stats_enabled
+            if timing:
+                update_start = time.time()
+            try:
+                update_many = getattr(self.handler, 'update_many', None)
+                if update_many is not None:
+                    update_many(self.serialthread, chunks)
+                else:
+                    merged_update(self.handler, self.serialthread, chunks)
+            except Exception: # pylint: disable=broad-except
+                self.logger.exception("Handler({!r}) update Fail".format(self.handler))
+            if timing:
+                self.serialthread._stats.add_handler(self.worker_stats_name, time.time() - update_start)
+            with self.cond:
+                self.updating = False
+                self.cond.notify_all()
+        self.logger.debug("Handler Worker exit while: {!r}".format(self.handler))
 
 class SocketHandler(BaseHandler):
     client_socket, client_addr = None, None
+    raw = True
 
     def __init__(self, port, logger=None, coding=None):
         super(SocketHandler, self).__init__(logger, coding)
@@ -287,24 +947,25 @@ class SocketHandler(BaseHandler):
             self.client_socket.close()
 
     def update(self, serialthread, data_tuple):
-        self.logger.debug("SocketHandler Get Update")
         data, _ = data_tuple
         if self.coding == HEXMODE:
-            s_data = binascii.hexlify(data).decode('ascii') + u'\n'
+            s_data = binascii.hexlify(data) + b'\n'
         else:
             s_data = data
-        self.client_socket.sendall(s_data.encode(self.coding))
+        self.client_socket.sendall(s_data)
 
 class SerialThread(object):
     '''
     This is a SerialThread which wrapper from pyserial
     It can offer write/wait_for_strings/wait_for_string/create_logger
     '''
-    def __init__(self, serial_port, coding=DEFAULTCODING, serial_config=None, console_monitor=True, logger=None):
+    def __init__(self, serial_port, coding=DEFAULTCODING, serial_config=None, console_monitor=True, logger=None,
+                 reader_mode=READER_POLL, low_latency=False, hub=None):
         '''
         Init SerialThread, if open serial_port fail, will raise Exception
         Input:
-                serial_port: serial port(str)[for Windows, COM1|COM2|... For Linux, /dev/ttyUSB0...]
+                serial_port: serial port(str)[for Windows, COM1|COM2|... For Linux, /dev/ttyUSB0...
+                                              or pyserial URL, like socket://host:port, replay://capture]
                 coding: define serial data format (str),
                         by default it is UTF-8.
                         Can be like GBK/CJK/HEX(HEX is special mode)
@@ -317,7 +978,16 @@ class SerialThread(object):
                                                                           STOPBITES_TWO
                                     'xonxoff': False, (bool)
                                     'rtscts': False, (bool)
-                                    'dsrdtr': False, (bool)}
+                                    'dsrdtr': False, (bool)
+                                    'timeout': None, (float) Read timeout(VMIN/VTIME style),
+                                                             used by READER_EVENT if port has no fd
+                                    'inter_byte_timeout': None, (float) Gap to wait for rest of
+                                                                        one burst in READER_EVENT}
+                reader_mode: READER_POLL (poll in_waiting every SERIAL_READ_GAP)
+                             READER_EVENT (block on port fd with select, or on port read timeout)
+                low_latency: Set ASYNC_LOW_LATENCY for USB-serial adapter (bool), only work for Linux
+                hub: SerialHub to read port and notify handlers in shared thread, instead of own
+                     reader/notify thread (SerialHub)[None for own threads, port without fd ignore hub]
         '''
         self.serial_config = serial_config
         self._console_monitor = console_monitor
@@ -327,33 +997,30 @@ class SerialThread(object):
             self.logger = logging
             self.logger.basicConfig(format='%(asctime)s %(levelname)-8s %(message)s',
                                     level=DEFAULT_LOGGING_LEVEL)
-        self._serial = serial.Serial()
-        self._serial.port = serial_port
+        self._serial = serial.serial_for_url(serial_port, do_not_open=True)
         self.logger.info("Serial Init: Port - {0}({1})".format(self._serial.port, self._serial.name))
         if coding:
             self.coding = coding
         else:
             self.coding = DEFAULTCODING
         self.logger.info("Serial Coding: {0}".format(self.coding))
-        self._serial_config = {
-            'baudrate': 115200,
-            'bytesize': EIGHTBITS,
-            'parity': PARITY_NONE,
-            'stopbits': STOPBITS_ONE,
-            'xonxoff': False,
-            'rtscts': False,
-            'dsrdtr': False,
-            'write_timeout': None,
-        }
+        self._decoder = None if self.coding == HEXMODE else incremental_decoder(self.coding)
+        self._serial_config = dict(DEFAULT_SERIAL_CONFIG)
         if self.serial_config is not None:
             self._serial_config.update(self.serial_config)
         self.logger.info("Serial Config:")
         for key, value in self._serial_config.items():
             self.logger.info("    {0:<15}: {1}".format(key, value))
         self._serial.apply_settings(self._serial_config)
+        assert reader_mode in (READER_POLL, READER_EVENT), "Invalid reader_mode: {}".format(reader_mode)
+        self.reader_mode = reader_mode
+        self.low_latency = low_latency
+        self.logger.info("Serial Reader Mode: {0} (Low Latency: {1})".format(self.reader_mode, self.low_latency))
+        self._serial_fd = None
         self._serial_lock = threading.Lock()
         self._serial_q = Queue()
         self._serial_handlers = []
+        self._handler_queues = {} # handler: HandlerQueue, for handler run in own worker thread
         self._serial_expection_time = 0
         self._alive = False
         self.alive = False
@@ -361,6 +1028,17 @@ class SerialThread(object):
         self._notify_alive = False
         self.reader_thread = None
         self.notify_thread = None
+        self.hub = hub
+        self._hub_attached = False
+        self._write_fd = None
+        self.log_payload = True # Log data of every write at INFO, can be set False for bulk input
+        self.paced_write = False # Input of expect/command methods by write_paced, for DUT without flow control
+        self._pacer = None # PacedWriter, created by first write_paced
+        self.tracer = None # Tracer for hot path events, see enable_trace
+        self.stats_enabled = False # Time every handler update into stats, see enable_stats
+        self._handler_seq = 0 # For stats name of handler
+        self._stats = SerialStats()
+        self._stats_reporter = None
         self.logger.info("Serial Init Complete")
         self.start()
 
@@ -387,41 +1065,78 @@ class SerialThread(object):
         else:
             self.logger.debug("Serial Reader Thread Already Stop")
 
+    def _wait_readable(self):
+        '''
+        Block until serial readable for READER_EVENT, or READER_BLOCK_TIMEOUT pass
+        Output: data (bytes)[Data already read when wait by port read timeout]
+        '''
+        if self._serial_fd is None:
+            # Port without fd (Windows/URL handler), block on read timeout of port
+            return self._serial.read(1)
+        try:
+            readable, _, _ = select.select([self._serial_fd], [], [], READER_BLOCK_TIMEOUT)
+            if readable and not self._serial.in_waiting:
+                # Readable without data (such as hangup), avoid spin on select
+                time.sleep(SERIAL_READ_GAP)
+                return b''
+            inter_byte_timeout = self._serial.inter_byte_timeout
+            if readable and inter_byte_timeout:
+                # Wait rest of burst like VTIME, to read one burst in one chunk
+                # select is level-triggered (unread data keeps fd readable), so sample in_waiting after gap
+                # until it stops growing; endless stream is cut at READER_BLOCK_TIMEOUT to bound stop latency
+                deadline = time.time() + READER_BLOCK_TIMEOUT
+                buff_size = self._serial.in_waiting
+                while self._reader_alive and time.time() < deadline:
+                    time.sleep(inter_byte_timeout)
+                    in_waiting = self._serial.in_waiting
+                    if in_waiting == buff_size:
+                        break
+                    buff_size = in_waiting
+        except (select.error, ValueError, OSError) as err:
+            raise SerialException("Wait serial readable fail: {!r}".format(err))
+        return b''
+
     def _reader(self):
         '''loop read data from serial, and notify all handler'''
+        event_mode = self.reader_mode == READER_EVENT
         try:
             while self._reader_alive:
-                self.logger.debug("Clean data and data_d")
                 data = b''
-                data_d = u''
-                with self._serial_lock:
-                    try:
+                try:
+                    if event_mode:
+                        # Block without _serial_lock, so write is not blocked by waiting
+                        data = self._wait_readable()
+                    with self._serial_lock:
                         buff_size = self._serial.in_waiting
-                        read_time = datetime.now()
+                        if buff_size or data:
+                            read_time = CLOCK.now() # Only stamp when data come, formatted once rendered
                         if buff_size:
-                            self.logger.debug("Get buff_size: {}".format(buff_size))
-                            data = self._serial.read(buff_size)
-                            data_d = self._decoding(data)
-                    except SerialException:
-                        self._serial_expection_time += 1
-                        self.logger.error("Read Serial Exception. Time: %d", self._serial_expection_time)
-                        self.logger.exception("Stack: ")
-                        if self._serial_expection_time > MAX_SERIAL_EXCEPTION_TIMES:
-                            self.logger.critical("Serial Operation Exception Up to MAX")
-                            raise SerialWrapperException
-                        self.logger.warning("Try read serial again")
-                        time.sleep(RETRY_GAP)
-                        continue
-                    else:
-                        if self._serial_expection_time != 0:
-                            self.logger.debug("Clean serial exception time")
-                        self._serial_expection_time = 0 # Read success, reset exception time
-                if data_d:
-                    self.logger.debug("Get data from Serial")
-                    if self._serial_handlers:
-                        self.logger.debug("Put data to _serial_q")
-                        self._serial_q.put((data_d, read_time))
+                            data += self._serial.read(buff_size)
+                except SerialException:
+                    self._serial_expection_time += 1
+                    self._stats.read_exceptions += 1
+                    if self.tracer:
+                        self.tracer.record(TRACE_SERIAL_EXCEPTION, self._serial_expection_time)
+                    self.logger.error("Read Serial Exception. Time: %d", self._serial_expection_time)
+                    self.logger.exception("Stack: ")
+                    if self._serial_expection_time > MAX_SERIAL_EXCEPTION_TIMES:
+                        self.logger.critical("Serial Operation Exception Up to MAX")
+                        raise SerialWrapperException
+                    self.logger.warning("Try read serial again")
+                    self._stats.retries += 1
+                    time.sleep(RETRY_GAP)
+                    continue
                 else:
+                    self._serial_expection_time = 0 # Read success, reset exception time
+                if data:
+                    self._stats.add_read(len(data))
+                    if self.tracer:
+                        self.tracer.record(TRACE_READ, len(data))
+                    if self._serial_handlers:
+                        self._serial_q.put((data, read_time))
+                        if self.tracer:
+                            self.tracer.record(TRACE_QUEUE_PUT, self._serial_q.qsize())
+                elif not event_mode:
                     time.sleep(SERIAL_READ_GAP) # Let Serial work slow to reduce CPU if there is no data
         except SerialException:
             self._serial_q.put(None)
@@ -434,6 +1149,80 @@ class SerialThread(object):
         self._serial_q.put(None)
         self._reader_alive = False
 
+    def _hub_read(self):
+        '''
+        Read data once port readable and notify all handler, called by SerialHub thread
+        Output: False if serial exception up to max, then hub drop this port
+        '''
+        try:
+            with self._serial_lock:
+                buff_size = self._serial.in_waiting
+                read_time = CLOCK.now()
+                if not buff_size:
+                    raise SerialException("Readable without data")
+                data = self._serial.read(buff_size)
+        except SerialException:
+            self._serial_expection_time += 1
+            self._stats.read_exceptions += 1
+            self.logger.error("Read Serial Exception. Time: %d", self._serial_expection_time)
+            if self._serial_expection_time > MAX_SERIAL_EXCEPTION_TIMES:
+                self.logger.critical("Serial Operation Exception Up to MAX")
+                self._hub_attached = False
+                return False
+            return True
+        self._serial_expection_time = 0
+        self._stats.add_read(len(data))
+        if self.tracer:
+            self.tracer.record(TRACE_HUB_READ, len(data))
+        if self._serial_handlers:
+            self._dispatch((data, read_time))
+        return True
+
+    def _port_fd(self):
+        '''Get fd of port for select/write, None if port has no fd (Windows/URL handler)'''
+        if os.name != 'posix':
+            return None
+        try:
+            return self._serial.fileno()
+        except (AttributeError, NotImplementedError, ValueError, IOError):
+            return None
+
+    def attach_hub(self, hub):
+        '''
+        Let SerialHub read this port and notify handlers in hub thread,
+        reader/notify thread of this port are stopped after notify all queued data
+        Input: hub (SerialHub)
+        Output: True if attached / False if port has no fd (keep own reader thread)
+        '''
+        fd = self._port_fd()
+        if fd is None:
+            self.logger.warning("{} has no fd, can not join hub".format(self._serial.port))
+            self.hub = None
+            return False
+        if self._reader_alive:
+            self._stop_reader()
+        if self._notify_alive:
+            self._stop_notify()
+        self._serial_fd = fd
+        self.hub = hub
+        self._hub_attached = True
+        hub.register(self)
+        self.logger.info("Serial Join Hub")
+        return True
+
+    def detach_hub(self):
+        '''Leave SerialHub, and start own reader/notify thread again'''
+        if self.hub is None:
+            return
+        self.hub.unregister(self)
+        self.hub = None
+        self._hub_attached = False
+        self.logger.info("Serial Leave Hub")
+        if self.alive:
+            self._start_reader()
+            if self._serial_handlers:
+                self._start_notify()
+
     def _start_notify(self):
         '''Start notify thread'''
         self._notify_alive = True
@@ -454,27 +1243,79 @@ class SerialThread(object):
             self.logger.info("Serial Notify Thread Stop")
         else:
             self.logger.debug("Serial Notify Thread Already Stop")
+        with self._serial_q.mutex:
+            # Drop stop flag not consumed (reader also puts one), so next notify thread not exit at once
+            remaining = [item for item in self._serial_q.queue if item]
+            self._serial_q.queue.clear()
+            self._serial_q.queue.extend(remaining)
 
     def _notify(self):
-        '''loop read data from queue, and notify all handler'''
-        while self._notify_alive:
-            self.logger.debug("Try get data from serial_q")
+        '''
+        loop read data from queue, and notify all handler
+        Exit only at None put after last chunk, so data queued before stop is dispatched in order
+        '''
+        while True:
             alldata = self._serial_q.get()
             if alldata:
-                self.logger.debug("Get Data")
-                for handler in self._serial_handlers:
-                    self.logger.debug("Notify Handler: %r", handler)
-                    handler.update(self, alldata)
-                    self.logger.debug("Handler: handle data down")
+                if self.tracer:
+                    self.tracer.record(TRACE_NOTIFY, len(alldata[0]))
+                self._dispatch(alldata)
             else:
                 self.logger.info("Queue Find None, Exit Notify Thread")
                 break
         self.logger.info("Notify Thread exit while")
         self._notify_alive = False
 
-    def _add_handler(self, handler):
-        if not self._serial_handlers:
+    def _dispatch(self, data_tuple):
+        '''
+        Notify all handler with one chunk from serial
+        Raw handler get bytes directly, only decode once for others if they exist
+        '''
+        text_tuple = None
+        tracer = self.tracer
+        timing = self.stats_enabled
+        for index, handler in enumerate(self._serial_handlers):
+            if timing:
+                update_start = time.time()
+            if handler.raw:
+                handler.update(self, data_tuple)
+            else:
+                if text_tuple is None:
+                    text_tuple = (self._decoding(data_tuple[0]), data_tuple[1])
+                if text_tuple[0]:
+                    handler.update(self, text_tuple)
+            if timing:
+                self._stats.add_handler(handler.stats_name, time.time() - update_start)
+            if tracer:
+                tracer.record(TRACE_HANDLER, index)
+        if tracer:
+            tracer.record(TRACE_DISPATCH_DONE, len(self._serial_handlers))
+        if text_tuple is None and self._decoder is not None:
+            self._decoder.reset() # Chunk not decoded, drop state of split character
+
+    def _add_handler(self, handler, queue_policy=None, queue_size=HANDLER_QUEUE_SIZE):
+        '''
+        Add handler to get data from serial
+        Input: handler (BaseHandler)
+               queue_policy (str)[None for update in notify thread,
+                                  QUEUE_BLOCK/QUEUE_DROP_OLDEST/QUEUE_SPILL for update in own worker thread]
+               queue_size (int)[Max chunks in queue of worker thread]
+        '''
+        if not self._serial_handlers and not self._hub_attached:
             self._start_notify()
+        if handler in self._handler_queues:
+            self.logger.warning("Handler({}) already in handerlist".format(handler))
+            return
+        if self.tracer:
+            handler.tracer = self.tracer
+        if getattr(handler, 'stats_name', None) is None:
+            self._handler_seq += 1
+            handler.stats_name = "{0}-{1}".format(type(handler).__name__, self._handler_seq)
+        if queue_policy is not None:
+            handler_queue = HandlerQueue(handler, logger=self.logger, maxsize=queue_size, policy=queue_policy)
+            handler_queue.start()
+            self._handler_queues[handler] = handler_queue
+            handler = handler_queue
         if not handler in self._serial_handlers:
             self._serial_handlers.append(handler)
             self.logger.info("Add Handler({})".format(handler))
@@ -482,10 +1323,16 @@ class SerialThread(object):
             self.logger.warning("Handler({}) already in handerlist".format(handler))
 
     def _remove_handler(self, handler):
+        handler_queue = handler if isinstance(handler, HandlerQueue) else self._handler_queues.get(handler)
+        if handler_queue is not None:
+            self._handler_queues.pop(handler_queue.handler, None)
+            handler = handler_queue
         with ignored(ValueError):
             self.logger.info("Remove Handler({})".format(handler))
             self._serial_handlers.remove(handler)
-        if not self._serial_handlers:
+        if handler_queue is not None:
+            handler_queue.stop()
+        if not self._serial_handlers and self.notify_thread is not None:
             self.logger.info("No Handler exist, stop Notify Thread")
             self._stop_notify()
             with self._serial_q.mutex:
@@ -493,49 +1340,82 @@ class SerialThread(object):
                 self._serial_q.queue.clear()
 
     def _encoding(self, data):
-        '''Encode Unicode String'''
-        if self.coding == HEXMODE:
-            assert isinstance(data, bytes)
+        '''Encode Unicode String, bytes-like data (bytes/bytearray/memoryview) is returned without copy'''
+        if isinstance(data, BYTES_TYPES):
             return data
-        else:
-            return data if isinstance(data, bytes) else data.encode(self.coding)
+        assert self.coding != HEXMODE
+        return data.encode(self.coding)
 
     def _decoding(self, data):
-        '''Decode Byte Stream'''
+        '''Decode Byte Stream, should be called for every chunk in order'''
         if self.coding == HEXMODE:
             assert isinstance(data, bytes)
             return data
         else:
-            return data.decode(self.coding, 'ignore') if isinstance(data, bytes) else data
+            return self._decoder.decode(data) if isinstance(data, bytes) else data
 
     def start(self):
         '''start worker threads'''
-        serial_list = comports()
-        if self._serial.port not in (port.device for port in serial_list):
-            self.logger.warning("{} not in Exist Serial Ports".format(self._serial.port))
         try:
             self._serial.open()
             self._serial.reset_input_buffer()
             self._serial.reset_output_buffer()
         except SerialException:
             self.logger.critical("Fail to open {}".format(self._serial.port))
+            # Enumerate ports (slow on host with many ports) only to report failure
+            serial_list = [] if '://' in self._serial.port else comports()
+            if serial_list and self._serial.port not in (port.device for port in serial_list):
+                self.logger.warning("{} not in Exist Serial Ports".format(self._serial.port))
             self.logger.info("Exist Serial Ports:")
             for serial_info in serial_list:
                 self.logger.info("    {0.device}: {0.description}|{0.hwid}".format(serial_info))
             raise SerialWrapperException
         else:
             self.alive = True
+            if self._serial.write_timeout is None:
+                self._write_fd = self._port_fd() # Write by os.write/writev without copy
+            if self.low_latency:
+                self._set_low_latency()
+            if self.hub is not None and self.attach_hub(self.hub):
+                self.logger.info("Serial Start Success")
+                return
+            if self.reader_mode == READER_EVENT:
+                self._prepare_event_reader()
             self._start_reader()
             self.logger.info("Serial Start Success")
 
+    def _set_low_latency(self):
+        '''Set ASYNC_LOW_LATENCY of port, only warning if port not support'''
+        try:
+            self._serial.set_low_latency_mode(True)
+        except (AttributeError, NotImplementedError, ValueError, IOError) as err:
+            self.logger.warning("Set Low Latency Mode Fail: {!r}".format(err))
+        else:
+            self.logger.info("Set Low Latency Mode Success")
+
+    def _prepare_event_reader(self):
+        '''Get fd of port for select, or set read timeout if port has no fd'''
+        self._serial_fd = self._port_fd()
+        if self._serial_fd is None:
+            if not self._serial.timeout or self._serial.timeout > READER_BLOCK_TIMEOUT:
+                self._serial.timeout = READER_BLOCK_TIMEOUT
+            self.logger.info("Event Reader: Block on read timeout ({}s)".format(self._serial.timeout))
+        else:
+            self.logger.info("Event Reader: Block on fd ({})".format(self._serial_fd))
+
     def stop(self):
         '''Set flag to stop worker threads and remove all exist handler'''
         self.logger.info("Serial Stop Start")
+        self.stop_stats_reporter()
+        if self._hub_attached:
+            self.hub.unregister(self)
+            self._hub_attached = False
         if self._reader_alive:
             self._stop_reader()
             self.logger.info("Serial Reader Clean")
-        if self._notify_alive:
-            self._stop_notify()
+        if self._notify_alive or self._serial_handlers:
+            if self._notify_alive:
+                self._stop_notify()
             templist = self._serial_handlers[:]
             for handler in templist:
                 self._remove_handler(handler)
@@ -546,27 +1426,125 @@ class SerialThread(object):
         self.logger.info("Serial Close Start")
         self.stop()
         self._serial.close()
+        self._write_fd = None
         self.logger.info("Serial Close Complete")
 
-    def write(self, data):
+    def enable_trace(self, size=TRACE_RING_SIZE):
         '''
-        Loop and copy console->serial until self.exit_character character is
-        found. When self.menu_character is found, interpret the next key
-        locally.
+        Record hot path events (read/notify/handler/write...) of serial and its handlers to ring buffer,
+        tracer is dumped to logger when expect timeout
+        Input: size (int)[Max records kept]
+        Output: Tracer
         '''
-        ret = False
-        while True:
-            if self._serial.writable():
-                if not data:
-                    self.logger.warning("Write nothing to serial")
-                    return True
+        self.tracer = Tracer(size)
+        for handler in self._serial_handlers:
+            getattr(handler, 'handler', handler).tracer = self.tracer
+        self.logger.info("Enable Trace: {} records".format(size))
+        return self.tracer
+
+    def disable_trace(self):
+        '''Stop recording events, return Tracer which keeps recorded events'''
+        tracer, self.tracer = self.tracer, None
+        for handler in self._serial_handlers:
+            getattr(handler, 'handler', handler).tracer = None
+        return tracer
+
+    def enable_stats(self):
+        '''
+        Time every handler update into handler_latency of stats, keyed by stats_name of handler
+        (expect waiters share 'expect', file loggers are 'logger(<file name>)', others '<class>-<n>')
+        Off by default, as it costs 2 clock reads and 1 histogram insert per handler per chunk
+        '''
+        self.stats_enabled = True
+        self.logger.info("Enable Handler Stats")
+
+    def disable_stats(self):
+        '''Stop timing handler updates, recorded histograms are kept'''
+        self.stats_enabled = False
+
+    def stats(self):
+        '''
+        Get runtime statistics of serial
+        Output: dict[bytes/chunks read and rate, queue_depth of _serial_q, handler_queues depth/dropped/spilled,
+                     handler_latency (only after enable_stats)/match_latency/flush_latency histograms (seconds),
+                     exception/retry counts]
+        '''
+        stats = self._stats.snapshot()
+        serial_q = getattr(self, '_serial_q', None)
+        stats['queue_depth'] = serial_q.qsize() if serial_q is not None else 0
+        stats['handler_queues'] = dict(
+            (repr(handler_queue.handler), {'depth': len(handler_queue.queue), 'dropped': handler_queue.dropped,
+                                           'spilled': handler_queue.spilled})
+            for handler_queue in list(self._handler_queues.values()))
+        return stats
+
+    def start_stats_reporter(self, interval=STATS_REPORT_INTERVAL, callback=None):
+        '''
+        Report stats periodically in own thread, handler timing is enabled by enable_stats
+        Input: interval (float)[seconds]
+               callback (function)[callback(stats dict), None for log summary at INFO]
+        '''
+        self.stop_stats_reporter()
+        self.enable_stats()
+        self._stats_reporter = StatsReporter(self, interval=interval, callback=callback)
+        self._stats_reporter.start()
+
+    def stop_stats_reporter(self):
+        if self._stats_reporter is not None:
+            self._stats_reporter.stop()
+            self._stats_reporter = None
+
+    def write(self, data, flush=True, log_payload=None):
+        '''
+        Write data to serial
+        Input: data (str/bytes/bytearray/memoryview)[bytes-like data is written without copy]
+               flush (bool)[Wait until all data transmitted]
+               log_payload (bool)[Log data at INFO, None for self.log_payload]
+        Output: True for success / False for serial not writable
+        '''
+        if not data:
+            self.logger.warning("Write nothing to serial")
+            return True
+        return self.write_many([data], flush=flush, log_payload=log_payload)
+
+    def write_many(self, data_list, flush=True, log_payload=None):
+        '''
+        Write data list to serial with one lock acquisition and one flush,
+        data are sent by writev in one system call if port has fd
+        Input: data_list (list)[str/bytes/bytearray/memoryview]
+               flush (bool)[Wait until all data transmitted]
+               log_payload (bool)[Log data at INFO, None for self.log_payload]
+        Output: True for success / False for serial not writable
+        '''
+        if not self._serial.writable():
+            self.logger.critical("Write Serial Fail because not Writable")
+            return False
+        views = [byte_view(self._encoding(data)) for data in data_list]
+        views = [view for view in views if len(view)]
+        size = sum(len(view) for view in views)
+        flush_time = None
+        with self._serial_lock:
+            while views or flush:
                 try:
-                    self._serial_lock.acquire()
-                    self._serial.write(self._encoding(data))
-                    self._serial.flush()
+                    while views:
+                        written = self._write_some(views)
+                        while written:
+                            if written >= len(views[0]):
+                                written -= len(views.pop(0))
+                            else:
+                                views[0] = views[0][written:]
+                                written = 0
+                    if flush:
+                        flush_start = time.time()
+                        self._serial.flush()
+                        flush_time = time.time() - flush_start
+                        flush = False
                 except SerialException:
                     self.alive = False
                     self._serial_expection_time += 1
+                    self._stats.write_exceptions += 1
+                    if self.tracer:
+                        self.tracer.record(TRACE_SERIAL_EXCEPTION, self._serial_expection_time)
                     self.logger.critical("Write Serial Exception. Time: %d", self._serial_expection_time)
                     self.logger.critical("Serial Writable: {}".format(self._serial.writable()))
                     self.logger.exception("Stack: ")
@@ -574,18 +1552,63 @@ class SerialThread(object):
                         self.logger.critical("Serial Operation Exception Up to MAX")
                         raise SerialWrapperException
                     self.logger.warning("Try write serial again")
+                    self._stats.retries += 1
                     time.sleep(RETRY_GAP)
                     continue
-                else:
-                    self._serial_expection_time = 0
-                    ret = True
-                    self.logger.info("Write: {!r}".format(data))
-                finally:
-                    self._serial_lock.release()
-            else:
-                self.logger.critical("Write Serial Fail because not Writable")
-            break
-        return ret
+            self._serial_expection_time = 0
+        self._stats.add_write(size, flush_time)
+        if self.tracer:
+            self.tracer.record(TRACE_WRITE, size)
+        if log_payload if log_payload is not None else self.log_payload:
+            for data in data_list:
+                self.logger.info("Write: {!r}".format(data.tobytes() if isinstance(data, memoryview) else data))
+        else:
+            self.logger.debug("Write: %d bytes", size)
+        return True
+
+    def write_paced(self, data, echo=True):
+        '''
+        Write long command line/script in chunks sized by baudrate, every chunk waits for its echo
+        (or delay fitted from echo latency seen before), chunk size adapts to echo latency, see serial_pace
+        Input: data (str/bytes)
+               echo (bool)[True for wait echo of every chunk, False for wait fitted delay]
+        Output: True for success / False for serial not writable or line echo still late after resend
+                [Line with late echo is cancelled, its line end is never sent]
+        '''
+        if not data:
+            self.logger.warning("Write nothing to serial")
+            return True
+        if self._pacer is None:
+            from .serial_pace import PacedWriter # serial_pace imports this module
+            self._pacer = PacedWriter(self)
+        return self._pacer.write(data, echo=echo)
+
+    def _write_input(self, data):
+        '''Write input of input_output_blocking, paced if self.paced_write'''
+        if self.paced_write:
+            return self.write_paced(data)
+        return self.write(data)
+
+    def _write_some(self, views):
+        '''
+        Write part of views to serial, without copy if port has fd
+        Input: views (list)[memoryview, not empty]
+        Output: written size (int)
+        '''
+        if self._write_fd is None:
+            return self._serial.write(views[0]) or 0
+        try:
+            if len(views) > 1 and hasattr(os, 'writev'):
+                return os.writev(self._write_fd, views[:WRITE_IOV_MAX])
+            return os.write(self._write_fd, views[0])
+        except (OSError, IOError) as err:
+            if err.errno not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                raise SerialException("write failed: {!r}".format(err))
+        try:
+            select.select([], [self._write_fd], [], READER_BLOCK_TIMEOUT) # Wait output buffer writable
+        except (select.error, ValueError, OSError) as err:
+            raise SerialException("Wait serial writable fail: {!r}".format(err))
+        return 0
 
     def send_break(self, duration=0.25):
         '''Send Break to Serial'''
@@ -638,15 +1661,16 @@ class SerialThread(object):
                 String (str/list)[If Fail, return Reason. If True, return found keyword list]
                 Raw Data from Serial (str)
         '''
-        io = IOHandler(logger=self.logger, coding=self.coding)
+        io = IOHandler(logger=self.logger, coding=self.coding, readnew=True)
+        io.stats_name = 'expect' # All expect waiters share one histogram
         self._add_handler(io)
         start_time = time.time()
         if IS_PY2 and isinstance(sinput[0], (str, unicode)):
-            func = lambda: self.write(sinput[0])
+            func = lambda: self._write_input(sinput[0])
             name = 'self.write'
             sargs = '{!r}'.format(sinput[0])
         elif IS_PY3 and isinstance(sinput[0], (str, bytes)):
-            func = lambda: self.write(sinput[0])
+            func = lambda: self._write_input(sinput[0])
             name = 'self.write'
             sargs = '{!r}'.format(sinput[0])
         else:
@@ -673,7 +1697,6 @@ class SerialThread(object):
             _timeout = 99999999
         ret = False
         string_found = []
-        string_found_count = 0
         self.logger.info("="*40)
         self.logger.info("Input:")
         self.logger.info("    func:      {0}({1})".format(name, sargs))
@@ -687,53 +1710,43 @@ class SerialThread(object):
         if sinput[0]: # If Input is blank string, skip self.write
             self.logger.info("Run {0}({1})".format(name, sargs))
             func()
+        input_repeat = input_repeat and sinput[0]
+        next_input_time = time.time() + input_gap
+        matcher = StreamMatcher(expect_list, expect_all)
         while time.time() - start_time < _timeout:
-            allconsoledata = io.readall()
-            if expect_all:
-                templist = expect_list[:]
-                for keyword in templist:
-                    if isinstance(keyword, RE_TYPE):
-                        res = keyword.search(allconsoledata)
-                        if res:
-                            string_found_count += 1
-                            string_found.append(res.group(0))
-                            expect_list.remove(keyword)
-                            self.logger.info("Found: {}".format(res.group(0)))
-                            continue
-                    elif keyword in allconsoledata:
-                        string_found_count += 1
-                        string_found.append(keyword)
-                        expect_list.remove(keyword)
-                        self.logger.info("Found: {}".format(keyword))
-                        continue
-                if string_found_count == len(expect[0]):
-                    ret = True
-                    self.logger.info("All Keywords Found")
-                    break
-            else:
-                for keyword in expect_list:
-                    if isinstance(keyword, RE_TYPE):
-                        res = keyword.search(allconsoledata)
-                        if res:
-                            ret = True
-                            string_found = [res.group(0)]
-                            self.logger.info("Found: {}".format(res.group(0)))
-                            break
-                    elif keyword in allconsoledata:
-                        ret = True
-                        string_found = [keyword]
-                        self.logger.info("Found: {}".format(keyword))
-                        break
-                if ret:
+            for data, data_time in io.readnew_chunks():
+                if not matcher.feed(data):
+                    continue
+                if matcher.done and data_time is not None:
+                    self._stats.add_match(CLOCK.elapsed(data_time)) # From arrival of chunk completing match
+                for index, found, found_start, _ in matcher.matches[len(string_found):]:
+                    self.logger.info("Found: {0} (Keyword {1} at {2})".format(found, index, found_start))
+                string_found = matcher.found[:]
+                if self.tracer:
+                    self.tracer.record(TRACE_EXPECT_FOUND, len(string_found))
+                if matcher.done:
                     break
-            if input_repeat and sinput[0]:
-                self.logger.debug("Sleep {}s".format(input_gap))
-                time.sleep(input_gap)
+            if matcher.done:
+                ret = True
+                if expect_all:
+                    self.logger.info("All Keywords Found")
+                break
+            if input_repeat and time.time() >= next_input_time:
                 self.logger.info("Run {0}({1})".format(name, sargs))
                 func()
-            time.sleep(SERIAL_READ_GAP)
+                next_input_time = time.time() + input_gap
+            wait_time = start_time + _timeout - time.time()
+            if input_repeat:
+                wait_time = min(wait_time, next_input_time - time.time())
+            io.wait_update(max(wait_time, 0)) # Wake up once data come, no need to poll
         else:
             self.logger.warning("Find String TIMEOUT!")
+            self._remove_handler(io)
+            io.close()
+            self.flush_loggers() # Keep serial log on disk before caller handle failure
+            if self.tracer:
+                self.tracer.record(TRACE_EXPECT_TIMEOUT, len(string_found))
+                self.tracer.dump(self.logger)
             raise SerialTimeoutException
         self._remove_handler(io)
         allconsoledata = io.readall()
@@ -796,17 +1809,48 @@ class SerialThread(object):
         '''
         return self.expects_for_write(input_data, [keyword], repeat, repeat_gap, False, timeout)
 
-    def create_logger(self, filepath=None, timestamp=True):
+    def create_logger(self, filepath=None, timestamp=True, max_size=None, spillpath=None, queue_policy=QUEUE_SPILL,
+                      buffer_size=LOG_BUFFER_SIZE, flush_interval=LOG_FLUSH_INTERVAL, rotate_size=None,
+                      rotate_interval=None, compress=None):
         '''
         Create Logger for Serial
         Input: filepath (str)
-        Output: filehandler (IOHandler)
+               timestamp (bool)
+               max_size (int)[Only keep last max_size data for readall, None for keep all]
+               spillpath (str)[With max_size, write data out of max_size to spillpath instead of drop]
+               queue_policy (str)[Logger run in own worker thread, policy when it falls behind,
+                                  QUEUE_BLOCK/QUEUE_DROP_OLDEST/QUEUE_SPILL, None for run in notify thread]
+               buffer_size (int)[Write file once buffered lines reach buffer_size, 0 for write every update]
+               flush_interval (float)[Max seconds lines stay in buffer, also flushed when expect fail or close]
+               rotate_size (int)[Rotate file once it reach rotate_size bytes, None for no limit]
+               rotate_interval (float)[Rotate file every rotate_interval seconds, None for no limit]
+               compress (str)[Compress rotated file in background, gzip/bz2/xz, None for keep plain.
+                              filepath end with .gz/.bz2/.xz is written compressed directly]
+        Output: filehandler (IOHandler/RingIOHandler)
         '''
         self.logger.info("Create File Logger: {0} (Timestmap: {1})".format(filepath, timestamp))
-        filehandler = IOHandler(filepath=filepath, logger=self.logger, timestamp=timestamp, coding=self.coding)
-        self._add_handler(filehandler)
+        if max_size:
+            self.logger.info("Logger Max Size: {0} (Spill: {1})".format(max_size, spillpath))
+            filehandler = RingIOHandler(max_size, spillpath=spillpath, filepath=filepath, logger=self.logger,
+                                        timestamp=timestamp, coding=self.coding, buffer_size=buffer_size,
+                                        flush_interval=flush_interval, rotate_size=rotate_size,
+                                        rotate_interval=rotate_interval, compress=compress)
+        else:
+            filehandler = IOHandler(filepath=filepath, logger=self.logger, timestamp=timestamp, coding=self.coding,
+                                    buffer_size=buffer_size, flush_interval=flush_interval, rotate_size=rotate_size,
+                                    rotate_interval=rotate_interval, compress=compress)
+        if filepath:
+            filehandler.stats_name = "logger({})".format(os.path.basename(filepath))
+        self._add_handler(filehandler, queue_policy=queue_policy)
         return filehandler
 
+    def flush_loggers(self):
+        '''Write buffered lines of all file loggers to file, wait queued logger catch up first'''
+        for handler in self._serial_handlers[:]:
+            flush = getattr(handler, 'flush', None)
+            if flush is not None:
+                flush()
+
     def close_logger(self, filehandler):
         '''
         Close/Stop logger for Serial
@@ -816,10 +1860,62 @@ class SerialThread(object):
         self._remove_handler(filehandler)
         filehandler.close()
 
-    def create_serial_monitor(self, port=None):
+    def create_capture(self, filepath, queue_policy=QUEUE_SPILL, index_interval=None):
+        '''
+        Create binary capture for Serial, keep raw bytes and read time of every chunk
+        Read it by serial_capture.CaptureReader, or render text/HEX log by serial_capture.capture_to_log
+        Input: filepath (str)[index is written to filepath + '.idx']
+               queue_policy (str)[Capture run in own worker thread, policy when it falls behind,
+                                  QUEUE_BLOCK/QUEUE_DROP_OLDEST/QUEUE_SPILL, None for run in notify thread]
+               index_interval (int)[Bytes of records between index entries, None for default]
+        Output: capturehandler (CaptureHandler)[Close by close_logger]
+        '''
+        from .serial_capture import CaptureHandler, CAPTURE_INDEX_INTERVAL # serial_capture imports this module
+        capturehandler = CaptureHandler(filepath, logger=self.logger, coding=self.coding,
+                                        index_interval=index_interval or CAPTURE_INDEX_INTERVAL)
+        self._add_handler(capturehandler, queue_policy=queue_policy)
+        return capturehandler
+
+    def create_framer(self, framer, queue_policy=None):
+        '''
+        Create frame handler for binary protocol, frames are parsed once from raw bytes of Serial
+        and shared with subscribers (FrameHandler.subscribe) and FrameHandler.expect_frame
+        Input: framer (serial_frame.Framer)[LengthFramer/FixedFramer/SlipFramer/CobsFramer]
+               queue_policy (str)[None for run in notify thread,
+                                  QUEUE_BLOCK/QUEUE_DROP_OLDEST/QUEUE_SPILL for run in own worker thread]
+        Output: framehandler (FrameHandler)[Close by close_logger]
+        '''
+        from .serial_frame import FrameHandler # serial_frame imports this module
+        framehandler = FrameHandler(framer, logger=self.logger, coding=self.coding)
+        framehandler.serialthread = self
+        self._add_handler(framehandler, queue_policy=queue_policy)
+        return framehandler
+
+    def create_broadcast_server(self, address=0, input_enabled=False, slow_policy=None, client_buffer=None):
+        '''
+        Create broadcast server for many viewers of Serial, slow viewer never blocks Serial
+        Input: address (int/str)[port on localhost (0 for any free port) or Unix socket path]
+               input_enabled (bool)[Write data from viewers to Serial]
+               slow_policy (str)[serial_broadcast.SLOW_DROP (default)/SLOW_SKIP for viewer falls behind]
+               client_buffer (int)[Max bytes waiting to be sent for one viewer, None for default]
+        Output: broadcastserver (BroadcastServer)[address is bound port/path, close by close_logger]
+        '''
+        # serial_broadcast imports this module
+        from .serial_broadcast import BroadcastServer, BROADCAST_CLIENT_BUFFER, SLOW_DROP
+        broadcastserver = BroadcastServer(address, logger=self.logger, coding=self.coding,
+                                          client_buffer=client_buffer or BROADCAST_CLIENT_BUFFER,
+                                          slow_policy=slow_policy or SLOW_DROP, input_enabled=input_enabled)
+        broadcastserver.serialthread = self
+        broadcastserver.start()
+        self._add_handler(broadcastserver) # update only appends to buffers, no need of worker thread
+        return broadcastserver
+
+    def create_serial_monitor(self, port=None, queue_policy=QUEUE_DROP_OLDEST):
         '''
         Create Monitor for Serial
         Input: port (str)[If keep None, will set port random between(10000,65535)]
+               queue_policy (str)[Monitor run in own worker thread, policy when it falls behind,
+                                  QUEUE_BLOCK/QUEUE_DROP_OLDEST/QUEUE_SPILL, None for run in notify thread]
         Output: sockethandler (IOHandler)
         '''
         self.logger.info("Create Serial Monitor")
@@ -828,7 +1924,7 @@ class SerialThread(object):
         else:
             sockethandler = SocketHandler(port=random.randint(10000, 65535), logger=self.logger, coding=self.coding)
         sockethandler.start()
-        self._add_handler(sockethandler)
+        self._add_handler(sockethandler, queue_policy=queue_policy)
         return sockethandler
 
     def close_serial_monitor(self, sockethandler):
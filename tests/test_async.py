@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import logging
+
+sys.path.insert(1,os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from serial_wrapper.serial_sim import SimulatedShell
+
+LOGGER = logging.getLogger(__name__)
+
+@unittest.skipIf(os.name != 'posix' or sys.version_info < (3, 5), "Async need Python 3.5+ and pty")
+class SimAsyncTest(unittest.TestCase):
+
+    def test_async(self):
+        import asyncio
+        from serial_wrapper.serial_async import AsyncSerialAndroid
+        async def run(port):
+            async with AsyncSerialAndroid(port, logger=LOGGER) as serial:
+                return await serial.getprop(u'dev.bootcomplete'), await serial.command_output(u'id')
+        with SimulatedShell(logger=LOGGER) as sim:
+            loop = asyncio.new_event_loop()
+            try:
+                bootcomplete, (exit_code, output) = loop.run_until_complete(run(sim.port))
+            finally:
+                loop.close()
+        self.assertEqual(bootcomplete, u'1')
+        self.assertEqual(exit_code, u'0')
+        self.assertIn(u'uid=0(root)', output)
+
+    def test_no_resend_on_early_wakeup(self):
+        import asyncio
+        import pty
+        import tty
+        from serial_wrapper.serial_async import AsyncSerialThread
+        from serial_wrapper.serial_wrapper import SerialTimeoutException
+        real_wait = asyncio.wait
+        async def early_wait(futures, timeout=None):
+            if timeout and timeout > 0.1:
+                return set(), set(futures) # Timer fired before deadline
+            return await real_wait(futures, timeout=timeout)
+        sent = []
+        async def run(port):
+            async with AsyncSerialThread(port, logger=LOGGER) as serial:
+                with self.assertRaises(SerialTimeoutException):
+                    await serial.input_output_blocking((lambda: sent.append(1), False, 0), ([u'NNNN'], False),
+                                                       timeout=0.3)
+        master_fd, slave_fd = pty.openpty()
+        tty.setraw(slave_fd)
+        loop = asyncio.new_event_loop()
+        asyncio.wait = early_wait
+        try:
+            loop.run_until_complete(run(os.ttyname(slave_fd)))
+        finally:
+            asyncio.wait = real_wait
+            loop.close()
+            os.close(master_fd)
+            os.close(slave_fd)
+        self.assertEqual(sent, [1]) # Input without repeat is sent once
+
+    def test_write_log_payload(self):
+        import asyncio
+        import pty
+        import tty
+        from serial_wrapper.serial_async import AsyncSerialThread
+        async def run(port):
+            async with AsyncSerialThread(port, logger=LOGGER) as serial:
+                await serial.write(b'shown\n')
+                await serial.write(b'hidden\n', log_payload=False)
+                serial.log_payload = False
+                await serial.write(u'bulk\n')
+                await serial.write(b'forced\n', log_payload=True)
+        expected = b'shown\nhidden\nbulk\nforced\n'
+        master_fd, slave_fd = pty.openpty()
+        tty.setraw(slave_fd)
+        loop = asyncio.new_event_loop()
+        try:
+            with self.assertLogs(LOGGER, level='DEBUG') as logs:
+                loop.run_until_complete(run(os.ttyname(slave_fd)))
+            written = b''
+            while len(written) < len(expected):
+                written += os.read(master_fd, 1024)
+        finally:
+            loop.close()
+            os.close(master_fd)
+            os.close(slave_fd)
+        self.assertEqual(written, expected)
+        writes = [(record.levelname, record.getMessage()) for record in logs.records
+                  if record.getMessage().startswith('Write: ')]
+        self.assertEqual(writes, [('INFO', "Write: b'shown\\n'"), ('DEBUG', 'Write: 7 bytes'),
+                                  ('DEBUG', 'Write: 5 bytes'), ('INFO', "Write: b'forced\\n'")])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import time
+import socket
+import shutil
+import logging
+import tempfile
+import threading
+from datetime import datetime
+
+sys.path.insert(1,os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from serial_wrapper.serial_broadcast import BroadcastServer, SLOW_DROP, SLOW_SKIP
+from serial_wrapper.serial_capture import CaptureHandler
+from serial_wrapper.serial_replay import replay_url, REPLAY_SPEED_MAX
+from serial_wrapper.serial_wrapper import SerialThread, SerialWrapperException, LOCALHOST
+
+LOGGER = logging.getLogger(__name__)
+CHUNK = b'0123456789abcdef' * 4096
+
+def wait_until(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def connect(address):
+    if isinstance(address, int):
+        sock = socket.create_connection((LOCALHOST, address))
+    else:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(address)
+    sock.settimeout(5)
+    return sock
+
+def receive(sock, size):
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+class BroadcastTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_viewers_and_input(self):
+        capture = os.path.join(self.folder, 'serial.cap')
+        handler = CaptureHandler(capture, logger=LOGGER)
+        for index in range(100):
+            handler.update(None, (u'line {}\r\n'.format(index).encode('ascii'), datetime.now()))
+        handler.close()
+        expect = b''.join(u'line {}\r\n'.format(index).encode('ascii') for index in range(100))
+        serialthread = SerialThread(replay_url(capture, REPLAY_SPEED_MAX, hold=True), logger=LOGGER)
+        try:
+            server = serialthread.create_broadcast_server(input_enabled=True)
+            viewers = [connect(server.address) for _ in range(3)]
+            self.assertTrue(wait_until(lambda: len(server.clients) == 3))
+            serialthread._serial.resume()
+            for viewer in viewers:
+                self.assertEqual(receive(viewer, len(expect)), expect)
+            viewers[0].sendall(b'ls\n')
+            self.assertTrue(wait_until(lambda: serialthread._serial.written == 3))
+            serialthread.close_logger(server)
+            self.assertTrue(receive(viewers[1], 64).endswith(b'=!QUIT!='))
+            for viewer in viewers:
+                viewer.close()
+        finally:
+            serialthread.close()
+
+    def test_blocked_input_not_stall_viewers(self):
+        class BlockedSerial(object):
+            def __init__(self):
+                self.gate = threading.Event()
+                self.written = []
+            def write_many(self, data_list, flush=True, log_payload=None):
+                self.gate.wait()
+                self.written.append((b''.join(data_list), log_payload))
+                return True
+        server = BroadcastServer(0, logger=LOGGER, coding='UTF-8', input_enabled=True)
+        server.serialthread = BlockedSerial()
+        server.start()
+        try:
+            viewer = connect(server.address)
+            self.assertTrue(wait_until(lambda: len(server.clients) == 1))
+            viewer.sendall(b'l')
+            self.assertTrue(wait_until(lambda: not server.input_queue)) # Input thread blocked in write
+            viewer.sendall(b's\n')
+            for index in range(3):
+                server.update(None, (b'chunk', None))
+                self.assertEqual(receive(viewer, 5), b'chunk')
+            server.serialthread.gate.set()
+            self.assertTrue(wait_until(lambda: b''.join(data for data, _ in server.serialthread.written) == b'ls\n'))
+            self.assertEqual(set(log for _, log in server.serialthread.written), set([False]))
+            viewer.close()
+        finally:
+            server.serialthread.gate.set()
+            server.close()
+
+    def test_input_serial_fail(self):
+        class FailSerial(object):
+            def __init__(self):
+                self.calls = 0
+            def write_many(self, data_list, flush=True, log_payload=None):
+                self.calls += 1
+                if self.calls == 1:
+                    raise ValueError('transient')
+                raise SerialWrapperException
+        server = BroadcastServer(0, logger=LOGGER, coding='UTF-8', input_enabled=True)
+        server.serialthread = FailSerial()
+        server.start()
+        try:
+            viewer = connect(server.address)
+            self.assertTrue(wait_until(lambda: len(server.clients) == 1))
+            viewer.sendall(b'ab')
+            self.assertTrue(wait_until(lambda: server.input_dropped == 2)) # Other error keeps serving
+            self.assertTrue(server.input_enabled)
+            viewer.sendall(b'cde')
+            self.assertTrue(wait_until(lambda: not server.input_enabled))
+            self.assertEqual(server.input_dropped, 5)
+            input_thread = server.input_thread
+            self.assertTrue(input_thread.is_alive())
+            viewer.sendall(b'f')
+            server.update(None, (b'chunk', None)) # Viewers still served
+            self.assertEqual(receive(viewer, 5), b'chunk')
+            self.assertEqual(server.serialthread.calls, 2)
+            self.assertFalse(server.input_queue)
+            viewer.close()
+        finally:
+            server.close()
+        self.assertFalse(input_thread.is_alive())
+
+    def _slow_viewer(self, address, slow_policy):
+        server = BroadcastServer(address, logger=LOGGER, coding='UTF-8', client_buffer=len(CHUNK) * 2,
+                                 slow_policy=slow_policy)
+        server.start()
+        try:
+            slow = connect(server.address)
+            fast = connect(server.address)
+            self.assertTrue(wait_until(lambda: len(server.clients) == 2))
+            total = 0
+            start = time.time()
+            while not (server.dropped or server.clients[0].skipped) and total < 256 * len(CHUNK):
+                server.update(None, (CHUNK, None)) # Never block although slow viewer not read
+                total += len(CHUNK)
+                self.assertEqual(len(receive(fast, len(CHUNK))), len(CHUNK))
+            self.assertLess(time.time() - start, 30)
+            slow.close()
+            fast.close()
+            return server
+        finally:
+            server.close()
+
+    def test_slow_drop(self):
+        server = self._slow_viewer(0, SLOW_DROP)
+        self.assertEqual(server.dropped, 1)
+
+    @unittest.skipIf(os.name != 'posix', "Unix socket")
+    def test_slow_skip_unix(self):
+        server = self._slow_viewer(os.path.join(self.folder, 'console.sock'), SLOW_SKIP)
+        self.assertEqual(server.dropped, 0)
+        self.assertFalse(os.path.exists(server.address))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import shutil
+import logging
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(1,os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from serial_wrapper.serial_capture import CaptureHandler, CaptureReader, capture_to_log, INDEX_SUFFIX
+
+LOGGER = logging.getLogger(__name__)
+
+class CaptureTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.capture = os.path.join(self.folder, 'serial.cap')
+        self.start = datetime(2020, 1, 1, 8, 0, 0)
+        handler = CaptureHandler(self.capture, logger=LOGGER, index_interval=100)
+        for index in range(100):
+            handler.update(None, (u'line{:03d}\r\n'.format(index).encode('ascii'),
+                                  self.start + timedelta(seconds=index)))
+        handler.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_read_all(self):
+        with CaptureReader(self.capture) as reader:
+            records = list(reader)
+        self.assertEqual(len(records), 100)
+        self.assertEqual(records[0], (b'line000\r\n', self.start))
+        self.assertEqual(records[99], (b'line099\r\n', self.start + timedelta(seconds=99)))
+
+    def test_seek_range(self):
+        with CaptureReader(self.capture) as reader:
+            self.assertGreater(len(reader.index_times), 10) # Sparse, not one entry per record
+            self.assertLess(len(reader.index_times), 100)
+            records = list(reader.records(50, 52.5))
+            by_datetime = list(reader.records(self.start + timedelta(seconds=50),
+                                              self.start + timedelta(seconds=52.5)))
+        self.assertEqual([data for data, _ in records], [b'line050\r\n', b'line051\r\n', b'line052\r\n'])
+        self.assertEqual(records, by_datetime)
+
+    def test_rebuild_index(self):
+        os.remove(self.capture + INDEX_SUFFIX)
+        with CaptureReader(self.capture) as reader:
+            self.assertEqual([data for data, _ in reader.records(start=98)], [b'line098\r\n', b'line099\r\n'])
+
+    def test_truncated(self):
+        with open(self.capture, 'ab') as capture_f:
+            capture_f.write(b'\x00\x01') # Incomplete record, as when writer is killed
+        with CaptureReader(self.capture) as reader:
+            self.assertEqual(len(list(reader)), 100)
+
+    def test_to_log(self):
+        log = os.path.join(self.folder, 'serial.log')
+        capture_to_log(self.capture, log, timestamp=False, start=1, end=2)
+        with open(log, 'rb') as log_f:
+            self.assertEqual(log_f.read(), os.linesep.join(['line001', 'line002', '']).encode('ascii'))
+        hex_log = os.path.join(self.folder, 'serial_hex.log')
+        capture_to_log(self.capture, hex_log, coding='HEX', timestamp=False, end=0)
+        with open(hex_log, 'rb') as log_f:
+            self.assertIn(b'6C696E65', log_f.read().upper())
+
+if __name__ == "__main__":
+    unittest.main()
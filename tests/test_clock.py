@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import logging
+import tempfile
+import shutil
+from datetime import datetime, timedelta
+
+sys.path.insert(1,os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from serial_wrapper.serial_clock import SerialClock, CLOCK
+from serial_wrapper.serial_wrapper import IOHandler
+
+LOGGER = logging.getLogger(__name__)
+
+class SerialClockTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = SerialClock()
+
+    def test_convert(self):
+        stamp = self.clock.anchor_ns + 1500000000
+        self.assertEqual(self.clock.to_datetime(stamp), self.clock.anchor_time + timedelta(seconds=1.5))
+        self.assertEqual(self.clock.to_ns(self.clock.to_datetime(stamp)), stamp)
+        now = datetime.now()
+        self.assertIs(self.clock.to_datetime(now), now)
+        self.assertGreaterEqual(self.clock.elapsed(self.clock.now()), 0)
+
+    def test_prefix(self):
+        stamp = self.clock.now()
+        prefix = self.clock.prefix(stamp)
+        expect = u"{:%Y-%m-%d %H:%M:%S.%f}".format(self.clock.to_datetime(stamp))[:-3] + u' '
+        self.assertEqual(prefix, expect.encode('UTF-8'))
+        self.assertIs(self.clock.prefix(stamp), prefix) # Cached in same millisecond
+        next_ms = self.clock.prefix(stamp + 1000000)
+        self.assertNotEqual(next_ms, prefix)
+        self.assertEqual(self.clock.prefix(datetime(2020, 1, 2, 3, 4, 5, 678901)), b'2020-01-02 03:04:05.678 ')
+
+    def test_iohandler_stamp(self):
+        folder = tempfile.mkdtemp()
+        log = os.path.join(folder, 'serial.log')
+        try:
+            io = IOHandler(log, logger=LOGGER, coding='UTF-8', noread=True)
+            stamp = CLOCK.now()
+            io.update(None, (b'abc\r\n', stamp))
+            io.close()
+            with open(log, 'rb') as log_f:
+                self.assertEqual(log_f.read(), CLOCK.prefix(stamp) + b'abc' + os.linesep.encode('ascii'))
+        finally:
+            shutil.rmtree(folder)
+
+if __name__ == "__main__":
+    unittest.main()
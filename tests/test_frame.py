@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import shutil
+import logging
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(1,os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from serial_wrapper.serial_frame import LengthFramer, FixedFramer, SlipFramer, CobsFramer
+from serial_wrapper.serial_frame import CRC16_CCITT, CRC16_MODBUS, CRC32, crc16_ccitt, crc16_modbus, crc32
+from serial_wrapper.serial_frame import cobs_encode, cobs_decode
+from serial_wrapper.serial_capture import CaptureHandler
+from serial_wrapper.serial_replay import replay_url, REPLAY_SPEED_MAX
+from serial_wrapper.serial_wrapper import SerialThread, SerialTimeoutException, HEXMODE
+
+LOGGER = logging.getLogger(__name__)
+
+PAYLOADS = [b'\x01\x02', b'', b'\xc0\xdb\x00\xdc', b'\x00' * 3, bytes(bytearray(range(256))) * 2]
+
+def feed_bytewise(framer, data):
+    payloads = []
+    for index in range(len(data)):
+        payloads.extend(framer.feed(data[index:index + 1]))
+    return payloads
+
+class CrcTest(unittest.TestCase):
+
+    def test_check_values(self):
+        self.assertEqual(crc16_ccitt(b'123456789'), 0x29B1)
+        self.assertEqual(crc16_modbus(b'123456789'), 0x4B37)
+        self.assertEqual(crc32(b'123456789'), 0xCBF43926)
+
+class FramerTest(unittest.TestCase):
+
+    def roundtrip(self, framer, payloads=PAYLOADS):
+        stream = b''.join(framer.encode(payload) for payload in payloads)
+        self.assertEqual(framer.feed(stream), payloads)
+        self.assertEqual(feed_bytewise(framer, stream), payloads)
+        self.assertEqual(framer.errors, 0)
+
+    def test_length(self):
+        self.roundtrip(LengthFramer())
+        self.roundtrip(LengthFramer(4, 'little', crc=CRC32, length_with_crc=True))
+
+    def test_header_crc_resync(self):
+        framer = LengthFramer(1, header=b'\xaa\x55', crc=CRC16_CCITT)
+        good = framer.encode(b'\x01\x02\x03')
+        bad = bytearray(framer.encode(b'\x09\x09'))
+        bad[-1] ^= 0xFF
+        stream = b'\x00\x11' + bytes(bad) + good + b'\xaa'
+        self.assertEqual(framer.feed(stream), [b'\x01\x02\x03'])
+        self.assertEqual(framer.errors, 1)
+        self.assertEqual(framer.feed(good[1:]), [b'\x01\x02\x03']) # Header split between chunks
+
+    def test_fixed(self):
+        framer = FixedFramer(b'\x7e', 4, crc=CRC16_MODBUS)
+        bad = bytearray(framer.encode(b'1234'))
+        bad[-2] ^= 0xFF
+        stream = framer.encode(b'\x7e\x00\x01\x02') + b'\xff' + bytes(bad) + framer.encode(b'abcd')
+        self.assertEqual(feed_bytewise(framer, stream), [b'\x7e\x00\x01\x02', b'abcd'])
+        self.assertEqual(framer.errors, 1)
+
+    def test_slip(self):
+        self.roundtrip(SlipFramer(), [payload for payload in PAYLOADS if payload])
+        framer = SlipFramer(crc=CRC16_CCITT)
+        self.roundtrip(framer)
+        bad = bytearray(framer.encode(b'abc'))
+        bad[1] ^= 0x01
+        self.assertEqual(framer.feed(bytes(bad) + framer.encode(b'def')), [b'def'])
+        self.assertEqual(framer.errors, 1)
+
+    def test_cobs(self):
+        for payload in PAYLOADS + [b'\x11' * 254, b'\x11' * 255, b'\x11' * 254 + b'\x00']:
+            encoded = cobs_encode(payload)
+            self.assertNotIn(b'\x00', encoded[:-1])
+            self.assertEqual(cobs_decode(encoded[:-1]), payload)
+        self.roundtrip(CobsFramer(), [payload for payload in PAYLOADS if payload])
+        self.roundtrip(CobsFramer(crc=CRC32))
+        framer = CobsFramer()
+        self.assertEqual(framer.feed(b'\x05\x01\x00' + cobs_encode(b'ok')), [b'ok'])
+        self.assertEqual(framer.errors, 1)
+
+class FrameHandlerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.capture = os.path.join(self.folder, 'frames.cap')
+        framer = SlipFramer(crc=CRC16_CCITT)
+        stream = b'boot log\r\n' + b''.join(framer.encode(bytes(bytearray([index]))) for index in range(10))
+        start = datetime.now()
+        handler = CaptureHandler(self.capture, logger=LOGGER)
+        for index in range(0, len(stream), 7):
+            handler.update(None, (stream[index:index + 7], start + timedelta(milliseconds=index)))
+        handler.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_subscribe_expect(self):
+        serialthread = SerialThread(replay_url(self.capture, REPLAY_SPEED_MAX, hold=True), coding=HEXMODE,
+                                    logger=LOGGER)
+        try:
+            framehandler = serialthread.create_framer(SlipFramer(crc=CRC16_CCITT))
+            frames = []
+            framehandler.subscribe(frames.append)
+            serialthread._serial.resume()
+            frame = framehandler.expect_frame(lambda frame: frame.data == b'\x09', timeout=5, cursor=0)
+            self.assertEqual(frame.index, 9)
+            self.assertEqual([frame.data for frame in frames], [bytes(bytearray([index])) for index in range(10)])
+            self.assertIs(frames[9], frame) # Same frame object shared
+            with self.assertRaises(SerialTimeoutException):
+                framehandler.expect_frame(timeout=0.1)
+            self.assertEqual(framehandler.framer.errors, 1) # Boot log before first frame
+            serialthread.close_logger(framehandler)
+        finally:
+            serialthread.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import logging
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(1,os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from serial_wrapper.serial_wrapper import IOHandler, RingIOHandler, HandlerQueue
+from serial_wrapper.serial_wrapper import QUEUE_BLOCK, QUEUE_DROP_OLDEST, QUEUE_SPILL
+from serial_wrapper.serial_clock import CLOCK
+
+CODING = 'UTF-8'
+LOGGER = logging.getLogger(__name__)
+
+class IOHandlerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.io = IOHandler(logger=LOGGER, coding=CODING, readnew=True)
+
+    def tearDown(self):
+        self.io.close()
+
+    def test_readall_readnew(self):
+        self.io.update(None, (b'abc', datetime.now()))
+        self.io.update(None, (b'def', datetime.now()))
+        self.assertEqual(self.io.readnew(), u'abcdef')
+        self.io.update(None, (b'ghi', datetime.now()))
+        self.assertEqual(self.io.readall(), u'abcdefghi')
+        self.assertEqual(self.io.readnew(), u'ghi')
+        self.assertEqual(self.io.readnew(), u'')
+
+    def test_split_multibyte(self):
+        data = u'\u4e32\u53e3 OK'.encode('UTF-8')
+        for index in range(len(data)):
+            self.io.update(None, (data[index:index+1], datetime.now()))
+        self.assertEqual(self.io.readall(), u'\u4e32\u53e3 OK')
+
+    def test_gbk(self):
+        io = IOHandler(logger=LOGGER, coding='GBK')
+        data = u'\u4e32\u53e3 OK'.encode('GBK')
+        io.update(None, (data[:1], datetime.now()))
+        io.update(None, (data[1:], datetime.now()))
+        self.assertEqual(io.readall(), u'\u4e32\u53e3 OK')
+        io.close()
+
+    def test_wait_update(self):
+        self.assertFalse(self.io.wait_update(0.01))
+        timer = threading.Timer(0.05, self.io.update, (None, (b'abc', datetime.now())))
+        timer.start()
+        self.assertTrue(self.io.wait_update(5))
+        timer.join()
+
+    def test_read_since(self):
+        self.io.update(None, (b'abc', datetime.now()))
+        data, cursor = self.io.read_since()
+        self.assertEqual((data, cursor), (u'abc', 3))
+        self.io.update(None, (b'def', datetime.now()))
+        self.assertEqual(self.io.readall(), u'abcdef') # Merged into stringcache
+        self.io.update(None, (b'gh', datetime.now()))
+        self.assertEqual(self.io.read_since(cursor), (u'defgh', 8))
+        self.assertEqual(self.io.read_since(8), (u'', 8))
+        self.assertEqual(self.io.read_since(1), (u'bcdefgh', 8))
+        self.assertEqual(self.io.peek_tail(4), u'efgh')
+        self.assertEqual(self.io.peek_tail(100), u'abcdefgh')
+        self.assertEqual(self.io.readnew(), u'abcdefgh') # Cursor read not consume readnew
+
+    def test_readnew_chunks(self):
+        self.io.update(None, (b'ab', 1))
+        self.io.update(None, (b'c\xc3', 2))
+        self.io.update(None, (b'\xa9', 3))
+        self.assertEqual(self.io.readnew_chunks(), [(u'ab', 1), (u'c', 2), (u'\xe9', 3)])
+        self.assertEqual(self.io.readnew_chunks(), [])
+        self.assertEqual(self.io.readall(), u'abc\xe9')
+
+    def test_read_since_noread(self):
+        io = IOHandler(logger=LOGGER, coding=CODING, noread=True)
+        io.update(None, (b'abc', datetime.now()))
+        self.assertEqual(io.read_since(2), (False, 2))
+        self.assertEqual(list(io.iter_chunks(timeout=0.01)), [])
+        io.close()
+
+    def test_iter_lines(self):
+        for chunk in (b'line1\r\nli', b'ne2\r\n', b'rest'):
+            self.io.update(None, (chunk, datetime.now()))
+        timer = threading.Timer(0.05, self.io.update, (None, (b'3\r\n', datetime.now())))
+        timer.start()
+        self.assertEqual(list(self.io.iter_lines(timeout=0.3)), [u'line1', u'line2', u'rest3'])
+        timer.join()
+
+class BufferedLogTest(unittest.TestCase):
+
+    log = os.path.join(tempfile.gettempdir(), 'serial_buffered.log')
+
+    def tearDown(self):
+        try:
+            os.remove(self.log)
+        except OSError:
+            pass
+
+    def read_log(self):
+        with open(self.log, 'rb') as log_f:
+            return log_f.read()
+
+    def test_flush_on_size_and_close(self):
+        io = IOHandler(self.log, logger=LOGGER, coding=CODING, timestamp=False, buffer_size=16, flush_interval=60)
+        io.update(None, (b'abc\r\nde', datetime.now()))
+        self.assertEqual(self.read_log(), b'')
+        io.update(None, (b'f\r\n0123456789\r\ntail', datetime.now()))
+        self.assertEqual(self.read_log(), os.linesep.join(['abc', 'def', '0123456789', '']).encode('ascii'))
+        io.close()
+        self.assertTrue(self.read_log().endswith(b'tail' + os.linesep.encode('ascii')))
+
+    def test_flush_on_interval(self):
+        io = IOHandler(self.log, logger=LOGGER, coding=CODING, timestamp=False, buffer_size=65536,
+                       flush_interval=0.05)
+        io.update(None, (b'abc\n', datetime.now()))
+        self.assertEqual(self.read_log(), b'')
+        time.sleep(0.3)
+        self.assertEqual(self.read_log(), b'abc' + os.linesep.encode('ascii'))
+        io.close()
+
+    def test_one_flusher_thread(self):
+        io = IOHandler(self.log, logger=LOGGER, coding=CODING, timestamp=False, buffer_size=8,
+                       flush_interval=0.05)
+        io.update(None, (b'abc\n', datetime.now()))
+        flusher = io.flusher
+        for index in range(100):
+            io.update(None, (str(index).encode('ascii') + b'\n', datetime.now())) # Buffer filled many times
+        time.sleep(0.3)
+        self.assertIs(io.flusher, flusher)
+        self.assertTrue(self.read_log().endswith(b'99' + os.linesep.encode('ascii')))
+        io.close()
+        self.assertFalse(flusher.is_alive())
+
+    def test_queue_flush(self):
+        io = IOHandler(self.log, logger=LOGGER, coding=CODING, timestamp=False, buffer_size=65536,
+                       flush_interval=60)
+        handler_queue = HandlerQueue(io, logger=LOGGER, policy=QUEUE_SPILL)
+        handler_queue.start()
+        for index in range(10):
+            handler_queue.update(None, (str(index).encode('ascii') + b'\n', datetime.now()))
+        handler_queue.flush()
+        self.assertEqual(self.read_log(), os.linesep.join([str(index) for index in range(10)] + ['']).encode('ascii'))
+        handler_queue.stop()
+        io.close()
+
+    def test_write_text_and_datetime(self):
+        io = IOHandler(self.log, logger=LOGGER, coding=CODING)
+        stamp = datetime(2020, 1, 2, 3, 4, 5, 6000)
+        io.write(u'h\xe9llo', stamp)
+        io.write(b'raw')
+        io.write(u'now')
+        io.close()
+        lines = self.read_log().split(os.linesep.encode('ascii'))
+        self.assertEqual(lines[0], b'2020-01-02 03:04:05.006 h\xc3\xa9llo')
+        self.assertTrue(lines[1].endswith(b' raw'))
+        self.assertTrue(lines[2].endswith(b' now'))
+
+    def test_update_many_stamps(self):
+        io = IOHandler(self.log, logger=LOGGER, coding=CODING, readnew=True, buffer_size=65536, flush_interval=60)
+        first, second = CLOCK.now() - 5000000000, CLOCK.now()
+        io.update_many(None, [(b'abc\nd', first), (b'ef\nghi\n', second)])
+        self.assertEqual(io.readnew_chunks(), [(u'abc\nd', first), (u'ef\nghi\n', second)])
+        io.close()
+        lines = [CLOCK.prefix(first) + b'abc', CLOCK.prefix(first) + b'def', CLOCK.prefix(second) + b'ghi', b'']
+        self.assertEqual(self.read_log(), os.linesep.encode('ascii').join(lines))
+
+class RingIOHandlerTest(unittest.TestCase):
+
+    spill_log = os.path.join(tempfile.gettempdir(), 'serial_spill.log')
+
+    def tearDown(self):
+        try:
+            os.remove(self.spill_log)
+        except OSError:
+            pass
+
+    def test_keep_last(self):
+        ring = RingIOHandler(10, logger=LOGGER, coding=CODING)
+        for chunk in (b'0123', b'4567', b'89ab', b'cdef'):
+            ring.update(None, (chunk, datetime.now()))
+        self.assertEqual(ring.readall(), u'6789abcdef')
+        self.assertEqual(ring.dropped, 6)
+        ring.close()
+
+    def test_read_since(self):
+        ring = RingIOHandler(6, logger=LOGGER, coding=CODING)
+        ring.update(None, (b'0123', datetime.now()))
+        data, cursor = ring.read_since()
+        self.assertEqual((data, cursor), (u'0123', 4))
+        for chunk in (b'4567', b'89'):
+            ring.update(None, (chunk, datetime.now()))
+        self.assertEqual(ring.read_since(cursor), (u'456789', 10))
+        self.assertEqual(ring.read_since(0), (u'456789', 10)) # Dropped data is skipped
+        self.assertEqual(ring.peek_tail(3), u'789')
+        ring.close()
+
+    def test_read_since_split_character(self):
+        ring = RingIOHandler(16, logger=LOGGER, coding=CODING)
+        ring.update(None, (b'a\xc3', datetime.now()))
+        data, cursor = ring.read_since()
+        self.assertEqual((data, cursor), (u'a', 1)) # Half of character held back
+        ring.update(None, (b'\xa9b\n', datetime.now()))
+        self.assertEqual(ring.read_since(cursor), (u'\xe9b\n', 5))
+        self.assertEqual(list(ring.iter_lines(timeout=0.1)), [u'a\xe9b'])
+        ring.close()
+
+    def test_spill(self):
+        ring = RingIOHandler(4, spillpath=self.spill_log, logger=LOGGER, coding=CODING)
+        for chunk in (b'0123', b'4567', b'89'):
+            ring.update(None, (chunk, datetime.now()))
+        self.assertEqual(ring.readall(), u'6789')
+        ring.close()
+        with open(self.spill_log, 'rb') as spill_f:
+            self.assertEqual(spill_f.read(), b'012345')
+
+class SlowHandler(object):
+    raw = True
+
+    def __init__(self):
+        self.updates = []
+        self.stamps = []
+        self.gate = threading.Event()
+
+    def update(self, serialthread, data_tuple):
+        self.gate.wait()
+        self.updates.append(data_tuple[0])
+        self.stamps.append(data_tuple[1])
+
+    def close(self):
+        pass
+
+class HandlerQueueTest(unittest.TestCase):
+
+    def run_queue(self, policy):
+        handler = SlowHandler()
+        handler_queue = HandlerQueue(handler, logger=LOGGER, maxsize=4, policy=policy)
+        handler_queue.start()
+        start = time.time()
+        for index in range(10):
+            handler_queue.update(None, (str(index).encode('ascii'), datetime.now()))
+        elapsed = time.time() - start
+        handler.gate.set()
+        handler_queue.stop()
+        return handler_queue, handler, elapsed
+
+    def test_drop_oldest(self):
+        handler_queue, handler, elapsed = self.run_queue(QUEUE_DROP_OLDEST)
+        self.assertLess(elapsed, 1)
+        data = b''.join(handler.updates)
+        self.assertEqual(data[-4:], b'6789')
+        self.assertEqual(handler_queue.dropped, 10 - len(data))
+
+    def test_spill(self):
+        handler_queue, handler, elapsed = self.run_queue(QUEUE_SPILL)
+        self.assertLess(elapsed, 1)
+        self.assertEqual(b''.join(handler.updates), b'0123456789')
+        self.assertGreater(handler_queue.spilled, 0)
+        self.assertLess(len(handler.updates), 10) # Queued chunks are merged
+
+    def test_block(self):
+        handler = SlowHandler()
+        handler_queue = HandlerQueue(handler, logger=LOGGER, maxsize=4, policy=QUEUE_BLOCK)
+        handler_queue.start()
+        threading.Timer(0.2, handler.gate.set).start()
+        start = time.time()
+        for index in range(10):
+            handler_queue.update(None, (str(index).encode('ascii'), datetime.now()))
+        self.assertGreater(time.time() - start, 0.1)
+        handler_queue.stop()
+        self.assertEqual(b''.join(handler.updates), b'0123456789')
+
+    def _stall(self, handler, chunks):
+        handler_queue = HandlerQueue(handler, logger=LOGGER, maxsize=16, policy=QUEUE_BLOCK)
+        handler_queue.start()
+        handler_queue.update(None, chunks[0])
+        deadline = time.time() + 5
+        while handler_queue.queue and time.time() < deadline:
+            time.sleep(0.01) # Worker stalled in update of first chunk
+        for data_tuple in chunks[1:]:
+            handler_queue.update(None, data_tuple)
+        handler.gate.set()
+        handler_queue.stop()
+
+    def test_backlog_in_one_update(self):
+        handler = SlowHandler()
+        self._stall(handler, [(b'a', 1000000), (b'b', 5000000), (b'c', 9000000), (b'd', 13000000)])
+        self.assertEqual(handler.updates, [b'a', b'bcd'])
+        self.assertEqual(handler.stamps, [1000000, 5000000])
+
+    def test_backlog_keeps_chunk_stamps(self):
+        class BatchHandler(SlowHandler):
+            def update_many(self, serialthread, chunks):
+                self.gate.wait()
+                self.updates.append(list(chunks))
+        handler = BatchHandler()
+        chunks = [(b'a', 1000000), (b'b', 5000000), (b'c', 9000000), (b'd', 13000000)]
+        self._stall(handler, chunks)
+        self.assertEqual(handler.updates, [chunks[:1], chunks[1:]])
+
+if __name__ == "__main__":
+    unittest.main()
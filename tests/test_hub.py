@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import time
+import threading
+import logging
+
+sys.path.insert(1,os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from serial_wrapper.serial_hub import SerialHub
+from serial_wrapper.serial_wrapper import SerialThread, BaseHandler
+
+LOGGER = logging.getLogger(__name__)
+
+class GatedHandler(BaseHandler):
+    '''Raw handler blocked on first update until gate set, so later chunks stay in notify queue'''
+    raw = True
+
+    def __init__(self):
+        super(GatedHandler, self).__init__(LOGGER, 'UTF-8')
+        self.gate = threading.Event()
+        self.chunks = []
+
+    def update(self, serialthread, data_tuple):
+        self.gate.wait(5)
+        self.chunks.append(data_tuple[0])
+
+    def close(self):
+        pass
+
+def wait_until(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+@unittest.skipIf(os.name != 'posix', "Hub need port with fd")
+class SerialHubTest(unittest.TestCase):
+
+    def setUp(self):
+        import pty
+        import tty
+        self.master_fd, self.slave_fd = pty.openpty()
+        tty.setraw(self.slave_fd)
+        self.serial = SerialThread(os.ttyname(self.slave_fd), logger=LOGGER)
+        self.hub = SerialHub(logger=LOGGER)
+
+    def tearDown(self):
+        self.serial.close()
+        self.hub.close()
+        os.close(self.master_fd)
+        os.close(self.slave_fd)
+
+    def test_attach_keeps_order(self):
+        handler = GatedHandler()
+        self.serial._add_handler(handler)
+        pieces = [u'chunk{} '.format(index).encode('ascii') for index in range(5)]
+        for piece in pieces:
+            os.write(self.master_fd, piece)
+            time.sleep(0.05) # Read as own chunk, queued behind gated update
+        threading.Timer(0.2, handler.gate.set).start()
+        self.assertTrue(self.serial.attach_hub(self.hub)) # Queued chunks are dispatched before hub reads
+        self.assertEqual(len(self.hub), 1)
+        os.write(self.master_fd, b'from hub')
+        expect = b''.join(pieces) + b'from hub'
+        self.assertTrue(wait_until(lambda: b''.join(handler.chunks) == expect))
+        self.serial.detach_hub()
+        os.write(self.master_fd, b' own reader')
+        self.assertTrue(wait_until(lambda: b''.join(handler.chunks) == expect + b' own reader'))
+
+if __name__ == "__main__":
+    unittest.main()
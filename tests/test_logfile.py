@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import gzip
+import bz2
+import shutil
+import logging
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(1,os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from serial_wrapper.serial_logfile import RotatingLogFile, COMPRESS_GZIP
+from serial_wrapper.serial_wrapper import IOHandler
+
+LOGGER = logging.getLogger(__name__)
+
+class RotatingLogFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.log = os.path.join(self.folder, 'serial.log')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_rotate_size_compress(self):
+        log_f = RotatingLogFile(self.log, rotate_size=10, compress=COMPRESS_GZIP, logger=LOGGER)
+        for line in (b'line0001\n', b'line0002\n', b'line0003\n'):
+            log_f.write(line)
+        log_f.close()
+        self.assertEqual(len(log_f.segments), 2)
+        for segment, line in zip(log_f.segments, (b'line0001\n', b'line0002\n')):
+            self.assertTrue(segment.endswith('.gz'))
+            with gzip.open(segment, 'rb') as segment_f:
+                self.assertEqual(segment_f.read(), line)
+        with open(self.log, 'rb') as current_f:
+            self.assertEqual(current_f.read(), b'line0003\n')
+        for name in os.listdir(self.folder):
+            self.assertTrue(name == 'serial.log' or name.endswith('.gz'), name) # Plain segment removed
+
+    def test_rotate_interval(self):
+        log_f = RotatingLogFile(self.log, rotate_interval=0.05, logger=LOGGER)
+        log_f.write(b'a\n')
+        time.sleep(0.1)
+        log_f.write(b'b\n')
+        log_f.close()
+        self.assertEqual(len(log_f.segments), 1)
+        with open(log_f.segments[0], 'rb') as segment_f:
+            self.assertEqual(segment_f.read(), b'a\n')
+
+    def test_live_compress(self):
+        log = self.log + '.bz2'
+        io = IOHandler(log, logger=LOGGER, coding='UTF-8', timestamp=False, noread=True)
+        io.update(None, (b'abc\r\ndef\r\n', datetime.now()))
+        io.close()
+        with bz2.BZ2File(log, 'r') as log_f:
+            self.assertEqual(log_f.read(), os.linesep.join(['abc', 'def', '']).encode('ascii'))
+
+    def test_partial_lines(self):
+        io = IOHandler(self.log, logger=LOGGER, coding='UTF-8', timestamp=False, noread=True)
+        for data in (b'ab', b'c', b'd\r\nef', b'g\r\n', b'h'):
+            io.update(None, (data, datetime.now()))
+        io.close()
+        with open(self.log, 'rb') as log_f:
+            self.assertEqual(log_f.read(), os.linesep.join(['abcd', 'efg', 'h', '']).encode('ascii'))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import re
+import random
+
+sys.path.insert(1,os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from serial_wrapper.serial_matcher import StreamMatcher, KeywordSet, compile_keywords
+from serial_wrapper.serial_matcher import keyword_width, keyword_prefix, MATCHER_UNBOUNDED
+from serial_wrapper.serial_matcher import combine_keywords, gate_search, gate_index
+
+class StreamMatcherTest(unittest.TestCase):
+
+    def test_keyword_width(self):
+        self.assertEqual(keyword_width(u'groups'), 6)
+        self.assertEqual(keyword_width(re.compile(r'a{2,5}')), 5)
+        self.assertEqual(keyword_width(re.compile(r'ExitCode:(\d+)\.')), MATCHER_UNBOUNDED)
+        self.assertEqual(keyword_prefix(re.compile(r'ExitCode:(\d+)\.')), u'ExitCode:')
+        self.assertEqual(keyword_prefix(re.compile(br'\x55\xaa.*')), b'\x55\xaa')
+        self.assertEqual(keyword_prefix(re.compile(r'begin.*', re.I)), u'')
+
+    def test_literal_across_chunks(self):
+        matcher = StreamMatcher([u'groups'])
+        self.assertEqual(matcher.feed(u'uid=0(root) gro'), [])
+        self.assertFalse(matcher.done)
+        self.assertEqual(matcher.feed(u'ups=0(root)'), [u'groups'])
+        self.assertTrue(matcher.done)
+        self.assertEqual(matcher.matches, [(0, u'groups', 12, 18)])
+
+    def test_regex_across_chunks(self):
+        exit_re = re.compile(r'\(ABC\)ExitCode:(\d+)\.')
+        matcher = StreamMatcher([exit_re])
+        for chunk in (u'ls\r\n(AB', u'C)Exit', u'Code:12', u'7.\r\n'):
+            matcher.feed(chunk)
+        self.assertEqual(matcher.found, [u'(ABC)ExitCode:127.'])
+
+    def test_first_keyword_in_list_order(self):
+        matcher = StreamMatcher([u'NNNN', u'$ ', u'# '])
+        matcher.feed(u'shell # ')
+        matcher.feed(u'shell $ ')
+        self.assertEqual(matcher.found, [u'# '])
+
+    def test_expect_all(self):
+        matcher = StreamMatcher([u'not', re.compile(r'fo+und')], expect_all=True)
+        matcher.feed(u'aabbcc: not fo')
+        self.assertFalse(matcher.done)
+        matcher.feed(u'und\r\n')
+        self.assertTrue(matcher.done)
+        self.assertEqual(matcher.found, [u'not', u'found'])
+
+    def test_bytes(self):
+        matcher = StreamMatcher([b'\x55\xaa'])
+        matcher.feed(b'\x00\x55')
+        matcher.feed(b'\xaa\x00')
+        self.assertEqual(matcher.found, [b'\x55\xaa'])
+
+    def test_window_bounded(self):
+        matcher = StreamMatcher([u'abc'])
+        for _ in range(100):
+            matcher.feed(u'x' * 1000)
+        self.assertEqual(len(matcher._window), 3) # Overlap and one character of context
+        self.assertEqual(matcher._window_base, 100000 - 3)
+
+    def test_unbounded_regex_long_match(self):
+        for keyword in (re.compile(r'BEGIN.*END', re.S), re.compile(r'.*END', re.S)):
+            matcher = StreamMatcher([keyword])
+            for chunk in (u'xx BEGIN', u'x' * 5000, u'EN', u'D'):
+                matcher.feed(chunk)
+            self.assertTrue(matcher.done)
+            start = 3 if keyword.pattern.startswith(u'BEGIN') else 0
+            self.assertEqual(matcher.matches[0][2:], (start, 5011))
+        matcher = StreamMatcher([re.compile(r'BEGIN.*END', re.S)])
+        for _ in range(100):
+            matcher.feed(u'x' * 1000)
+        self.assertEqual(len(matcher._window), 5) # Only partial prefix kept before BEGIN comes
+
+    def test_anchor_at_window_edge(self):
+        matcher = StreamMatcher([re.compile(u'^#')])
+        matcher.feed(u'hello')
+        matcher.feed(u'# ')
+        self.assertFalse(matcher.done)
+        matcher = StreamMatcher([re.compile(u'^#', re.M)])
+        matcher.feed(u'hello\n')
+        matcher.feed(u'# ')
+        self.assertEqual(matcher.matches, [(0, u'#', 6, 7)])
+        matcher = StreamMatcher([re.compile(u'^#')])
+        matcher.feed(u'#')
+        self.assertTrue(matcher.done)
+
+class KeywordSetTest(unittest.TestCase):
+
+    keywords = [u'Kernel panic', re.compile(r'Unable to handle .* at (0x[0-9a-f]+)'), u'login:', u' # ']
+
+    def test_cache(self):
+        keywordset = compile_keywords(self.keywords)
+        self.assertIsInstance(keywordset, KeywordSet)
+        self.assertIs(compile_keywords(list(self.keywords)), keywordset)
+        self.assertIsNot(compile_keywords(self.keywords[1:]), keywordset)
+
+    def test_search(self):
+        keywordset = compile_keywords(self.keywords)
+        data = u'boot\r\nlogin: Unable to handle paging at 0xdead\r\n'
+        self.assertEqual(keywordset.search(data), [(1, u'Unable to handle paging at 0xdead', 13, 46)])
+        self.assertEqual(keywordset.search(data, expect_all=True),
+                         [(1, u'Unable to handle paging at 0xdead', 13, 46), (2, u'login:', 6, 12)])
+        self.assertEqual(keywordset.search(data, pos=7, expect_all=True),
+                         [(1, u'Unable to handle paging at 0xdead', 13, 46)])
+
+    def test_gate(self):
+        keywordset = compile_keywords(self.keywords)
+        self.assertEqual(len(keywordset.gates), 1) # All keywords start with literal
+        self.assertIsNone(gate_search(keywordset.gates, u'boot ok\r\n', 0))
+        self.assertEqual(gate_search(keywordset.gates, u'boot login: # ', 0).group(0), u'login:')
+        self.assertIn(u'Unable\\ to\\ handle\\ ', keywordset.stream_gates[0].pattern) # Unbounded regex gated by prefix
+        self.assertEqual(len(compile_keywords(self.keywords + [re.compile(r'^\$ ', re.M)]).gates), 2)
+        self.assertEqual(compile_keywords(self.keywords[:1]).gates, ()) # One keyword is searched by itself
+        named = combine_keywords(self.keywords, named=True)
+        self.assertEqual(gate_index(named.search(u'boot login: # ')), 2)
+        self.assertIsNone(combine_keywords([u'a', re.compile(r'(b)\1')])) # Backreference
+        self.assertIsNone(combine_keywords([u'a', b'b'])) # Mixed str and bytes
+        combined = combine_keywords([re.compile(r'(?i)panic'), re.compile(r'^\$ ', re.M), re.compile(u'a b # c', re.X)],
+                                    named=True)
+        self.assertEqual(gate_index(combined.search(u'PANIC')), 0)
+        self.assertEqual(gate_index(combined.search(u'x\n$ ')), 1)
+        self.assertEqual(gate_index(combined.search(u'ab')), 2)
+
+    def test_gate_held_unbounded(self):
+        matcher = StreamMatcher(self.keywords + [re.compile(r'BEGIN.*END', re.S)])
+        self.assertTrue(matcher.keywordset.stream_gates)
+        matcher.feed(u'xx BEGIN')
+        matcher.feed(u'x' * 100)
+        self.assertEqual(matcher._held, set([4])) # Searched one by one, gate not rescans from BEGIN
+        self.assertGreater(matcher._gate_from, 3)
+        matcher.feed(u'EN')
+        matcher.feed(u'D')
+        self.assertEqual(matcher.matches, [(4, u'BEGIN' + u'x' * 100 + u'END', 3, 111)])
+
+    def test_gate_same_as_one_by_one(self):
+        pieces = [u'Kernel panic', u'Unable to handle NULL at 0xbeef', u'login:', u' # ', u'noise ', u'\r\n',
+                  u'Kernel', u' pan', u'0x12', u'log']
+        keywords = self.keywords + [re.compile(r'^\$ ', re.M), re.compile(r'BEGIN.*END', re.S), u'END']
+        rand = random.Random(4)
+        for _ in range(200):
+            stream = u''.join(rand.choice(pieces) for _ in range(rand.randint(1, 30)))
+            cuts = sorted(rand.sample(range(len(stream) + 1), min(5, len(stream) + 1)))
+            chunks = [stream[start:end] for start, end in zip([0] + cuts, cuts + [len(stream)])]
+            for expect_all in (False, True):
+                plain = KeywordSet(keywords)
+                plain.gates = plain.stream_gates = ()
+                gated, single = StreamMatcher(keywords, expect_all), StreamMatcher(plain, expect_all)
+                for chunk in chunks:
+                    gated.feed(chunk)
+                    single.feed(chunk)
+                self.assertEqual(gated.matches, single.matches, stream)
+                self.assertEqual(compile_keywords(keywords).search(stream, expect_all=expect_all),
+                                 plain.search(stream, expect_all=expect_all))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import time
+import logging
+
+sys.path.insert(1,os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from serial_wrapper.serial_linux import SerialLinux
+from serial_wrapper.serial_pace import PacedWriter
+from serial_wrapper.serial_sim import SimulatedShell
+
+LOGGER = logging.getLogger(__name__)
+PAYLOAD = u''.join(u'{:03d}'.format(index) for index in range(100))
+
+@unittest.skipIf(os.name != 'posix', "Simulated shell need pty")
+class PacedWriteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sim = SimulatedShell(logger=LOGGER, fifo_size=32)
+        self.sim.start()
+        self.serial = SerialLinux(self.sim.port, logger=LOGGER)
+
+    def tearDown(self):
+        self.serial.close()
+        self.sim.stop()
+
+    def test_overflow_without_pace(self):
+        self.serial.write(u'echo {}\n'.format(PAYLOAD))
+        time.sleep(0.3)
+        self.assertGreater(self.sim.dropped, 0)
+
+    def test_adapt_and_command(self):
+        pacer = PacedWriter(self.serial, echo_timeout=0.2)
+        self.assertEqual(pacer.chunk_size, 57) # 5ms at 115200
+        self.serial._pacer = pacer
+        self.serial.paced_write = True
+        exit_code, output = self.serial.command_output(u'echo {}'.format(PAYLOAD), timeout=10)
+        self.assertEqual((exit_code, output), (u'0', PAYLOAD)) # Mangled line cancelled, not run
+        self.assertGreater(self.sim.dropped, 0)
+        self.assertGreater(pacer.resent, 0)
+        self.assertLessEqual(pacer.chunk_size, 32)
+        self.assertIsNotNone(pacer.latency)
+        dropped = self.sim.dropped
+        exit_code, output = self.serial.command_output(u'echo {}'.format(PAYLOAD), timeout=10)
+        self.assertEqual((exit_code, output), (u'0', PAYLOAD))
+        self.assertEqual(self.sim.dropped, dropped)
+        self.assertLess(pacer.chunk_size, pacer.limit)
+
+    def test_late_without_cancel(self):
+        pacer = PacedWriter(self.serial, chunk_size=64, echo_timeout=0.2, cancel=None)
+        self.serial._pacer = pacer
+        logger = self.serial.create_logger(queue_policy=None)
+        try:
+            self.assertFalse(self.serial.write_paced(u'echo {}\n'.format(PAYLOAD)))
+            time.sleep(0.3)
+            self.assertNotIn(u'\r\n', logger.readall()) # Line end of mangled line never sent
+        finally:
+            self.serial.close_logger(logger)
+        self.assertEqual(pacer.echo_timeouts, 1)
+
+    def test_fitted_delay(self):
+        pacer = PacedWriter(self.serial, chunk_size=16)
+        pacer.latency = 0.001
+        self.serial._pacer = pacer
+        logger = self.serial.create_logger(queue_policy=None)
+        try:
+            self.assertTrue(self.serial.write_paced(u'echo {}\n'.format(PAYLOAD), echo=False))
+            deadline = time.time() + 5
+            while u'\n' + PAYLOAD not in logger.readall() and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertIn(u'\n' + PAYLOAD, logger.readall())
+        finally:
+            self.serial.close_logger(logger)
+        self.assertEqual(self.sim.dropped, 0)
+
+if __name__ == "__main__":
+    unittest.main()
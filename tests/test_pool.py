@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import logging
+
+sys.path.insert(1,os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from serial_wrapper.serial_pool import PortPool, PortBusyException
+from serial_wrapper.serial_linux import SerialLinux
+from serial_wrapper.serial_sim import SimulatedShell
+from serial_wrapper.serial_wrapper import HEXMODE
+
+LOGGER = logging.getLogger(__name__)
+
+class PortPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = PortPool(logger=LOGGER)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_lease_reuse(self):
+        with self.pool.port('loop://', logger=LOGGER) as serial:
+            serial.create_logger()
+            self.assertTrue(serial.expect_for_write(u'hello\n', u'hello', timeout=5)[0])
+        self.assertEqual(serial._serial_handlers, []) # Handler left by user removed
+        with self.pool.port('loop://', logger=LOGGER) as again:
+            self.assertIs(again, serial)
+            self.assertEqual(again._serial_handlers, [])
+            result, _, output = again.expect_for_write(u'world\n', u'world', timeout=5)
+            self.assertTrue(result)
+            self.assertNotIn(u'hello', output)
+        self.assertEqual((self.pool.hits, self.pool.misses), (1, 1))
+
+    def test_busy_settings_and_dead(self):
+        serial = self.pool.lease('loop://', logger=LOGGER)
+        with self.assertRaises(PortBusyException):
+            self.pool.lease('loop://', timeout=0.1)
+        self.pool.release(serial)
+        hexserial = self.pool.lease('loop://', coding=HEXMODE, logger=LOGGER)
+        self.assertIsNot(hexserial, serial) # Settings changed, reopened
+        self.assertFalse(serial._serial.is_open)
+        hexserial.close() # Closed by user during lease
+        self.pool.release(hexserial)
+        self.assertNotIn('loop://', self.pool)
+        self.assertFalse(self.pool.discard('loop://'))
+
+    @unittest.skipIf(os.name != 'posix', "Simulated shell need pty")
+    def test_pty_serial_class(self):
+        with SimulatedShell(logger=LOGGER) as sim:
+            for _ in range(2):
+                with self.pool.port(sim.port, serial_class=SerialLinux, logger=LOGGER) as serial:
+                    self.assertIsInstance(serial, SerialLinux)
+                    self.assertEqual(serial.command_output(u'echo pooled', timeout=5), (u'0', u'pooled'))
+            self.assertEqual(self.pool.hits, 1)
+            self.assertTrue(self.pool.discard(sim.port))
+            self.assertEqual(len(self.pool), 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import time
+import logging
+
+sys.path.insert(1,os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from serial_wrapper.serial_wrapper import SerialThread, BaseHandler, READER_EVENT
+
+LOGGER = logging.getLogger(__name__)
+
+class ChunkHandler(BaseHandler):
+    raw = True
+
+    def __init__(self):
+        super(ChunkHandler, self).__init__(LOGGER, 'UTF-8')
+        self.chunks = []
+
+    def update(self, serialthread, data_tuple):
+        self.chunks.append(data_tuple[0])
+
+    def close(self):
+        pass
+
+def wait_until(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+@unittest.skipIf(os.name != 'posix', "Event reader test need pty")
+class EventReaderTest(unittest.TestCase):
+
+    def setUp(self):
+        import pty
+        import tty
+        self.master_fd, self.slave_fd = pty.openpty()
+        tty.setraw(self.slave_fd)
+        self.port = os.ttyname(self.slave_fd)
+
+    def tearDown(self):
+        os.close(self.master_fd)
+        os.close(self.slave_fd)
+
+    def _chunks(self, serial_config, pieces, gap):
+        serialthread = SerialThread(self.port, serial_config=serial_config, logger=LOGGER, reader_mode=READER_EVENT)
+        handler = ChunkHandler()
+        try:
+            serialthread._add_handler(handler)
+            for piece in pieces:
+                os.write(self.master_fd, piece)
+                time.sleep(gap)
+            self.assertTrue(wait_until(lambda: len(b''.join(handler.chunks)) == len(b''.join(pieces))))
+        finally:
+            serialthread.close()
+        return handler.chunks
+
+    def test_event_read(self):
+        pieces = [b'line 1\n', b'line 2\n']
+        self.assertEqual(b''.join(self._chunks(None, pieces, 0.2)), b''.join(pieces))
+
+    def test_inter_byte_timeout_burst(self):
+        pieces = [b'burst ', b'in ', b'pieces\n']
+        chunks = self._chunks({'inter_byte_timeout': 0.05}, pieces, 0.01)
+        self.assertEqual(chunks, [b''.join(pieces)])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import time
+import shutil
+import logging
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(1,os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from serial_wrapper.serial_capture import CaptureHandler
+from serial_wrapper.serial_replay import replay_url, replay_throughput, REPLAY_SPEED_MAX, REPLAY_SYNC_WRITE
+from serial_wrapper.serial_wrapper import SerialThread
+from serial_wrapper.serial_linux import SerialLinux
+
+LOGGER = logging.getLogger(__name__)
+
+LS_OUTPUT = [
+    b'# ls -al "/data";echo "(AB12CD34)ExitCode:$?."\r\n',
+    b'drwxrwx--x system   system            2020-01-01 08:00 app\r\n',
+    b'-rw-r--r-- root     root         1024 2020-01-01 08:01 boot.img\r\n(AB12CD',
+    b'34)ExitCode:0.\r\n# ', # Exitcode echo split between chunks
+]
+
+class ReplayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.capture = os.path.join(self.folder, 'serial.cap')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _record(self, chunks, gap=0.0):
+        start = datetime.now()
+        handler = CaptureHandler(self.capture, logger=LOGGER)
+        for index, data in enumerate(chunks):
+            handler.update(None, (data, start + timedelta(seconds=gap * index)))
+        handler.close()
+
+    def test_original_timing(self):
+        self._record([b'boot\r\n', b'login: \r\n'], gap=0.2)
+        serialthread = SerialThread(replay_url(self.capture), logger=LOGGER)
+        try:
+            start = time.time()
+            ret, keyword, _ = serialthread.wait_for_string('login:', timeout=5)
+            self.assertTrue(ret)
+            self.assertEqual(keyword, ['login:'])
+            self.assertGreater(time.time() - start, 0.15)
+        finally:
+            serialthread.close()
+
+    def test_throughput(self):
+        self._record([b'0123456789abcdef' * 64] * 1000)
+        result = replay_throughput(self.capture, speed=REPLAY_SPEED_MAX, logger=LOGGER)
+        self.assertTrue(result['done'])
+        self.assertEqual(result['bytes'], 1024 * 1000)
+        self.assertGreater(result['mb_per_sec'], 0)
+
+    def test_sync_write(self):
+        self._record(LS_OUTPUT)
+        serialthread = SerialLinux(replay_url(self.capture, speed=REPLAY_SPEED_MAX, sync=REPLAY_SYNC_WRITE),
+                                   logger=LOGGER)
+        try:
+            files = serialthread.files_property('/data')
+        finally:
+            serialthread.close()
+        self.assertEqual(sorted(files), ['app', 'boot.img'])
+        self.assertEqual(files['boot.img']['size'], '1024')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import time
+import logging
+
+sys.path.insert(1,os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from serial_wrapper.serial_wrapper import SerialThread, SerialTimeoutException, READER_EVENT
+from serial_wrapper.serial_linux import SerialLinux
+from serial_wrapper.serial_android import SerialAndroid
+from serial_wrapper.serial_hub import SerialHub
+from serial_wrapper.serial_fleet import SerialFleet
+from serial_wrapper.serial_sim import SimulatedShell
+
+LOGGER = logging.getLogger(__name__)
+
+@unittest.skipIf(os.name != 'posix', "Simulated shell need pty")
+class SimLinuxTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.sim = SimulatedShell(logger=LOGGER, noise=True, noise_interval=0.1)
+        cls.sim.start()
+        cls.serial = SerialLinux(cls.sim.port, logger=LOGGER, reader_mode=READER_EVENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.serial.close()
+        cls.sim.stop()
+
+    def test_command_output(self):
+        exit_code, output = self.serial.command_output(u'id')
+        self.assertEqual(exit_code, u'0')
+        self.assertIn(u'uid=0(root)', output)
+        exit_code, output = self.serial.command_output(u'nocmd')
+        self.assertEqual(exit_code, u'127')
+        self.assertIn(u'not found', output)
+
+    def test_files_property(self):
+        files = self.serial.files_property(u'/data')
+        self.assertEqual(sorted(files), [u'app', u'boot.img', u'vendor'])
+        self.assertEqual(files[u'vendor'][u'linkfile'], u'/system/vendor')
+
+    def test_interface_list(self):
+        interfaces = self.serial.interface_list_get()
+        self.assertEqual([interface[u'interface'] for interface in interfaces], [u'eth0', u'lo'])
+        self.assertEqual(interfaces[0][u'mac'], u'00:11:22:33:44:55')
+
+    def test_meminfo(self):
+        self.assertEqual(self.serial.meminfo()[u'MemTotal'], 2048000)
+
+    def test_write_many(self):
+        logger = self.serial.create_logger(queue_policy=None)
+        try:
+            self.serial.write_many([b'echo ', bytearray(b'many'), memoryview(b'_writes\n')])
+            deadline = time.time() + 2
+            while u'\nmany_writes' not in logger.readall() and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertIn(u'echo many_writes', logger.readall())
+            self.assertIn(u'\nmany_writes', logger.readall())
+        finally:
+            self.serial.close_logger(logger)
+
+    def test_timeout(self):
+        with self.assertRaises(SerialTimeoutException):
+            self.serial.wait_for_string(u'NNNN!!!!', timeout=0.3)
+
+@unittest.skipIf(os.name != 'posix', "Simulated shell need pty")
+class SimAndroidTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.sim = SimulatedShell(logger=LOGGER, props={u'ro.build.version.sdk': u'30'})
+        cls.sim.start()
+        cls.serial = SerialAndroid(cls.sim.port, logger=LOGGER)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.serial.close()
+        cls.sim.stop()
+
+    def test_prop(self):
+        self.assertEqual(self.serial.getprop_android_sdk_version(), u'30')
+        self.assertEqual(self.serial.getprops()[u'ro.product.model'], u'SimDUT')
+
+    def test_dumpsys_power(self):
+        power = self.serial.dumpsys(u'power')
+        self.assertEqual(power[u'Display Power'], {u'state': u'ON'})
+        self.assertEqual(power[u'Suspend Blockers'][u'PowerManagerService.WakeLocks'], 1)
+
+    def test_su(self):
+        self.serial.su_exit()
+        self.assertFalse(self.serial.is_root())
+        self.serial.su_enter()
+        self.assertTrue(self.serial.is_root())
+
+@unittest.skipIf(os.name != 'posix', "Simulated shell need pty")
+class SimHubFleetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sims = [SimulatedShell(logger=LOGGER) for _ in range(3)]
+        for sim in self.sims:
+            sim.start()
+
+    def tearDown(self):
+        for sim in self.sims:
+            sim.stop()
+
+    def test_hub(self):
+        hub = SerialHub(logger=LOGGER)
+        ports = [SerialLinux(sim.port, logger=LOGGER, hub=hub) for sim in self.sims]
+        try:
+            self.assertEqual(len(hub), 3)
+            for port in ports:
+                self.assertEqual(port.command_output(u'id')[0], u'0')
+            ports[0].detach_hub()
+            self.assertEqual(ports[0].command_output(u'id')[0], u'0')
+        finally:
+            for port in ports:
+                port.close()
+            hub.close()
+
+    def test_fleet(self):
+        fleet = SerialFleet([SerialLinux(sim.port, logger=LOGGER) for sim in self.sims], logger=LOGGER)
+        try:
+            result = fleet.run('meminfo', timeout=5)
+            self.assertTrue(result.ok)
+            self.assertEqual(len(result.results), 3)
+        finally:
+            fleet.close()
+
+@unittest.skipIf(os.name != 'posix', "Simulated shell need pty")
+class SimThroughputTest(unittest.TestCase):
+
+    def test_throughput_latency(self):
+        with SimulatedShell(logger=LOGGER, throughput=20000, latency=0.1) as sim:
+            serial = SerialThread(sim.port, logger=LOGGER)
+            try:
+                start = time.time()
+                serial.write(u'cat /proc/meminfo\n')
+                serial.wait_for_string(u'Cached', timeout=5)
+                self.assertGreater(time.time() - start, 0.1)
+            finally:
+                serial.close()
+
+if __name__ == "__main__":
+    unittest.main()
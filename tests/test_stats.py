@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import logging
+
+sys.path.insert(1,os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from serial_wrapper.serial_stats import LatencyHistogram, SerialStats, format_stats
+from serial_wrapper.serial_wrapper import SerialThread
+
+LOGGER = logging.getLogger(__name__)
+
+class LatencyHistogramTest(unittest.TestCase):
+
+    def test_percentile(self):
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.percentile(99), 0.0)
+        for _ in range(98):
+            histogram.add(0.0003)
+        histogram.add(0.02)
+        histogram.add(7.0)
+        self.assertEqual(histogram.percentile(50), 0.0005)
+        self.assertEqual(histogram.percentile(99), 0.05)
+        self.assertEqual(histogram.percentile(100), 7.0)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['count'], 100)
+        self.assertEqual(snapshot['max'], 7.0)
+        self.assertEqual(snapshot['buckets']['inf'], 1)
+        self.assertEqual(snapshot['buckets'][0.0005], 98)
+
+class SerialStatsTest(unittest.TestCase):
+
+    def test_snapshot(self):
+        stats = SerialStats()
+        stats.add_read(10)
+        stats.add_read(6)
+        stats.add_write(3, 0.001)
+        stats.add_handler('IOHandler', 0.0002)
+        stats.add_match(0.004)
+        snapshot = stats.snapshot()
+        self.assertEqual(snapshot['bytes_read'], 16)
+        self.assertEqual(snapshot['chunks_read'], 2)
+        self.assertEqual(snapshot['bytes_written'], 3)
+        self.assertEqual(snapshot['flush_latency']['count'], 1)
+        self.assertEqual(snapshot['handler_latency']['IOHandler']['count'], 1)
+        self.assertEqual(snapshot['match_latency']['p99'], 0.005)
+        self.assertIn(u'IOHandler', format_stats(snapshot))
+
+class SerialThreadStatsTest(unittest.TestCase):
+
+    def test_handler_stats_opt_in(self):
+        serialthread = SerialThread('loop://', logger=LOGGER)
+        try:
+            loggers = [serialthread.create_logger(queue_policy=None) for _ in range(2)]
+            self.assertTrue(serialthread.expect_for_write(u'one\n', u'one', timeout=5)[0])
+            self.assertEqual(serialthread.stats()['handler_latency'], {}) # Off by default
+            serialthread.enable_stats()
+            self.assertTrue(serialthread.expect_for_write(u'two\n', u'two', timeout=5)[0])
+            names = set(serialthread.stats()['handler_latency'])
+            self.assertEqual(names, set([u'expect'] + [logger.stats_name for logger in loggers]))
+            self.assertEqual(len(names), 3) # Every logger has own histogram
+            self.assertEqual(serialthread.stats()['match_latency']['count'], 2)
+        finally:
+            serialthread.close()
+
+if __name__ == "__main__":
+    unittest.main()
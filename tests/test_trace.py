@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import os
+import logging
+from datetime import datetime
+
+sys.path.insert(1,os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from serial_wrapper.serial_trace import Tracer, TRACE_READ
+from serial_wrapper.serial_wrapper import IOHandler
+
+LOGGER = logging.getLogger(__name__)
+
+class TracerTest(unittest.TestCase):
+
+    def test_ring(self):
+        tracer = Tracer(4)
+        for value in range(6):
+            tracer.record(TRACE_READ, value)
+        self.assertEqual(len(tracer), 4)
+        self.assertEqual(tracer.count, 6)
+        self.assertEqual([record[2] for record in tracer.records()], [2, 3, 4, 5])
+        self.assertEqual(set(record[1] for record in tracer.records()), set(['read']))
+        self.assertEqual(len(tracer.dump(last=2)), 2)
+        tracer.clear()
+        self.assertEqual(tracer.records(), [])
+
+    def test_handler(self):
+        tracer = Tracer(16)
+        io = IOHandler(logger=LOGGER, coding='UTF-8')
+        io.tracer = tracer
+        io.update(None, (b'abc', datetime.now()))
+        io.readall()
+        self.assertEqual([(name, value) for _, name, value in tracer.records()],
+                         [('io_update', 3), ('readall', 3)])
+        io.close()
+
+if __name__ == "__main__":
+    unittest.main()